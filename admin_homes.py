@@ -0,0 +1,218 @@
+import os
+import math
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple, NamedTuple
+
+import metrics
+from caching import ListingLogFollower, listing_log_path
+from repository import repo
+
+# Rows for the admin "All Homes" table.
+#
+# Each worker keeps one flat row per listed user (the columns the table shows)
+# together with uid sets per home status, plan and home city, and follows the
+# listing change log the same way the search index does (caching.
+# ListingLogFollower): rebuilt from repo.listed_users() once, then only the uids
+# appended to the log since the last call are re-read. The all-homes page renders just the counts and filter
+# options; the rows come from admin_homes_page() one page at a time.
+#
+# Sorted uid orders are cached per sort field until the next change.
+
+REBUILD_THRESHOLD = int(os.getenv("ADMIN_HOMES_REBUILD_THRESHOLD", 5000))
+DEFAULT_PER_PAGE  = 50
+MAX_PER_PAGE      = 200
+MEMBER_PLANS      = ("silver", "gold", "platinum")
+NO_VALUE          = "none"       # filter value for rows without a plan / status / city
+
+# Column -> row field, for ?sort=
+SORT_FIELDS = {
+    "uid"          : "uid",
+    "name"         : "name",
+    "email"        : "email",
+    "city"         : "city",
+    "title"        : "title",
+    "status"       : "house_status",
+    "home_city"    : "home_city",
+    "plan"         : "plan",
+    "guest_points" : "guest_points",
+}
+
+SEARCH_FIELDS = ("uid", "name", "email", "phone", "occupation", "address", "city", "pin_code",
+                 "title", "home_address", "home_city")
+
+def home_row(uid: str, user: Dict[str, Any]) -> Dict[str, Any]:
+    properties = user.get('properties') or {}
+    membership = user.get('membership_details') or {}
+    return {
+        "uid"            : uid,
+        "name"           : user.get('name') or "",
+        "email"          : user.get('email') or "",
+        "email_verified" : user.get('email_verified') or "",
+        "phone"          : user.get('phone') or "",
+        "occupation"     : user.get('occupation') or "",
+        "address"        : user.get('address') or "",
+        "city"           : user.get('city') or "",
+        "pin_code"       : str(user.get('pin_code') or ""),
+        "profile_image"  : user.get('profile_image') or "",
+        "title"          : properties.get('title') or "",
+        "house_status"   : (properties.get('house_status') or "").strip(),
+        "home_address"   : properties.get('address') or "",
+        "home_city"      : properties.get('city') or "",
+        "plan"           : (membership.get('plan') or "").strip(),
+        "guest_points"   : properties.get('guest_points', ""),
+    }
+
+def _sort_key(value: Any) -> Tuple:
+    # Numbers (guest points are stored as ints or digit strings) before text, blanks last
+    text = str(value).strip().lower()
+    if not text:
+        return (2, 0, "")
+    try:
+        number = float(text)
+    except ValueError:
+        return (1, 0, text)
+    return (0, number, "") if math.isfinite(number) else (1, 0, text)
+
+def _group(value: str) -> str:
+    return value.strip().lower() or NO_VALUE
+
+class HomesPage(NamedTuple):
+    total       : int
+    page        : int
+    per_page    : int
+    total_pages : int
+    items       : List[Dict[str, Any]]
+
+class AdminHomesIndex(ListingLogFollower):
+    rebuild_threshold = REBUILD_THRESHOLD
+    metrics_prefix    = "admin_homes"
+
+    def __init__(self):
+        super().__init__()
+        self.lock         = threading.RLock()       # guards the structures below
+        self.rows         : Dict[str, Dict[str, Any]] = {}
+        self.haystacks    : Dict[str, str] = {}      # uid -> lowercased searchable text
+        self.by_status    : Dict[str, Set[str]] = {}
+        self.by_plan      : Dict[str, Set[str]] = {}
+        self.by_city      : Dict[str, Set[str]] = {}
+        self.orders       : Dict[str, List[str]] = {}  # sort field -> uids ascending
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # Maintenance
+
+    def _groups(self, row: Dict[str, Any]):
+        return ((self.by_status, _group(row["house_status"])),
+                (self.by_plan,   _group(row["plan"])),
+                (self.by_city,   _group(row["home_city"])))
+
+    def _remove(self, uid: str) -> None:
+        row = self.rows.pop(uid, None)
+        if row is None:
+            return
+        self.haystacks.pop(uid, None)
+        for groups, value in self._groups(row):
+            members = groups.get(value)
+            if members is not None:
+                members.discard(uid)
+                if not members:
+                    del groups[value]
+
+    def _add(self, uid: str, user: Dict[str, Any]) -> None:
+        row = self.rows[uid] = home_row(uid, user)
+        self.haystacks[uid] = " ".join(str(row[field]) for field in SEARCH_FIELDS).lower()
+        for groups, value in self._groups(row):
+            groups.setdefault(value, set()).add(uid)
+
+    def index(self, uid: str, user: Optional[Dict[str, Any]]) -> None:
+        """(Re)index ``uid``; users without a listing are dropped."""
+        with self.lock:
+            self._remove(uid)
+            if user and user.get('properties'):
+                self._add(uid, user)
+            self.orders.clear()
+
+    def listings(self) -> Dict[str, Any]:
+        return repo.listed_users()
+
+    def rebuild(self, listings: Dict[str, Any]) -> None:
+        # Built aside and swapped in, so requests keep using the old rows meanwhile
+        fresh = AdminHomesIndex()
+        for uid, user in listings.items():
+            if user and user.get('properties'):
+                fresh._add(uid, user)
+        with self.lock:
+            self.rows, self.haystacks = fresh.rows, fresh.haystacks
+            self.by_status, self.by_plan, self.by_city = fresh.by_status, fresh.by_plan, fresh.by_city
+            self.orders.clear()
+
+    def apply(self, uids: Set[str]) -> Set[str]:
+        for uid in uids:
+            self.index(uid, repo.get_user(uid))
+        return uids
+
+    # Queries
+
+    def _order(self, sort: str) -> List[str]:
+        order = self.orders.get(sort)
+        if order is None:
+            field = SORT_FIELDS[sort]
+            order = self.orders[sort] = sorted(self.rows, key=lambda uid: (_sort_key(self.rows[uid][field]), uid))
+        return order
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts for the stat widgets and the values offered by the filters."""
+        with self.lock:
+            verified     = len(self.by_status.get("verified", ()))
+            not_verified = len(self.by_status.get("not verified", ()))
+            return {
+                "total_homes"              : verified + not_verified,
+                "verified_homes_count"     : verified,
+                "not_verified_homes_count" : not_verified,
+                "total_members"            : sum(len(self.by_plan.get(plan, ())) for plan in MEMBER_PLANS),
+                "cities"                   : sorted(city for city in self.by_city if city != NO_VALUE),
+                "plans"                    : sorted(plan for plan in self.by_plan if plan != NO_VALUE),
+            }
+
+    def page(self, page: int = 1, per_page: int = DEFAULT_PER_PAGE, sort: str = "uid", descending: bool = False,
+             status: str = '', plan: str = '', city: str = '', query: str = '') -> HomesPage:
+        with self.lock:
+            candidates = None
+            for groups, value in ((self.by_status, status), (self.by_plan, plan), (self.by_city, city)):
+                if value:
+                    members    = groups.get(value.strip().lower(), set())
+                    candidates = members if candidates is None else candidates & members
+
+            order = self._order(sort)
+            if descending:
+                order = order[::-1]
+            terms = query.lower().split()
+            if candidates is None and not terms:
+                matching = order
+            else:
+                matching = [
+                    uid for uid in order
+                    if (candidates is None or uid in candidates)
+                    and all(term in self.haystacks[uid] for term in terms)
+                ]
+
+            total       = len(matching)
+            total_pages = max(1, math.ceil(total / per_page))
+            page        = min(max(page, 1), total_pages)
+            start       = (page - 1) * per_page
+            items       = [dict(self.rows[uid]) for uid in matching[start:start + per_page]]
+        return HomesPage(total, page, per_page, total_pages, items)
+
+_index = AdminHomesIndex()
+
+def admin_homes_index() -> AdminHomesIndex:
+    """The worker's rows, caught up with the listing log."""
+    _index.refresh(listing_log_path())
+    return _index
+
+def admin_homes_page(**filters) -> HomesPage:
+    return admin_homes_index().page(**filters)
+
+def init_admin_homes(app) -> None:
+    metrics.register_gauge("admin_homes_rows", lambda: len(_index))
@@ -1,10 +1,11 @@
-from flask import Flask, Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-import pyrebase, os, firebase_admin, requests, shutil, json
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app, abort, Response
+import os, shutil, json, hmac
 from dotenv import load_dotenv
 from werkzeug.security import check_password_hash
-from firebase_admin import credentials, db as admin_db, auth as admin_auth
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime, timezone, timedelta
 from collections import defaultdict
+from typing import Dict, Any
 
 from utils import (
     all_users_properties,
@@ -21,36 +22,120 @@ from utils import (
     validate_property_form,
     collect_property_form_data,
     homes_images,
-    get_amenity_icons
+    get_amenity_icons,
+    is_valid_pin_code,
+    is_valid_key,
+    FEATURE_FIELDS,
+    REQUIRED_PROPERTY_FIELDS
+)
+from assets import init_assets
+from clients import get_auth_client, admin_auth
+from caching import conditional_listing_page, bump_listing_version, cached_page, init_caching
+from write_queue import enqueue_write, init_write_queue
+from subscriptions import subscribe, init_subscriptions
+from instrumentation import init_instrumentation
+from repository import repo, init_repository, EXCHANGE_REQUESTS, PLAN_INQUIRIES, CONTACT_FORMS
+from rtdb_tracer import init_rtdb_tracer
+from search import listing_index, find_listings, init_search
+from proximity import init_proximity, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
+from matching import init_matching
+from bulk_import import start_import, load_job, recent_jobs, InvalidUpload
+from templating import init_templating
+from admin_homes import admin_homes_index, admin_homes_page, init_admin_homes, SORT_FIELDS, DEFAULT_PER_PAGE, MAX_PER_PAGE
+from sessions import init_sessions
+from compression import init_compression
+import metrics
+from rate_limits import (
+    limiter,
+    account_key,
+    session_account_key,
+    JSON_ENDPOINTS,
+    LOGIN_LIMIT,
+    LOGIN_ACCOUNT_LIMIT,
+    SIGNUP_LIMIT,
+    FORGOT_LIMIT,
+    FORGOT_ACCOUNT_LIMIT,
+    ADMIN_LOGIN_LIMIT,
+    PUBLIC_FORM_LIMIT,
+    EXCHANGE_ACCOUNT_LIMIT
 )
 
-load_dotenv()
-
-ADMIN_EMAIL         = os.getenv("ADMIN_EMAIL")
-ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH")
-
-app = Flask(__name__)
-app.secret_key = os.getenv("FLASK_SECRET_KEY")
-
-cred = credentials.Certificate("serviceAccountKey.json")
-firebase_admin.initialize_app(cred, {
-    'databaseURL': os.getenv("FIREBASE_DATABASE_URL")
-})
-
-firebaseConfig = {
-    'apiKey'            : os.getenv("FIREBASE_API_KEY"),
-    'authDomain'        : os.getenv("FIREBASE_AUTH_DOMAIN"),
-    'databaseURL'       : os.getenv("FIREBASE_DATABASE_URL"),
-    'projectId'         : os.getenv("FIREBASE_PROJECT_ID"),
-    'storageBucket'     : os.getenv("FIREBASE_STORAGE_BUCKET"),
-    'messagingSenderId' : os.getenv("FIREBASE_MESSAGING_SENDER_ID"),
-    'appId'             : os.getenv("FIREBASE_APP_ID"),
-    'measurementId'     : os.getenv("FIREBASE_MEASUREMENT_ID")
-}
+main = Blueprint('main', __name__)
+
+def default_config() -> Dict[str, Any]:
+    # Unset (None) lets Flask reload templates in debug mode only
+    auto_reload = os.getenv("TEMPLATES_AUTO_RELOAD")
+    return {
+        'SECRET_KEY'              : os.getenv("FLASK_SECRET_KEY"),
+        'ADMIN_EMAIL'             : os.getenv("ADMIN_EMAIL"),
+        'ADMIN_PASSWORD_HASH'     : os.getenv("ADMIN_PASSWORD_HASH"),
+        'UPLOAD_FOLDER'           : 'static/uploads/',
+        'UPLOAD_FOLDER_PROFILE'   : 'static/profile/',
+        'MAX_IMAGE_PIXELS'        : int(os.getenv("MAX_IMAGE_PIXELS", 40_000_000)),
+        'MAX_IMAGE_EDGE'          : int(os.getenv("MAX_IMAGE_EDGE", 2048)),
+        'PAGE_CACHE_SIZE'         : int(os.getenv("PAGE_CACHE_SIZE", 256)),
+        'PAGE_CACHE_TTL'          : int(os.getenv("PAGE_CACHE_TTL", 300)),
+        'FRAGMENT_CACHE_SIZE'     : int(os.getenv("FRAGMENT_CACHE_SIZE", 2048)),
+        'LISTING_LOG_PATH'        : os.getenv("LISTING_LOG_PATH"),
+        'LISTING_LOG_MAX_BYTES'   : int(os.getenv("LISTING_LOG_MAX_BYTES", 4 * 1024 * 1024)),
+        'LISTING_VERSION_MAX_AGE' : int(os.getenv("LISTING_VERSION_MAX_AGE", 3600)),
+        'RATELIMIT_STORAGE_URI'   : os.getenv("RATELIMIT_STORAGE_URI", "memory://"),
+        'TRUSTED_PROXY_COUNT'     : int(os.getenv("TRUSTED_PROXY_COUNT", 0)),
+        'WRITE_QUEUE_PATH'        : os.getenv("WRITE_QUEUE_PATH"),
+        'METRICS_TOKEN'           : os.getenv("METRICS_TOKEN"),
+        'METRICS_DIR'             : os.getenv("METRICS_DIR"),
+        'RTDB_TRACE'              : os.getenv("RTDB_TRACE", "").lower() in ("1", "true", "yes"),
+        'RTDB_TRACE_LARGE_BYTES'  : int(os.getenv("RTDB_TRACE_LARGE_BYTES", 256_000)),
+        'RTDB_TRACE_SLOW_SECONDS' : float(os.getenv("RTDB_TRACE_SLOW_SECONDS", 0.5)),
+        'DATA_BACKEND'            : os.getenv("DATA_BACKEND", "rtdb"),
+        'SQLITE_DATABASE_PATH'    : os.getenv("SQLITE_DATABASE_PATH"),
+        'SEARCH_WARM_INDEX'       : os.getenv("SEARCH_WARM_INDEX", "1").lower() in ("1", "true", "yes"),
+        'PIN_COORDINATES_PATH'    : os.getenv("PIN_COORDINATES_PATH"),
+        'MATCH_ENGINE'            : os.getenv("MATCH_ENGINE", "1").lower() in ("1", "true", "yes"),
+        'TEMPLATES_AUTO_RELOAD'   : auto_reload.lower() in ("1", "true", "yes") if auto_reload else None,
+        'TEMPLATE_CACHE_PATH'     : os.getenv("TEMPLATE_CACHE_PATH"),
+        'TEMPLATE_WARMUP'         : os.getenv("TEMPLATE_WARMUP", "1").lower() in ("1", "true", "yes"),
+        'SESSION_BACKEND'         : os.getenv("SESSION_BACKEND", "sqlite"),
+        'SESSION_SQLITE_PATH'     : os.getenv("SESSION_SQLITE_PATH"),
+        'SESSION_IDLE_SECONDS'    : int(os.getenv("SESSION_IDLE_SECONDS", 7 * 24 * 3600)),
+        'COMPRESSION'             : os.getenv("COMPRESSION", "1").lower() in ("1", "true", "yes"),
+        'COMPRESSION_MIN_SIZE'    : int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    }
 
-firebase      = pyrebase.initialize_app(firebaseConfig)
-pyrebase_auth = firebase.auth()
-db            = firebase.database()
+def create_app(config: Dict[str, Any] = None) -> Flask:
+    """
+    Build the application. Firebase clients are not touched here; they are
+    created on first use in each process (see clients.py).
+    """
+    load_dotenv()
+
+    app = Flask(__name__)
+    app.config.update(default_config())
+    app.config.update(config or {})
+
+    if app.config['TRUSTED_PROXY_COUNT']:
+        # Rate limits key on the client IP, which sits behind the proxy
+        hops = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    init_compression(app)
+    init_instrumentation(app)
+    init_rtdb_tracer(app)
+    init_assets(app)
+    init_caching(app)
+    init_sessions(app)
+    init_repository(app)
+    init_write_queue(app)
+    init_subscriptions(app)
+    init_proximity(app)
+    init_search(app)
+    init_matching(app)
+    init_admin_homes(app)
+    limiter.init_app(app)
+    app.register_blueprint(main)
+    init_templating(app)
+
+    return app
 
 def is_email_verified():
     try:
@@ -65,20 +150,7 @@ def is_email_verified():
 
 IST = timezone(timedelta(hours=5, minutes=30))
 
-UPLOAD_FOLDER = 'static/uploads/'
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-
-UPLOAD_FOLDER_PROFILE = 'static/profile/'
-app.config['UPLOAD_FOLDER_PROFILE'] = UPLOAD_FOLDER_PROFILE
-
-@app.after_request
-def add_no_cache_headers(response):
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0"
-    response.headers["Pragma"]        = "no-cache"
-    response.headers["Expires"]       = "0"
-    return response
-
-@app.context_processor
+@main.app_context_processor
 def inject_user():
     try:
         return dict(user=get_current_user())
@@ -87,8 +159,7 @@ def inject_user():
     
 def get_user_by_uid(uid):
     try:
-        ref = admin_db.reference(f'users/{uid}')
-        return ref.get() or {}
+        return repo.get_user(uid) or {}
     except Exception as e:
         return {}
     
@@ -107,7 +178,9 @@ def get_location_type_counts():
 
 # Route for the home page
 
-@app.route('/', methods=['GET', 'POST'])
+@main.route('/', methods=['GET', 'POST'])
+@limiter.limit(PUBLIC_FORM_LIMIT, methods=['POST'])
+@cached_page
 def home():
     if request.method == 'POST':
         form_type = request.form.get('form_type')
@@ -121,9 +194,7 @@ def home():
             else:
                 try:
                     now_ist = datetime.now(IST).strftime("%d-%m-%Y, %H:%M")
-                    admin_db.reference('subscriptions').push(
-                        {"email": email, "submitted_at": now_ist}
-                    )
+                    subscribe(email, now_ist)
                     flash("Thank you for subscribing!", "success")
                 except Exception:
                     flash("Subscription failed. Please try again later.", "light")
@@ -137,17 +208,17 @@ def home():
             # validations …
             if not (fullname and phone and email and plan_type):
                 flash("All fields are required for plan inquiry.", "light")
-                return redirect(url_for('home'))
+                return redirect(url_for('main.home'))
             if not is_valid_name(fullname):
-                flash("Please enter a valid name.", "light"); return redirect(url_for('home'))
+                flash("Please enter a valid name.", "light"); return redirect(url_for('main.home'))
             if not is_valid_email(email):
-                flash("Please enter a valid email address.", "light"); return redirect(url_for('home'))
+                flash("Please enter a valid email address.", "light"); return redirect(url_for('main.home'))
             if not is_valid_phone(phone):
-                flash("Please enter a valid phone number.", "light"); return redirect(url_for('home'))
+                flash("Please enter a valid phone number.", "light"); return redirect(url_for('main.home'))
 
             try:
                 now_ist = datetime.now(IST).strftime("%d-%m-%Y, %H:%M")
-                admin_db.reference('plan_inquiries').push(
+                enqueue_write(PLAN_INQUIRIES,
                     {
                         "fullname": fullname, "phone": phone, "email": email,
                         "plan": plan_type, "action": "Not Connected",
@@ -158,7 +229,7 @@ def home():
             except Exception:
                 flash("Could not submit inquiry. Try again later.", "light")
 
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     location_type_counts = get_location_type_counts()
 
@@ -169,13 +240,15 @@ def home():
 
 # Route for about pages
 
-@app.route('/about-us')
+@main.route('/about-us')
+@cached_page
 def about_us():
     return render_template('about-us.html')
 
 # Route for contact page
 
-@app.route('/contact-us', methods=['GET', 'POST'])
+@main.route('/contact-us', methods=['GET', 'POST'])
+@limiter.limit(PUBLIC_FORM_LIMIT, methods=['POST'])
 def contact_us():
     if request.method == 'POST':
         name    = request.form.get('name', '').strip()
@@ -185,29 +258,29 @@ def contact_us():
 
         if not all([name, email, phone, message]):
             flash("All fields are required.", "light")
-            return redirect(url_for('contact_us'))
+            return redirect(url_for('main.contact_us'))
         
         if not is_valid_name(name):
             flash("Please enter a valid name.", "light")
-            return redirect(url_for('contact_us'))
+            return redirect(url_for('main.contact_us'))
 
         if not is_valid_email(email):
             flash("Please enter a valid email address.", "light")
-            return redirect(url_for('contact_us'))
+            return redirect(url_for('main.contact_us'))
 
         if not is_valid_phone(phone):
             flash("Please enter a valid phone number.", "light")
-            return redirect(url_for('contact_us'))
+            return redirect(url_for('main.contact_us'))
         
         if not is_valid_about(message):
             flash("Please enter valid message.", "light")
-            return redirect(url_for('contact_us'))
+            return redirect(url_for('main.contact_us'))
 
         try:
             now_ist = datetime.now(IST)
             time    = now_ist.strftime("%d-%m-%Y, %H:%M")
             
-            admin_db.reference('contact_form').push({
+            enqueue_write(CONTACT_FORMS, {
                 "name"         : name,
                 "email"        : email,
                 "phone"        : phone,
@@ -219,76 +292,100 @@ def contact_us():
         except Exception as e:
             flash("Your message couldn’t be sent right now. Please try again later.", "light")
         
-        return redirect(url_for('contact_us'))
+        return redirect(url_for('main.contact_us'))
 
     return render_template('contact-us.html')
 
 # Route for FAQ
 
-@app.route('/faq')
+@main.route('/faq')
+@cached_page
 def faq():
     return render_template('faq.html')
 
 # Route for blog
 
-@app.route('/blog')
+@main.route('/blog')
+@cached_page
 def blog():
     return render_template('blog.html')
 
 # Route for home exchange
 
-@app.route('/home-exchange')
+@main.route('/home-exchange')
+@conditional_listing_page
+@cached_page
 def home_exchange():
-    house_dict = all_users_properties()
-    house_list = list(house_dict.items())
-
+    query                = request.args.get('q', '').strip()
     selected_city        = request.args.get('city', '').strip().lower()
     selected_location    = request.args.get('location_type', '').strip().lower()
+    selected_features    = {
+        field: [v for v in request.args.getlist(field) if v in values]
+        for field, values in FEATURE_FIELDS.items()
+    }
+    selected_features    = {field: values for field, values in selected_features.items() if values}
+    near                 = request.args.get('near', '').strip()
+    near                 = near if is_valid_pin_code(near) else ''
+    radius               = request.args.get('radius', default=int(DEFAULT_RADIUS_KM), type=int)
+    radius               = min(max(radius, 1), int(MAX_RADIUS_KM))
 
-    filtered = []
-    for uid, data in house_list:
-        props = data.get('properties', {})
-        city  = props.get('city', '').lower()
-        loc   = props.get('location_type', '').lower()
+    per_page    = 8
+    page        = max(request.args.get('page', default=1, type=int), 1)
 
-        if selected_city and selected_city != city:
-            continue
-        if selected_location and selected_location != loc:
-            continue
-        filtered.append((uid, data))
+    # Served from the listing index; only the listings on the page are loaded
+    matches = find_listings(query, selected_city, selected_location, selected_features,
+                            exclude_uid=session.get('user'), offset=(page - 1) * per_page, limit=per_page,
+                            near=near, radius_km=radius)
+    paginated   = {uid: data for uid, data in ((uid, repo.get_user(uid)) for uid in matches.uids) if data}
+    total_pages = (matches.total + per_page - 1) // per_page or 1
 
-    per_page    = 8
-    page        = request.args.get('page', default=1, type=int)
-    total       = len(filtered)
-    start, end  = (page - 1) * per_page, page * per_page
-    paginated   = dict(filtered[start:end])
-    total_pages = (total + per_page - 1) // per_page or 1
+    cities, location_types = listing_index().facet_values()
 
-    cities          = sorted({d['properties'].get('city') for _, d in house_list if d.get('properties', {}).get('city')})
-    location_types  = sorted({d['properties'].get('location_type') for _, d in house_list if d.get('properties', {}).get('location_type')})
+    filter_args = {k: v for k, v in (('q', query), ('city', selected_city), ('location_type', selected_location)) if v}
+    near_args   = {'near': near, 'radius': radius} if near else {}
+    page_args   = {**filter_args, **near_args, **selected_features}
 
     return render_template(
         "home-exchange.html",
         house             = paginated,
         page              = page,
         total_pages       = total_pages,
+        page_args         = page_args,
+        filter_args       = filter_args,
         cities            = cities,
         location_types    = location_types,
+        query             = query,
         selected_city     = selected_city,
-        selected_location = selected_location
+        selected_location = selected_location,
+        near              = near,
+        radius            = radius,
+        feature_fields    = FEATURE_FIELDS,
+        selected_features = selected_features,
+        feature_counts    = matches.counts,
+        total_matches     = matches.total
     )
 
-@app.route('/home-details/<uid>', methods=['GET', 'POST'])
+@main.route('/home-details/<uid>', methods=['GET', 'POST'])
+@limiter.limit(PUBLIC_FORM_LIMIT, methods=['POST'])
+@limiter.limit(EXCHANGE_ACCOUNT_LIMIT, methods=['POST'], key_func=session_account_key)
+@conditional_listing_page
+@cached_page
 def home_details(uid):
     one_properties = all_users_properties()
     house_details = one_properties.get(uid)
 
     if request.method == 'POST':
+        # Requests are queued and acknowledged before they reach the database,
+        # so anything it would reject has to be caught here
+        if not is_valid_key(uid) or not house_details:
+            flash("This home is not available for exchange requests.", "light")
+            return redirect(url_for('main.home_exchange'))
+
         if 'user-exchange' in request.form:
             user_uid = session.get('user')
             if not user_uid:
                 flash("You must be logged in to send an exchange request.", "light")
-                return redirect(url_for('home_details', uid=uid))
+                return redirect(url_for('main.home_details', uid=uid))
 
             user_data = get_user_by_uid(user_uid)
 
@@ -303,7 +400,7 @@ def home_details(uid):
                 now_ist = datetime.now(IST)
                 time = now_ist.strftime("%d-%m-%Y, %H:%M")
 
-                admin_db.reference(f'exchange_requests/{uid}').push({
+                enqueue_write(f'{EXCHANGE_REQUESTS}/{uid}', {
                     "name": name,
                     "email": email,
                     "phone": phone,
@@ -319,7 +416,7 @@ def home_details(uid):
             except Exception as e:
                 flash("Could not send your request at the moment. Try again later.", "light")
 
-            return redirect(url_for('home_details', uid=uid))
+            return redirect(url_for('main.home_details', uid=uid))
 
         else:
             name    = request.form.get('name', '').strip()
@@ -329,29 +426,29 @@ def home_details(uid):
 
             if not all([name, email, phone, message]):
                 flash("All fields are required.", "light")
-                return redirect(url_for('home_details', uid=uid))
+                return redirect(url_for('main.home_details', uid=uid))
 
             if not is_valid_name(name):
                 flash("Please enter a valid name.", "light")
-                return redirect(url_for('home_details', uid=uid))
+                return redirect(url_for('main.home_details', uid=uid))
 
             if not is_valid_email(email):
                 flash("Please enter a valid email address.", "light")
-                return redirect(url_for('home_details', uid=uid))
+                return redirect(url_for('main.home_details', uid=uid))
 
             if not is_valid_phone(phone):
                 flash("Please enter a valid phone number.", "light")
-                return redirect(url_for('home_details', uid=uid))
+                return redirect(url_for('main.home_details', uid=uid))
 
             if not is_valid_about(message):
                 flash("Please enter a valid message.", "light")
-                return redirect(url_for('home_details', uid=uid))
+                return redirect(url_for('main.home_details', uid=uid))
 
             try:
                 now_ist = datetime.now(IST)
                 time = now_ist.strftime("%d-%m-%Y, %H:%M")
 
-                admin_db.reference(f'exchange_requests/{uid}').push({
+                enqueue_write(f'{EXCHANGE_REQUESTS}/{uid}', {
                     "name": name,
                     "email": email,
                     "phone": phone,
@@ -367,7 +464,7 @@ def home_details(uid):
             except Exception as e:
                 flash("Could not send your request at the moment. Try again later.", "light")
 
-            return redirect(url_for('home_details', uid=uid))
+            return redirect(url_for('main.home_details', uid=uid))
 
     return render_template("home-details.html",
                            house_details=house_details,
@@ -375,14 +472,15 @@ def home_details(uid):
 
 # User authentication routes
 
-@app.route('/signup', methods=['POST', 'GET'])
+@main.route('/signup', methods=['POST', 'GET'])
+@limiter.limit(SIGNUP_LIMIT, methods=['POST'])
 def signup():
     try:
         if 'user' in session:
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         
         if request.method == 'GET':
-            return redirect(url_for('home', show='signup'))
+            return redirect(url_for('main.home', show='signup'))
         
         if 'admin-user' in session:
             session.clear()
@@ -410,7 +508,7 @@ def signup():
         if not db_alive():
             return jsonify({"status": "error", "message":  "We're unable to process your request at the moment. Please try again later."}), 503
 
-        user = pyrebase_auth.create_user_with_email_and_password(email, password)
+        user = get_auth_client().create_user_with_email_and_password(email, password)
         session['user']          = user['localId']
         session['id_token']      = user['idToken']
         session['refresh_token'] = user['refreshToken']
@@ -426,9 +524,9 @@ def signup():
             "email_verified" : "Not Verified",
             "submitted_at"   : time
         }
-        admin_db.reference(f'users/{user["localId"]}').set(user_data)
+        repo.create_user(user["localId"], user_data)
 
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     except Exception as e:
         error_message = str(e)
@@ -437,14 +535,16 @@ def signup():
         else:
             return jsonify({"status": "error", "message": "We're unable to process your request at the moment. Please try again later."}), 500
 
-@app.route('/login', methods=['POST', 'GET'])
+@main.route('/login', methods=['POST', 'GET'])
+@limiter.limit(LOGIN_LIMIT, methods=['POST'])
+@limiter.limit(LOGIN_ACCOUNT_LIMIT, methods=['POST'], key_func=account_key)
 def login():
     try:
         if 'user' in session:
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         
         if request.method == 'GET':
-            return redirect(url_for('home', show='login'))
+            return redirect(url_for('main.home', show='login'))
 
         if 'admin-user' in session:
             session.clear()
@@ -464,14 +564,14 @@ def login():
         if not db_alive():
             return jsonify({"status": "error", "message":  "We're unable to process your request at the moment. Please try again later."}), 503
 
-        user = pyrebase_auth.sign_in_with_email_and_password(email, password)
+        user = get_auth_client().sign_in_with_email_and_password(email, password)
 
         session['user']          = user['localId']
         session['id_token']      = user['idToken']
         session['refresh_token'] = user['refreshToken']
         session['email']         = email
 
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     except Exception as e:
         error_message = str(e)
@@ -480,14 +580,16 @@ def login():
         else:
             return jsonify({"status": "error", "message": "We're unable to process your request at the moment. Please try again later."}), 500
 
-@app.route('/forgot-password', methods=['POST', 'GET'])
+@main.route('/forgot-password', methods=['POST', 'GET'])
+@limiter.limit(FORGOT_LIMIT, methods=['POST'])
+@limiter.limit(FORGOT_ACCOUNT_LIMIT, methods=['POST'], key_func=account_key)
 def forgot_password():
     try:
         if 'user' in session:
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         
         if request.method == 'GET':
-            return redirect(url_for('home', show='forgot'))
+            return redirect(url_for('main.home', show='forgot'))
 
         email = request.form.get('email', '').strip()
 
@@ -503,19 +605,22 @@ def forgot_password():
         if not is_email_registered(email):
             return jsonify({"status": "error","message": "Email not registered. Please enter your registered email."}), 404
 
-        pyrebase_auth.send_password_reset_email(email)
+        get_auth_client().send_password_reset_email(email)
         return jsonify({"status": "success", "message": "Password reset email sent successfully!"}), 200
 
     except Exception as e:
         return jsonify({"status": "error","message": "Failed to send password reset email. Please try again later."}), 500
     
-@app.route('/resend-verification-email')
+@main.route('/resend-verification-email')
 def resend_verification_email():
     if 'user' not in session or 'id_token' not in session or 'refresh_token' not in session:
         flash("Please log in to verify your email.", "light")
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
 
     try:
+        from http_client import get_http_session
+
+        http          = get_http_session()
         id_token      = session['id_token']
         refresh_token = session['refresh_token']
         api_key       = os.getenv("FIREBASE_API_KEY")
@@ -526,7 +631,7 @@ def resend_verification_email():
             "refresh_token" : refresh_token
         }
 
-        refresh_response = requests.post(refresh_url, data=refresh_payload)
+        refresh_response = http.post(refresh_url, data=refresh_payload)
         if refresh_response.status_code == 200:
             refreshed_data           = refresh_response.json()
             id_token                 = refreshed_data['id_token']
@@ -539,7 +644,7 @@ def resend_verification_email():
             "idToken"     : id_token
         }
 
-        response = requests.post(verify_url, json=payload)
+        response = http.post(verify_url, json=payload)
         if response.status_code == 200:
             flash("Verification email sent successfully. Please check your inbox.", "success")
         else:
@@ -547,9 +652,9 @@ def resend_verification_email():
     except Exception as e:
         flash(f"Error sending verification email", "light")
 
-    return redirect(url_for('my_account'))
+    return redirect(url_for('main.my_account'))
 
-@app.route('/email-action')
+@main.route('/email-action')
 def email_action():
     mode     = request.args.get('mode')
     oob_code = request.args.get('oobCode')
@@ -568,24 +673,24 @@ def email_action():
     
 # User routes
     
-@app.route('/my-account', methods=['GET', 'POST'])
+@main.route('/my-account', methods=['GET', 'POST'])
 def my_account():
     if 'user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     if not db_alive():
         flash("An unexpected error occurred while loading your account details.", "light")
         return render_template("503.html"), 503
 
     uid      = session['user']
-    user_ref = admin_db.reference(f'users/{uid}')
-    user     = user_ref.get() or {}
+    user = repo.get_user(uid) or {}
 
     try:
         email_verified = is_email_verified()
 
         if user and user.get('email_verified') == "Not Verified" and email_verified:
-            user_ref.update({'email_verified': 'Verified'})
+            repo.update_user(uid, {'email_verified': 'Verified'})
+            bump_listing_version(uid)
 
         if request.method == "POST":
             return _process_post(uid)
@@ -596,23 +701,24 @@ def my_account():
         flash("An unexpected error occurred while loading your account details.", "light")
         return render_template("503.html"), 503
 
-@app.route('/my-home', methods=['GET', 'POST'])
+@main.route('/my-home', methods=['GET', 'POST'])
 def my_home():
     if 'user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     uid = session['user']
 
-    user_email_verified = admin_db.reference(f'users/{uid}/email_verified').get()
+    user_email_verified = repo.user_field(uid, 'email_verified')
 
     if user_email_verified != "Verified":
         flash("Please verify your email before adding home details.", "light")
-        return redirect(url_for('my_account'))
+        return redirect(url_for('main.my_account'))
 
 
     if request.method == 'POST':
         try:
-            admin_db.reference(f'users/{uid}/properties').delete()
+            repo.delete_listing(uid)
+            bump_listing_version(uid)
             folder_path = os.path.join('static', 'uploads', uid)
             if os.path.exists(folder_path):
                 shutil.rmtree(folder_path)
@@ -621,25 +727,26 @@ def my_home():
             return jsonify({'success': False, 'message': 'Error deleting home. Please try again later.'}), 500
 
     try:
-        user = admin_db.reference(f'users/{uid}').get() or {}
-        return render_template('my-home.html', user=user, uid=uid)
+        user    = repo.get_user(uid) or {}
+        matches = repo.matches(uid).get('items', []) if user.get('properties') else []
+        return render_template('my-home.html', user=user, uid=uid, matches=matches)
     
     except Exception as e:
         flash("An unexpected error occurred while loading your home.", "light")
         return render_template("503.html"), 503
 
-@app.route('/edit-home-details', methods=['GET', 'POST'])
+@main.route('/edit-home-details', methods=['GET', 'POST'])
 def edit_home_details():
     if 'user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     uid = session['user']
 
-    user_email_verified = admin_db.reference(f'users/{uid}/email_verified').get()
+    user_email_verified = repo.user_field(uid, 'email_verified')
 
     if user_email_verified != "Verified":
         flash("Please verify your email before adding home details.", "light")
-        return redirect(url_for('my_account'))
+        return redirect(url_for('main.my_account'))
 
     try:
         if request.method == 'POST':
@@ -652,12 +759,7 @@ def edit_home_details():
             data["guest_points"] = "0"
             data["submitted_at"] = time
 
-            required = [
-                "title", "location_type", "property_type", "guest_capacity", "size",
-                "bedrooms", "bathrooms", "address", "city", "state",
-                "pin_code", "description", "name", "email", "phone"
-            ]
-            if any(data[k] == "" or data[k] == [] for k in required):
+            if any(data[k] == "" or data[k] == [] for k in REQUIRED_PROPERTY_FIELDS):
                 flash("Please fill out every field.", "light")
                 return redirect(request.url)
 
@@ -668,15 +770,15 @@ def edit_home_details():
                 return redirect(request.url)
 
             try:
-                admin_db.reference(f'users/{uid}/properties').update(data)
+                repo.update_listing(uid, data)
+                bump_listing_version(uid)
 
-                images_ref = admin_db.reference(f'users/{uid}/properties/images').get()
-                if not images_ref:
+                if not repo.listing_images(uid):
                     flash("Please upload home images.", "light")
-                    return redirect(url_for('update_home_images'))
+                    return redirect(url_for('main.update_home_images'))
 
                 flash("Home details submitted successfully.", "success")
-                return redirect(url_for('edit_home_details'))
+                return redirect(url_for('main.edit_home_details'))
 
             except Exception as e:
 
@@ -689,18 +791,18 @@ def edit_home_details():
         flash("An unexpected error occurred while submitting your home details.", "light")
         return render_template("503.html"), 503
 
-@app.route('/update-home-images', methods=['GET', 'POST'])
+@main.route('/update-home-images', methods=['GET', 'POST'])
 def update_home_images():
     if 'user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     uid = session['user']
 
-    user_email_verified = admin_db.reference(f'users/{uid}/email_verified').get()
+    user_email_verified = repo.user_field(uid, 'email_verified')
 
     if user_email_verified != "Verified":
         flash("Please verify your email before adding home details.", "light")
-        return redirect(url_for('my_account'))
+        return redirect(url_for('main.my_account'))
 
     try:
         if request.method == "POST":
@@ -711,18 +813,18 @@ def update_home_images():
         flash("An unexpected error occurred while uploading home images.", "light")
         return render_template("503.html"), 503
     
-@app.route('/my-home-details/<uid>')
+@main.route('/my-home-details/<uid>')
 def my_house_view(uid):
     if 'user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     uid = session['user']
 
-    user_email_verified = admin_db.reference(f'users/{uid}/email_verified').get()
+    user_email_verified = repo.user_field(uid, 'email_verified')
 
     if user_email_verified != "Verified":
         flash("Please verify your email before adding home details.", "light")
-        return redirect(url_for('my_account'))
+        return redirect(url_for('main.my_account'))
 
     try:
         one_properties = all_users_properties_admin()
@@ -740,10 +842,11 @@ def my_house_view(uid):
 
 # Admin routes
 
-@app.route('/admin', methods=['GET', 'POST'])
+@main.route('/admin', methods=['GET', 'POST'])
+@limiter.limit(ADMIN_LOGIN_LIMIT, methods=['POST'])
 def admin():
     if 'admin-user' in session:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
 
     if request.method == 'POST':
         if 'user' in session:
@@ -764,24 +867,24 @@ def admin():
         if not db_alive():
             return jsonify({"status": "error", "message":  "We're unable to process your request at the moment. Please try again later."}), 503
 
-        if email == ADMIN_EMAIL and check_password_hash(ADMIN_PASSWORD_HASH, password):
+        if email == current_app.config['ADMIN_EMAIL'] and check_password_hash(current_app.config['ADMIN_PASSWORD_HASH'], password):
             session['admin-user'] = 'admin'
-            return jsonify({"redirect": url_for('dashboard')}), 200
+            return jsonify({"redirect": url_for('main.dashboard')}), 200
         else:
             return jsonify({"status": "error", "message": "Invalid email or password."}), 401
 
     return render_template("admin.html")
 
-@app.route('/dashboard', methods=['GET', 'POST'])
+@main.route('/dashboard', methods=['GET', 'POST'])
 def dashboard():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     house = all_users_properties_admin()
 
     try:
-        all_users = admin_db.reference('users').get()
-        total_users = len(all_users) if all_users else 0
+        all_users = repo.all_users()
+        total_users = len(all_users)
 
         verified_homes_count     = 0
         not_verified_homes_count = 0
@@ -803,17 +906,7 @@ def dashboard():
 
         total_homes = verified_homes_count + not_verified_homes_count
 
-        exchange_requests_raw = admin_db.reference('exchange_requests').get() or {}
-
-        exchange_requests = []
-        for user_id, requests in exchange_requests_raw.items():
-            if requests:
-                for request_id, req_data in requests.items():
-                    exchange_requests.append({
-                        'user_id': user_id,
-                        'request_id': request_id,
-                        **req_data
-                    })
+        exchange_requests = repo.exchange_requests()
 
         total_not_solved = sum(1 for req in exchange_requests if req.get('query_status') in ['Not Solved', 'Pending'])
 
@@ -831,14 +924,13 @@ def dashboard():
         flash("An error occurred while loading the dashboard. Please try again later.", "light")
         return render_template("503.html"), 503
     
-@app.route('/edit-user-profile/<uid>', methods=['GET', 'POST'])
+@main.route('/edit-user-profile/<uid>', methods=['GET', 'POST'])
 def edit_user_profile(uid: str):
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     try:
-        user_ref  = admin_db.reference(f'users/{uid}')
-        user_data = user_ref.get()
+        user_data = repo.get_user(uid)
         if not user_data:
             return render_template('404.html'), 404
 
@@ -851,12 +943,10 @@ def edit_user_profile(uid: str):
         flash("An unexpected error occurred while editing the profile.", "light")
         return render_template("503.html"), 503
     
-@app.route('/all-homes', methods=['GET', 'POST'])
+@main.route('/all-homes', methods=['GET', 'POST'])
 def all_homes():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
-
-    users_ref = admin_db.reference('users')
+        return redirect(url_for('main.home'))
 
     if request.method == 'POST':
         try:
@@ -866,7 +956,8 @@ def all_homes():
                 if not user_id:
                     return jsonify({'success': False, 'message': 'Missing user_id'}), 400
 
-                users_ref.child(user_id).child('properties').delete()
+                repo.delete_listing(user_id)
+                bump_listing_version(user_id)
 
                 folder_path = os.path.join('static', 'uploads', user_id)
                 if os.path.exists(folder_path):
@@ -881,68 +972,74 @@ def all_homes():
 
                 if not user_id or not new_status or guest_points is None:
                     flash('All fields are required.', 'light')
-                    return redirect(url_for('all_homes'))
+                    return redirect(url_for('main.all_homes'))
 
                 try:
                     guest_points = int(guest_points)
                 except ValueError:
                     flash('Guest points must be a valid number.', 'light')
-                    return redirect(url_for('all_homes'))
+                    return redirect(url_for('main.all_homes'))
 
                 update_data = {
                     'house_status': new_status,
                     'guest_points': guest_points
                 }
 
-                users_ref.child(user_id).child('properties').update(update_data)
+                repo.update_listing(user_id, update_data)
+                bump_listing_version(user_id)
                 flash('Home status and guest points updated successfully.', 'success')
-                return redirect(url_for('all_homes'))
+                return redirect(url_for('main.all_homes'))
 
         except Exception as e:
             if request.is_json:
                 return jsonify({'success': False, 'message': 'Error occurred.'}), 500
             flash('An error occurred. Please try again.', 'light')
-            return redirect(url_for('all_homes'))
+            return redirect(url_for('main.all_homes'))
 
     try:
-        all_users = users_ref.get() or {}
-        house_data = all_users_properties_admin() or {}
-
-        verified_homes = 0
-        not_verified_homes = 0
-        member_count = 0
-
-        for user in house_data.values():
-            status = (user.get("properties", {}).get("house_status") or "").strip()
-            if status == "Verified":
-                verified_homes += 1
-            elif status == "Not Verified":
-                not_verified_homes += 1
-
-            plan = (user.get("membership_details", {}).get("plan") or "").strip().lower()
-            if plan in {"silver", "gold", "platinum"}:
-                member_count += 1
-
         context = {
-            "total_users": len(all_users),
-            "all_users": house_data,
-            "total_homes": verified_homes + not_verified_homes,
-            "verified_homes_count": verified_homes,
-            "not_verified_homes_count": not_verified_homes,
-            "total_members": member_count,
+            "total_users": repo.count_users(),
+            **admin_homes_index().summary(),
         }
-
         return render_template("all-homes.html", **context)
 
     except Exception as e:
         flash("An error occurred while loading the home data.", "light")
         return render_template("503.html"), 503
 
+@main.route('/all-homes/data')
+def all_homes_data():
+    """One page of the All Homes table, sorted and filtered server-side."""
+    if 'admin-user' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    page     = request.args.get('page', 1, type=int)
+    per_page = min(max(request.args.get('per_page', DEFAULT_PER_PAGE, type=int), 1), MAX_PER_PAGE)
+    sort     = request.args.get('sort', 'uid')
+    if sort not in SORT_FIELDS:
+        sort = 'uid'
+
+    try:
+        result = admin_homes_page(
+            page       = page,
+            per_page   = per_page,
+            sort       = sort,
+            descending = request.args.get('order') == 'desc',
+            status     = request.args.get('status', '').strip(),
+            plan       = request.args.get('plan', '').strip(),
+            city       = request.args.get('city', '').strip(),
+            query      = request.args.get('q', '').strip(),
+        )
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Error occurred.'}), 500
+
+    return jsonify({'success': True, **result._asdict()}), 200
 
-@app.route('/admin-home-details/<uid>')
+
+@main.route('/admin-home-details/<uid>')
 def admin_home_details(uid):
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     try:
         one_properties = all_users_properties_admin()
@@ -960,13 +1057,12 @@ def admin_home_details(uid):
         return render_template("503.html"), 503
 
     
-@app.route('/admin-edit-home-details/<uid>', methods=['GET', 'POST'])
+@main.route('/admin-edit-home-details/<uid>', methods=['GET', 'POST'])
 def admin_edit_home_details(uid):
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     try:
-        user_ref = admin_db.reference(f'users/{uid}')
-        user_data = user_ref.get()
+        user_data = repo.get_user(uid)
 
         if not user_data:
             return render_template('404.html'), 404
@@ -979,12 +1075,7 @@ def admin_edit_home_details(uid):
 
             data["submitted_at"] = time
 
-            required = [
-                "title", "location_type", "property_type", "guest_capacity", "size",
-                "bedrooms", "bathrooms", "address", "city", "state",
-                "pin_code", "description","name", "email", "phone"
-            ]
-            if any(data[k] == "" or data[k] == [] for k in required):
+            if any(data[k] == "" or data[k] == [] for k in REQUIRED_PROPERTY_FIELDS):
                 flash("Please fill out every field.", "light")
                 return redirect(request.url)
 
@@ -994,10 +1085,11 @@ def admin_edit_home_details(uid):
                     flash(msg, "light")
                 return redirect(request.url)
 
-            admin_db.reference(f'users/{uid}/properties').update(data)
+            repo.update_listing(uid, data)
+            bump_listing_version(uid)
 
             flash("Home details updated successfully.", "success")
-            return redirect(url_for('admin_edit_home_details', uid=uid))
+            return redirect(url_for('main.admin_edit_home_details', uid=uid))
 
         return render_template("admin-edit-home-details.html", user=user_data, uid=uid)
 
@@ -1005,15 +1097,15 @@ def admin_edit_home_details(uid):
         flash("An unexpected error occurred while editing the homes details.", "light")
         return render_template("503.html"), 503
     
-@app.route('/admin-update-home-images/<uid>', methods=['GET', 'POST'])
+@main.route('/admin-update-home-images/<uid>', methods=['GET', 'POST'])
 def admin_update_home_images(uid):
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     try:
         if request.method == "POST":
             return homes_images(uid)
         
-        user_data = admin_db.reference(f'users/{uid}').get()
+        user_data = repo.get_user(uid)
         if not user_data:
             return render_template('404.html'), 404
         
@@ -1022,10 +1114,51 @@ def admin_update_home_images(uid):
         flash("An unexpected error occurred while editing the home images.", "light")
         return render_template("503.html"), 503
     
-@app.route('/update-membership', methods=['GET', 'POST'])
+@main.route('/admin-import-homes', methods=['GET', 'POST'])
+def admin_import_homes():
+    if 'admin-user' not in session:
+        return redirect(url_for('main.home'))
+
+    if request.method == 'POST':
+        rows_file = request.files.get('rows_file')
+        if not rows_file or not rows_file.filename:
+            flash("Please choose a CSV or JSON file to import.", "light")
+            return redirect(url_for('main.admin_import_homes'))
+        try:
+            job_id = start_import(current_app._get_current_object(), rows_file, request.files.get('images_archive'))
+            return redirect(url_for('main.admin_import_job', job_id=job_id))
+        except InvalidUpload as e:
+            flash(str(e), "light")
+        except Exception as e:
+            flash("An error occurred while starting the import. Please try again.", "light")
+        return redirect(url_for('main.admin_import_homes'))
+
+    return render_template("admin-import-homes.html", job=None, jobs=recent_jobs(current_app))
+
+@main.route('/admin-import-homes/<job_id>')
+def admin_import_job(job_id):
+    if 'admin-user' not in session:
+        return redirect(url_for('main.home'))
+
+    job = load_job(current_app, job_id)
+    if not job:
+        return render_template('404.html'), 404
+    return render_template("admin-import-homes.html", job=job, jobs=[])
+
+@main.route('/admin-import-homes/<job_id>/progress')
+def admin_import_progress(job_id):
+    if 'admin-user' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    job = load_job(current_app, job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Import not found'}), 404
+    return jsonify({'success': True, **job}), 200
+
+@main.route('/update-membership', methods=['GET', 'POST'])
 def update_membership():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     try:
         if request.method == 'POST':
@@ -1033,10 +1166,9 @@ def update_membership():
             action  = request.form.get('action', 'update')
 
             try:
-                ref = admin_db.reference(f'users/{user_id}/membership_details')
-                
                 if action == 'remove':
-                    ref.delete()
+                    repo.remove_membership(user_id)
+                    bump_listing_version(user_id)
                     flash("Membership details removed successfully!", "success")
                 else:
                     membership_data = {
@@ -1044,15 +1176,16 @@ def update_membership():
                         'start_date': request.form.get('start_date'),
                         'end_date'  : request.form.get('end_date')
                     }
-                    ref.update(membership_data)
+                    repo.set_membership(user_id, membership_data)
+                    bump_listing_version(user_id)
                     flash("Membership details saved successfully!", "success")
             except Exception as e:
                 flash("Error updating membership details. Please try again later.", "light")
 
-            return redirect(url_for('update_membership'))
+            return redirect(url_for('main.update_membership'))
 
         house       = all_users_properties_admin()
-        all_users   = admin_db.reference('users').get() or {}
+        all_users   = repo.all_users()
         total_users = len(all_users)
 
         total_members = sum(
@@ -1073,27 +1206,26 @@ def update_membership():
         return render_template("503.html"), 503
 
 
-@app.route('/membership-request', methods=['GET', 'POST'])
+@main.route('/membership-request', methods=['GET', 'POST'])
 def membership_request():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     try:
         if request.method == 'POST':
             user_id = request.form.get('user_id')
 
             try:
-                ref = admin_db.reference(f'plan_inquiries/{user_id}')
-                ref.update({
+                repo.update_plan_inquiry(user_id, {
                     'action': request.form.get('dropdown_option')
                 })
                 flash("Membership request updated", "success")
             except Exception as e:
                 flash("Error updating membership request. Please try again later.", "light")
 
-            return redirect(url_for('membership_request'))
+            return redirect(url_for('main.membership_request'))
 
-        member_request_data = admin_db.reference('plan_inquiries').get() or {}
+        member_request_data = repo.plan_inquiries()
 
         # Sort by 'submitted_at' in descending order
         def parse_datetime(submitted_at):
@@ -1127,26 +1259,25 @@ def membership_request():
         flash("An unexpected error occurred while updating membership details.", "light")
         return render_template("503.html"), 503
 
-@app.route('/contact-form', methods=['GET', 'POST'])
+@main.route('/contact-form', methods=['GET', 'POST'])
 def contact_form():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     try:
         if request.method == 'POST':
             user_id = request.form.get('user_id')
             try:
-                ref = admin_db.reference(f'contact_form/{user_id}')
-                ref.update({
+                repo.update_contact_form(user_id, {
                     'query_status': request.form.get('dropdown_option')
                 })
                 flash("Membership request updated", "success")
             except Exception as e:
                 flash("Error updating membership request. Please try again later.", "light")
-            return redirect(url_for('contact_form'))
+            return redirect(url_for('main.contact_form'))
 
         # Fetch contact form data
-        contact_form_data = admin_db.reference('contact_form').get() or {}
+        contact_form_data = repo.contact_forms()
 
         # Sort by submitted_at datetime descending
         def parse_datetime(submitted_at):
@@ -1180,10 +1311,10 @@ def contact_form():
         flash("An unexpected error occurred while updating membership details.", "light")
         return render_template("503.html"), 503
 
-@app.route('/exchange-request', methods=['GET', 'POST'])
+@main.route('/exchange-request', methods=['GET', 'POST'])
 def exchange_request():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     try:
         if request.method == 'POST':
@@ -1192,25 +1323,14 @@ def exchange_request():
             new_status = request.form.get('dropdown_option')
 
             try:
-                ref = admin_db.reference(f'exchange_requests/{user_id}/{request_id}')
-                ref.update({'query_status': new_status})
+                repo.update_exchange_request(user_id, request_id, {'query_status': new_status})
                 flash("Exchange request updated", "success")
             except Exception as e:
                 flash("Error updating exchange request. Please try again later.", "light")
 
-            return redirect(url_for('exchange_request'))
+            return redirect(url_for('main.exchange_request'))
 
-        exchange_requests_raw = admin_db.reference('exchange_requests').get() or {}
-
-        exchange_requests = []
-        for user_id, requests in exchange_requests_raw.items():
-            if requests:
-                for request_id, req_data in requests.items():
-                    exchange_requests.append({
-                        'user_id': user_id,
-                        'request_id': request_id,
-                        **req_data
-                    })
+        exchange_requests = repo.exchange_requests()
 
         def parse_datetime(dt_str):
             try:
@@ -1234,12 +1354,12 @@ def exchange_request():
         flash("An unexpected error occurred while processing exchange requests.", "light")
         return render_template("503.html"), 503
 
-@app.route('/get-user-details/<user_id>')
+@main.route('/get-user-details/<user_id>')
 def get_user_details(user_id):
     if 'admin-user' not in session:
         return {'status': 'unauthorized'}, 403
     try:
-        user_data = admin_db.reference(f'users/{user_id}').get()
+        user_data = repo.get_user(user_id)
         if user_data:
             return {
                 'status': 'success',
@@ -1250,12 +1370,10 @@ def get_user_details(user_id):
     except Exception as e:
         return {'status': 'error', 'message': str(e)}, 500
     
-@app.route('/user-gp-wallet', methods=['GET', 'POST'])
+@main.route('/user-gp-wallet', methods=['GET', 'POST'])
 def user_gp_wallet():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
-
-    users_ref = admin_db.reference('users')
+        return redirect(url_for('main.home'))
 
     if request.method == 'POST':
         try:
@@ -1264,36 +1382,28 @@ def user_gp_wallet():
 
             if not user_id or not guest_points_:
                 flash('All fields are required.', 'light')
-                return redirect(url_for('user_gp_wallet'))
+                return redirect(url_for('main.user_gp_wallet'))
 
             try:
                 increment = int(guest_points_)
             except ValueError:
                 flash('Guest points must be a valid number.', 'light')
-                return redirect(url_for('user_gp_wallet'))
-
-            gp_ref = users_ref.child(user_id).child('gp_wallet')
-            current = gp_ref.child('guest_points').get()
-            try:
-                current = int(current)
-            except (TypeError, ValueError):
-                current = 0
+                return redirect(url_for('main.user_gp_wallet'))
 
-            new_total = current + increment
-            gp_ref.update({'guest_points': new_total})
+            repo.add_guest_points(user_id, increment)
 
             flash('Guest points updated successfully.', 'success')
-            return redirect(url_for('user_gp_wallet'))
+            return redirect(url_for('main.user_gp_wallet'))
 
         except Exception as e:
             if request.is_json:
                 return jsonify({'success': False, 'message': 'Error occurred.'}), 500
             flash('An error occurred. Please try again.', 'light')
-            return redirect(url_for('user_gp_wallet'))
+            return redirect(url_for('main.user_gp_wallet'))
 
 
     try:
-        all_users = users_ref.get() or {}
+        total_users = repo.count_users()
         house_data  = all_users_properties_admin() or {}
 
         filtered_house_data = {
@@ -1310,7 +1420,7 @@ def user_gp_wallet():
                 verified_homes += 1
 
         context = {
-            "total_users"        : len(all_users),
+            "total_users"        : total_users,
             "all_users"          : filtered_house_data,
             "verified_homes_count": verified_homes,
             "total_members"      : len(filtered_house_data),
@@ -1322,13 +1432,13 @@ def user_gp_wallet():
         flash("An error occurred while loading the home data.", "light")
         return render_template("503.html"), 503
 
-@app.route('/subscribe-mails', methods=['GET'])
+@main.route('/subscribe-mails', methods=['GET'])
 def subscribe_mail():
     if 'admin-user' not in session:
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
     try:
-        raw = admin_db.reference('subscriptions').get() or {}
+        raw = repo.subscriptions()
         
         subscriptions = []
         for data in raw.values():
@@ -1352,15 +1462,33 @@ def subscribe_mail():
         flash("An error occurred while loading the subscribe mails.", "light")
         return render_template("503.html"), 503
 
+@main.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Admin session, or a bearer token for the scraper
+    token    = current_app.config.get('METRICS_TOKEN')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if 'admin-user' not in session and not (token and hmac.compare_digest(supplied, token)):
+        abort(404)
+
+    return Response(metrics.render_prometheus(), content_type=metrics.CONTENT_TYPE)
 
-@app.route('/logout')
+@main.route('/logout')
 def logout():
     session.clear()
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
 
+@main.app_errorhandler(429)
+def too_many_requests(e):
+    message = "Too many attempts. Please try again later."
+    if request.endpoint in JSON_ENDPOINTS:
+        return jsonify({"status": "error", "message": message}), 429
+    flash(message, "light")
+    return redirect(request.path), 303
+
 if __name__ == '__main__':
-    app.run(port=5000, debug=True)
\ No newline at end of file
+    # DEBUG up front, so template warm-up is skipped and templates reload
+    create_app({'DEBUG': True}).run(port=5000, debug=True)
\ No newline at end of file
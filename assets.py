@@ -0,0 +1,108 @@
+import os
+import hashlib
+import mimetypes
+import threading
+from typing import Dict, Tuple, Optional
+from flask import Flask, request, session, url_for, send_from_directory, current_app
+
+from compression import accepted_encoding
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+NO_STORE_CACHE  = "no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0"
+
+BUNDLE_FOLDER = "dist"
+
+# Preferred first; matched against Accept-Encoding
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_fingerprints : Dict[str, Tuple[float, str]] = {}
+_lock         = threading.Lock()
+
+def static_fingerprint(static_folder: str, filename: str) -> str:
+    """Short content hash of a static file, recomputed only when its mtime changes."""
+    path = os.path.join(static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return ""
+
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    digest = hashlib.md5()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(chunk)
+
+    fingerprint = digest.hexdigest()[:12]
+    with _lock:
+        _fingerprints[path] = (mtime, fingerprint)
+    return fingerprint
+
+def asset_bundle(name: str) -> Optional[str]:
+    """Fingerprinted URL of a built bundle (see build_assets.py), or None if not built."""
+    filename = f"{BUNDLE_FOLDER}/{name}"
+    if not os.path.isfile(os.path.join(current_app.static_folder, filename)):
+        return None
+    return url_for('static', filename=filename)
+
+def send_static(app: Flask, filename: str):
+    """Static view that prefers a precompressed .br/.gz sibling when the client accepts it."""
+    available = {encoding: suffix for encoding, suffix in PRECOMPRESSED
+                 if os.path.isfile(os.path.join(app.static_folder, filename + suffix))}
+    encoding  = accepted_encoding(request.headers.get("Accept-Encoding", ""), available)
+    if encoding:
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_from_directory(app.static_folder, filename + available[encoding], mimetype=mimetype)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = send_from_directory(app.static_folder, filename)
+    if available:
+        response.vary.add("Accept-Encoding")
+    return response
+
+def is_authenticated() -> bool:
+    return 'user' in session or 'admin-user' in session
+
+def apply_cache_policy(app: Flask, response):
+    """
+    Fingerprinted static URLs are cached forever, other static files and
+    anonymous pages revalidate, authenticated pages are never stored unless
+    they carry a listing ETag.
+    """
+    if request.endpoint == 'static':
+        filename = (request.view_args or {}).get('filename', '')
+        version  = request.args.get('v')
+        if response.status_code == 200 and version and version == static_fingerprint(app.static_folder, filename):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    if is_authenticated() and response.get_etag()[0]:
+        # Conditional listing pages: per-user ETag, revalidated every time
+        response.headers["Cache-Control"] = "private, no-cache"
+    elif is_authenticated():
+        response.headers["Cache-Control"] = NO_STORE_CACHE
+        response.headers["Pragma"]        = "no-cache"
+        response.headers["Expires"]       = "0"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+        response.vary.add("Cookie")
+    return response
+
+def init_assets(app: Flask) -> None:
+    app.view_functions['static'] = lambda filename: send_static(app, filename)
+    app.jinja_env.globals['asset_bundle'] = asset_bundle
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            fingerprint = static_fingerprint(app.static_folder, values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+
+    @app.after_request
+    def cache_policy(response):
+        return apply_cache_policy(app, response)
@@ -0,0 +1,111 @@
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, Tuple
+
+from bench.fake_auth import FakeAuth
+from utils import AMENITIES, UNIQUE_FACILITIES, KIDS_FRIENDLY, ECO_FRIENDLY_AMENITIES, HOUSE_RULES, REMOTE_FRIENDLY
+
+# Synthetic RTDB trees shaped like production: users with profile, membership
+# and (for about half) a listed property, plus exchange requests, contact
+# forms, plan inquiries and newsletter subscriptions.
+
+PASSWORD       = "Bench@1234"
+ADMIN_EMAIL    = "admin@example.com"
+ADMIN_PASSWORD = "Admin@1234"
+
+CITIES         = ["Mumbai", "Delhi", "Bengaluru", "Chennai", "Kolkata", "Pune", "Jaipur", "Goa",
+                  "Shimla", "Manali", "Rishikesh", "Udaipur", "Kochi", "Mysuru", "Ooty", "Darjeeling"]
+STATES         = ["Maharashtra", "Delhi", "Karnataka", "Tamil Nadu", "West Bengal", "Rajasthan", "Goa", "Kerala"]
+LOCATION_TYPES = ["Mountain", "Beach", "City", "Wildlife"]
+PROPERTY_TYPES = ["Bungalow", "Townhome", "Villas", "Farmhouse", "Apartment"]
+PLANS          = ["", "", "Silver", "Gold", "Platinum"]
+HOUSE_STATUSES = ["Verified", "Verified", "Not Verified"]
+AMENITIES      = list(AMENITIES)
+FACILITIES     = list(UNIQUE_FACILITIES)
+WORDS          = ["cosy", "sunny", "quiet", "spacious", "modern", "heritage", "garden", "lake", "hill", "sea",
+                  "view", "retreat", "home", "villa", "cottage", "studio", "family", "friendly", "bright", "calm"]
+
+def uid_for(index: int) -> str:
+    return f"u{index:07d}"
+
+def email_for(index: int) -> str:
+    return f"member{index}@example.com"
+
+def _stamp(rng: random.Random) -> str:
+    moment = datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(0, 60 * 24 * 600))
+    return moment.strftime("%d-%m-%Y, %H:%M")
+
+def _property(rng: random.Random, index: int) -> Dict[str, Any]:
+    city = rng.choice(CITIES)
+    return {
+        "title"                    : " ".join(rng.sample(WORDS, 4)).title(),
+        "location_type"            : rng.choice(LOCATION_TYPES),
+        "property_type"            : rng.choice(PROPERTY_TYPES),
+        "guest_capacity"           : str(rng.randint(1, 5)),
+        "size"                     : str(rng.randint(400, 4000)),
+        "bedrooms"                 : str(rng.randint(1, 5)),
+        "bathrooms"                : str(rng.randint(1, 5)),
+        "address"                  : f"{rng.randint(1, 999)} Main Road, {city}",
+        "city"                     : city,
+        "state"                    : rng.choice(STATES),
+        "pin_code"                 : str(rng.randint(110001, 855999)),
+        "description"              : " ".join(rng.choices(WORDS, k=60)),
+        "name"                     : f"Member {index}",
+        "email"                    : email_for(index),
+        "phone"                    : f"9{rng.randint(100000000, 999999999)}",
+        "amenities"                : rng.sample(AMENITIES, rng.randint(2, 8)),
+        "unique_facilities"        : rng.sample(FACILITIES, rng.randint(0, 4)),
+        "kids_friendly"            : rng.sample(KIDS_FRIENDLY, rng.randint(0, 2)),
+        "eco_friendly_amenities"   : rng.sample(ECO_FRIENDLY_AMENITIES, rng.randint(0, 2)),
+        "house_rules"              : rng.sample(HOUSE_RULES, rng.randint(1, 3)),
+        "remote_friendly"          : rng.sample(REMOTE_FRIENDLY, rng.randint(0, 2)),
+        "preferred_location_types" : rng.sample(LOCATION_TYPES, rng.randint(0, 2)),
+        "house_status"             : rng.choice(HOUSE_STATUSES),
+        "guest_points"             : str(rng.choice([0, 100, 250, 500])),
+        "images"                   : [f"/static/uploads/{uid_for(index)}/{n}.webp" for n in range(rng.randint(1, 5))],
+    }
+
+def generate(users: int, seed: int = 42, listed_ratio: float = 0.5, requests_per_listing: float = 0.3) -> Tuple[Dict[str, Any], FakeAuth]:
+    """Return an RTDB tree with ``users`` members and a FakeAuth holding their accounts."""
+    rng  = random.Random(seed)
+    auth = FakeAuth()
+    tree : Dict[str, Any] = {"users": {}, "exchange_requests": {}, "contact_form": {},
+                             "plan_inquiries": {}, "subscriptions": {}, "healthcheck": {"ok": True}}
+
+    for index in range(users):
+        uid  = uid_for(index)
+        user = {
+            "name"               : f"Member {index}",
+            "phone"              : f"9{rng.randint(100000000, 999999999)}",
+            "email"              : email_for(index),
+            "email_verified"     : "Verified",
+            "submitted_at"       : _stamp(rng),
+            "membership_details" : {"plan": rng.choice(PLANS)},
+            "gp_wallet"          : {"guest_points": str(rng.choice([0, 100, 250]))},
+        }
+        if rng.random() < listed_ratio:
+            user["properties"] = _property(rng, index)
+            received = rng.randint(1, 4) if rng.random() < requests_per_listing else 0
+            for n in range(received):
+                tree["exchange_requests"].setdefault(uid, {})[f"r{index:07d}{n:02d}"] = {
+                    "name": f"Guest {n}", "email": f"guest{n}@example.com", "phone": "9876543210",
+                    "message": "I'm interested in this home for exchange.", "user_type": "User",
+                    "guest_point": "100", "house_status": "Verified",
+                    "query_status": rng.choice(["Not Solved", "Solved", "Pending"]), "submitted_at": _stamp(rng),
+                }
+
+        tree["users"][uid] = user
+        auth.add_account(uid, user["email"], PASSWORD)
+
+        if index % 20 == 0:
+            tree["contact_form"][f"c{index:07d}"] = {
+                "name": user["name"], "email": user["email"], "phone": user["phone"],
+                "message": "Please call me back.", "query_status": "Not Solved", "submitted_at": _stamp(rng)}
+        if index % 25 == 0:
+            tree["plan_inquiries"][f"p{index:07d}"] = {
+                "fullname": user["name"], "phone": user["phone"], "email": user["email"],
+                "plan": rng.choice(PLANS[2:]), "action": "Not Connected", "submitted_at": _stamp(rng)}
+        if index % 10 == 0:
+            tree["subscriptions"][f"s{index:07d}"] = {"email": user["email"], "submitted_at": _stamp(rng)}
+
+    return tree, auth
@@ -0,0 +1,45 @@
+import os
+import tempfile
+from typing import Dict, Any, Tuple
+
+from werkzeug.security import generate_password_hash
+
+import clients
+from repository import repo
+from app import create_app
+from bench import datasets
+from bench.fake_auth import FakeAuth
+from bench.fake_rtdb import FakeDatabase
+
+# Builds the real application on top of the in-memory database and auth
+# stand-ins, with rate limits off and scratch files in a temporary directory.
+# The search index is built by the first (untimed) search rather than in the
+# background, so it does not compete with other routes being timed.
+# With backend="sqlite" the dataset is also loaded into a scratch SQLite
+# repository and the app reads from that instead.
+
+def build_app(users: int, seed: int = 42, latency: float = 0.0, seconds_per_byte: float = 0.0,
+              config: Dict[str, Any] = None, backend: str = "rtdb") -> Tuple[Any, FakeDatabase, FakeAuth]:
+    tree, auth = datasets.generate(users, seed=seed)
+    db         = FakeDatabase(tree, latency=latency, seconds_per_byte=seconds_per_byte)
+    clients.use_backends(db=db, auth=auth, auth_client=auth)
+
+    scratch = tempfile.mkdtemp(prefix="cosmo-bench-")
+    app = create_app({
+        "SECRET_KEY"           : "bench",
+        "ADMIN_EMAIL"          : datasets.ADMIN_EMAIL,
+        "ADMIN_PASSWORD_HASH"  : generate_password_hash(datasets.ADMIN_PASSWORD),
+        "RATELIMIT_ENABLED"    : False,
+        "WRITE_QUEUE_PATH"     : os.path.join(scratch, "write_queue.sqlite3"),
+        "LISTING_LOG_PATH"     : os.path.join(scratch, "listing_changes.log"),
+        "DATA_BACKEND"         : backend,
+        "SQLITE_DATABASE_PATH" : os.path.join(scratch, "cosmo.sqlite3"),
+        "SESSION_SQLITE_PATH"  : os.path.join(scratch, "sessions.sqlite3"),
+        "METRICS_DIR"          : os.path.join(scratch, "metrics"),
+        "SEARCH_WARM_INDEX"    : False,
+        "MATCH_ENGINE"         : False,
+        **(config or {}),
+    })
+    if backend == "sqlite":
+        repo.import_tree(tree)
+    return app, db, auth
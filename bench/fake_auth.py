@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+# Stand-ins for firebase_admin.auth and the identity REST client. Accounts live
+# in memory; an id token is simply "token:<uid>". Errors carry the same codes
+# the app matches on (EMAIL_EXISTS, INVALID_LOGIN_CREDENTIALS).
+
+class FakeAuthError(Exception):
+    pass
+
+class FakeAuth:
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.accounts : Dict[str, Dict[str, Any]] = {}
+        self.by_email : Dict[str, str] = {}
+        self.outbox   : List[Dict[str, str]] = []
+
+    def add_account(self, uid: str, email: str, password: str, email_verified: bool = True) -> None:
+        with self.lock:
+            self.accounts[uid]   = {"email": email, "password": password, "email_verified": email_verified}
+            self.by_email[email] = uid
+
+    def _session(self, uid: str) -> Dict[str, Any]:
+        return {"localId": uid, "idToken": f"token:{uid}", "refreshToken": f"refresh:{uid}",
+                "email": self.accounts[uid]["email"]}
+
+    # firebase_admin.auth
+
+    def verify_id_token(self, id_token: str, check_revoked: bool = False) -> Dict[str, Any]:
+        uid = id_token.split(":", 1)[1] if id_token.startswith("token:") else None
+        if uid not in self.accounts:
+            raise FakeAuthError("INVALID_ID_TOKEN")
+        return {"uid": uid, "email": self.accounts[uid]["email"]}
+
+    def get_user(self, uid: str) -> SimpleNamespace:
+        account = self.accounts.get(uid)
+        if account is None:
+            raise FakeAuthError("USER_NOT_FOUND")
+        return SimpleNamespace(uid=uid, email=account["email"], email_verified=account["email_verified"])
+
+    # Identity REST client (clients.AuthClient)
+
+    def create_user_with_email_and_password(self, email: str, password: str) -> Dict[str, Any]:
+        with self.lock:
+            if email in self.by_email:
+                raise FakeAuthError('{"error": {"message": "EMAIL_EXISTS"}}')
+            uid = f"fake{len(self.accounts):08d}"
+        self.add_account(uid, email, password, email_verified=False)
+        return self._session(uid)
+
+    def sign_in_with_email_and_password(self, email: str, password: str) -> Dict[str, Any]:
+        uid = self.by_email.get(email)
+        if uid is None or self.accounts[uid]["password"] != password:
+            raise FakeAuthError('{"error": {"message": "INVALID_LOGIN_CREDENTIALS"}}')
+        return self._session(uid)
+
+    def send_password_reset_email(self, email: str) -> Dict[str, Any]:
+        with self.lock:
+            self.outbox.append({"type": "PASSWORD_RESET", "email": email})
+        return {"email": email}
@@ -0,0 +1,236 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+from clients import record_transfer
+from write_queue import push_id
+
+# In-memory stand-in for firebase_admin.db, enough of the Reference/Query API
+# for the app: get (incl. shallow), set, update (multi-path), push, delete,
+# child, order_by_child/key/value, limit_to_first/last, start_at, end_at and
+# equal_to.
+#
+# Values cross the boundary as JSON, as they do over the wire, so a read costs
+# a serialise + parse proportional to its size. An optional per-call latency
+# and per-byte cost approximate the network.
+
+def _split(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+def _wire(value: Any) -> Any:
+    return json.loads(json.dumps(value)) if value is not None else None
+
+def _prune(value: Any) -> Any:
+    """RTDB stores no nulls or empty objects."""
+    if isinstance(value, dict):
+        cleaned = {k: _prune(v) for k, v in value.items()}
+        cleaned = {k: v for k, v in cleaned.items() if v is not None}
+        return cleaned or None
+    if isinstance(value, list):
+        # Arrays are stored as objects keyed by index
+        return _prune({str(i): v for i, v in enumerate(value)})
+    return value
+
+def _as_array(value: Any) -> Any:
+    """Objects with keys 0..n-1 come back as lists, as the real client returns them."""
+    if isinstance(value, dict):
+        value = {k: _as_array(v) for k, v in value.items()}
+        if value and all(k.isdigit() for k in value):
+            indices = sorted(int(k) for k in value)
+            if indices[-1] < 2 * len(indices):
+                return [value.get(str(i)) for i in range(indices[-1] + 1)]
+    return value
+
+class FakeDatabase:
+    def __init__(self, data: Optional[Dict[str, Any]] = None, latency: float = 0.0, seconds_per_byte: float = 0.0):
+        self.root             = _prune(_wire(data)) or {}
+        self.latency          = latency
+        self.seconds_per_byte = seconds_per_byte
+        self.lock             = threading.RLock()
+        self.calls            = 0
+
+    def reference(self, path: str = "/", app=None, url=None) -> "FakeReference":
+        return FakeReference(self, _split(path))
+
+    def _transfer(self, payload: str, sent: bool = False) -> None:
+        self.calls += 1
+        if sent:
+            record_transfer(sent=len(payload))
+        else:
+            record_transfer(received=len(payload))
+        delay = self.latency + self.seconds_per_byte * len(payload)
+        if delay:
+            time.sleep(delay)
+
+    def _node(self, segments: List[str]) -> Any:
+        node = self.root
+        for segment in segments:
+            if not isinstance(node, dict) or segment not in node:
+                return None
+            node = node[segment]
+        return node
+
+    def _write(self, segments: List[str], value: Any) -> None:
+        value = _prune(value)
+        if not segments:
+            self.root = value or {}
+            return
+
+        parents = [self.root]
+        node    = self.root
+        for segment in segments[:-1]:
+            child = node.get(segment)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[segment] = {}
+            node = child
+            parents.append(node)
+
+        if value is None:
+            node.pop(segments[-1], None)
+            # Drop parents left empty by the delete
+            for depth in range(len(segments) - 1, 0, -1):
+                if parents[depth]:
+                    break
+                parents[depth - 1].pop(segments[depth - 1], None)
+        else:
+            node[segments[-1]] = value
+
+class FakeReference:
+    def __init__(self, db: FakeDatabase, segments: List[str]):
+        self._db       = db
+        self._segments = segments
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._segments[-1] if self._segments else None
+
+    @property
+    def path(self) -> str:
+        return "/" + "/".join(self._segments)
+
+    @property
+    def parent(self) -> Optional["FakeReference"]:
+        return FakeReference(self._db, self._segments[:-1]) if self._segments else None
+
+    def child(self, path: str) -> "FakeReference":
+        return FakeReference(self._db, self._segments + _split(path))
+
+    def get(self, etag: bool = False, shallow: bool = False) -> Any:
+        with self._db.lock:
+            node = self._db._node(self._segments)
+            if shallow and isinstance(node, dict):
+                node = {k: True for k in node}
+            payload = json.dumps(node)
+        self._db._transfer(payload)
+        value = _as_array(json.loads(payload))
+        return (value, "fake-etag") if etag else value
+
+    def set(self, value: Any) -> None:
+        if value is None:
+            raise ValueError("Value must not be None.")
+        payload = json.dumps(value)
+        self._db._transfer(payload, sent=True)
+        with self._db.lock:
+            self._db._write(self._segments, json.loads(payload))
+
+    def update(self, value: Dict[str, Any]) -> None:
+        if not value or not isinstance(value, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        payload = json.dumps(value)
+        self._db._transfer(payload, sent=True)
+        with self._db.lock:
+            for path, child in json.loads(payload).items():
+                self._db._write(self._segments + _split(path), child)
+
+    def push(self, value: Any = "") -> "FakeReference":
+        if value is None:
+            raise ValueError("Value must not be None.")
+        ref = self.child(push_id())
+        ref.set(value)
+        return ref
+
+    def delete(self) -> None:
+        self._db._transfer("", sent=True)
+        with self._db.lock:
+            self._db._write(self._segments, None)
+
+    def order_by_child(self, path: str) -> "FakeQuery":
+        return FakeQuery(self, lambda key, value: _child_value(value, _split(path)))
+
+    def order_by_key(self) -> "FakeQuery":
+        return FakeQuery(self, lambda key, value: key)
+
+    def order_by_value(self) -> "FakeQuery":
+        return FakeQuery(self, lambda key, value: value)
+
+def _child_value(value: Any, segments: List[str]) -> Any:
+    for segment in segments:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(segment)
+    return value
+
+def _sort_key(value: Any) -> tuple:
+    # RTDB ordering: null < false < true < numbers < strings < objects
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4,)
+
+class FakeQuery:
+    def __init__(self, ref: FakeReference, order):
+        self._ref    = ref
+        self._order  = order
+        self._start  = None
+        self._end    = None
+        self._first  = None
+        self._last   = None
+
+    def start_at(self, value: Any) -> "FakeQuery":
+        self._start = value
+        return self
+
+    def end_at(self, value: Any) -> "FakeQuery":
+        self._end = value
+        return self
+
+    def equal_to(self, value: Any) -> "FakeQuery":
+        self._start = self._end = value
+        return self
+
+    def limit_to_first(self, limit: int) -> "FakeQuery":
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit: int) -> "FakeQuery":
+        self._last = limit
+        return self
+
+    def get(self) -> "OrderedDict[str, Any]":
+        db = self._ref._db
+        with db.lock:
+            node = db._node(self._ref._segments)
+            children = list(node.items()) if isinstance(node, dict) else []
+
+        ranked = sorted(((_sort_key(self._order(k, v)), k, v) for k, v in children), key=lambda t: (t[0], t[1]))
+        if self._start is not None:
+            ranked = [t for t in ranked if t[0] >= _sort_key(self._start)]
+        if self._end is not None:
+            ranked = [t for t in ranked if t[0] <= _sort_key(self._end)]
+        if self._first is not None:
+            ranked = ranked[:self._first]
+        if self._last is not None:
+            ranked = ranked[-self._last:]
+
+        payload = json.dumps([[k, v] for _, k, v in ranked])
+        db._transfer(payload)
+        return OrderedDict((k, _as_array(v)) for k, v in json.loads(payload))
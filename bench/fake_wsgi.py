@@ -0,0 +1,12 @@
+import os
+from bench.environment import build_app
+
+# The app on the in-memory stand-ins, for serving with gunicorn:
+#
+#     BENCH_USERS=10000 gunicorn -c gunicorn.conf.py bench.fake_wsgi:app
+#
+# Each worker holds its own copy of the dataset, so writes made through one
+# worker are not visible to the others.
+
+app, db, auth = build_app(int(os.getenv("BENCH_USERS", 1000)), seed=int(os.getenv("BENCH_SEED", 42)),
+                          latency=float(os.getenv("BENCH_LATENCY_MS", 0)) / 1000)
@@ -0,0 +1,270 @@
+"""
+Load test: virtual users replaying site journeys concurrently.
+
+    python -m bench.load_test                                  # in-process server, 1k users
+    python -m bench.load_test --concurrency 16 --duration 60 --mix browse=70,admin=10,exchange=20
+    python -m bench.load_test --url http://127.0.0.1:8000      # e.g. gunicorn bench.fake_wsgi:app
+
+Without --url the app is served in-process (werkzeug, threaded) on the fake
+database and auth. With --url, point it at an instance started with the same
+BENCH_USERS/BENCH_SEED so the journeys pick existing listings and accounts.
+
+The upload journey writes images under static/uploads/<uid> of the server,
+and those folders are removed after the run. With --url that needs the
+target's app root: the journey only runs when --upload-root is given (for
+bench.fake_wsgi served from this checkout, --upload-root .).
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import random
+import shutil
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List
+
+import requests
+from PIL import Image
+
+from bench import datasets
+
+class Recorder:
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.samples : Dict[str, List[float]] = defaultdict(list)
+        self.errors  : Dict[str, int] = defaultdict(int)
+
+    def record(self, step: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.samples[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+class VirtualUser:
+    """One browser: its own cookie jar, replaying journeys against ``base_url``."""
+
+    def __init__(self, base_url: str, recorder: Recorder, catalogue: Dict[str, Any], rng: random.Random):
+        self.base_url  = base_url.rstrip("/")
+        self.recorder  = recorder
+        self.catalogue = catalogue
+        self.rng       = rng
+        self.http      = requests.Session()
+
+    def step(self, name: str, method: str, path: str, ok_statuses=(200,), **kwargs) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=60, **kwargs)
+            ok = response.status_code in ok_statuses
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.record(name, time.perf_counter() - started, ok)
+        return response
+
+    def fresh_session(self) -> None:
+        self.http.cookies.clear()
+
+    def login(self, journey: str, index: int) -> None:
+        self.step(f"{journey}:login", "POST", "/login",
+                  data={"email": datasets.email_for(index), "password": datasets.PASSWORD})
+
+    # Journeys
+
+    def browse(self) -> None:
+        self.fresh_session()
+        self.step("browse:home_exchange", "GET", "/home-exchange")
+        self.step("browse:filter", "GET", "/home-exchange", params={
+            "city"          : self.rng.choice(datasets.CITIES).lower(),
+            "location_type" : self.rng.choice(datasets.LOCATION_TYPES).lower(),
+        })
+        self.step("browse:page", "GET", "/home-exchange", params={"page": self.rng.randint(2, 5)})
+        for uid in self.rng.sample(self.catalogue["listings"], 2):
+            self.step("browse:home_details", "GET", f"/home-details/{uid}")
+
+    def exchange(self) -> None:
+        self.fresh_session()
+        self.login("exchange", self.rng.randrange(self.catalogue["users"]))
+        uid = self.rng.choice(self.catalogue["listings"])
+        self.step("exchange:home_details", "GET", f"/home-details/{uid}")
+        self.step("exchange:submit", "POST", f"/home-details/{uid}", data={"user-exchange": "1"})
+
+    def signup(self) -> None:
+        self.fresh_session()
+        email = f"load-{self.rng.getrandbits(48):x}@example.com"
+        self.step("signup:submit", "POST", "/signup", data={
+            "fullname" : "Load Tester",
+            "phone"    : "9876543210",
+            "email"    : email,
+            "password" : datasets.PASSWORD,
+        })
+
+    def upload(self) -> None:
+        self.fresh_session()
+        index = self.rng.choice(self.catalogue["listing_indices"])
+        self.login("upload", index)
+        self.catalogue["uploaded"].add(datasets.uid_for(index))
+        self.step("upload:image", "POST", "/update-home-images",
+                  data={"cropped_image1": self.catalogue["image"]})
+
+    def admin(self) -> None:
+        self.fresh_session()
+        self.step("admin:login", "POST", "/admin",
+                  data={"email": datasets.ADMIN_EMAIL, "password": datasets.ADMIN_PASSWORD})
+        self.step("admin:dashboard", "GET", "/dashboard")
+        self.step("admin:exchange_requests", "GET", "/exchange-request")
+        user_id, request_id = self.rng.choice(self.catalogue["requests"])
+        self.step("admin:update_request", "POST", "/exchange-request", data={
+            "user_id": user_id, "request_id": request_id, "dropdown_option": "Solved"})
+        self.step("admin:contact_forms", "GET", "/contact-form")
+
+JOURNEYS = ("browse", "exchange", "signup", "upload", "admin")
+
+def build_catalogue(users: int, seed: int) -> Dict[str, Any]:
+    """Listings, accounts and requests in the dataset (regenerated from the seed)."""
+    tree, _  = datasets.generate(users, seed=seed)
+    listed   = [uid for uid, user in tree["users"].items() if "properties" in user]
+    verified = [uid for uid in listed if tree["users"][uid]["properties"]["house_status"] == "Verified"]
+
+    buffer = io.BytesIO()
+    Image.effect_mandelbrot((1600, 1200), (-2.0, -1.5, 1.0, 1.5), 100).convert("RGB").save(buffer, "JPEG", quality=85)
+
+    return {
+        "users"           : users,
+        "listings"        : verified,
+        "listing_indices" : [int(uid[1:]) for uid in listed],
+        "requests"        : [(uid, rid) for uid, reqs in tree["exchange_requests"].items() for rid in reqs] or [("none", "none")],
+        "image"           : "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode(),
+        "uploaded"        : set(),
+    }
+
+def parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in JOURNEYS:
+            raise ValueError(f"unknown journey {name!r} (choose from {', '.join(JOURNEYS)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+def run(base_url: str, catalogue: Dict[str, Any], mix: Dict[str, int], concurrency: int,
+        duration: float, seed: int) -> tuple:
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    names, weights = list(mix), list(mix.values())
+
+    def worker(n: int) -> None:
+        user = VirtualUser(base_url, recorder, catalogue, random.Random(seed + n))
+        while time.monotonic() < deadline:
+            getattr(user, user.rng.choices(names, weights)[0])()
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(recorder: Recorder, elapsed: float) -> List[Dict[str, Any]]:
+    rows = []
+    for step in sorted(recorder.samples):
+        ordered = sorted(recorder.samples[step])
+        rows.append({
+            "step"       : step,
+            "requests"   : len(ordered),
+            "errors"     : recorder.errors.get(step, 0),
+            "throughput" : len(ordered) / elapsed,
+            "p50_ms"     : _percentile(ordered, 0.50) * 1000,
+            "p95_ms"     : _percentile(ordered, 0.95) * 1000,
+            "p99_ms"     : _percentile(ordered, 0.99) * 1000,
+            "max_ms"     : ordered[-1] * 1000,
+        })
+    return rows
+
+def print_report(rows: List[Dict[str, Any]], elapsed: float, concurrency: int) -> None:
+    header = f"{'step':<26} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['step']:<26} {row['requests']:>8} {row['errors']:>7} {row['throughput']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    total  = sum(row["requests"] for row in rows)
+    errors = sum(row["errors"] for row in rows)
+    print("-" * len(header))
+    print(f"{total} requests, {errors} errors in {elapsed:.1f}s with {concurrency} virtual users: {total / elapsed:.1f} req/s")
+
+def _remove_uploads(root: str, uids) -> None:
+    # Synthetic uids only; real uploads are never touched
+    for uid in uids:
+        shutil.rmtree(os.path.join(root, "static", "uploads", uid), ignore_errors=True)
+
+def _serve_in_process(users: int, seed: int, latency: float, backend: str):
+    from werkzeug.serving import make_server
+    from bench.environment import build_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app, _, _ = build_app(users, seed=seed, latency=latency, backend=backend)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return app, server
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay user journeys concurrently and report latency per step.")
+    parser.add_argument("--url", help="target an already running instance instead of an in-process one")
+    parser.add_argument("--users", type=int, default=int(os.getenv("BENCH_USERS", 1000)), help="dataset size")
+    parser.add_argument("--seed", type=int, default=int(os.getenv("BENCH_SEED", 42)))
+    parser.add_argument("--concurrency", type=int, default=8, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--mix", default="browse=60,exchange=15,signup=5,upload=5,admin=15",
+                        help="journey weights, e.g. browse=60,admin=10")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated RTDB round trip (in-process only)")
+    parser.add_argument("--backend", choices=["rtdb", "sqlite"], default="rtdb", help="data backend (in-process only)")
+    parser.add_argument("--upload-root", help="with --url: the target's app root, where the upload journey's "
+                                              "files are removed afterwards; without it that journey is skipped")
+    parser.add_argument("--json", help="also write the per-step results to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    upload_root = args.upload_root
+    if args.url and upload_root is None and mix.pop("upload", None):
+        print("# upload journey skipped: pass --upload-root so its files can be removed", file=sys.stderr)
+        if not mix:
+            parser.error("nothing left to run")
+
+    catalogue = build_catalogue(args.users, args.seed)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        app, server = _serve_in_process(args.users, args.seed, args.latency_ms / 1000, args.backend)
+        base_url    = f"http://127.0.0.1:{server.server_port}"
+        upload_root = app.root_path
+    print(f"# {args.concurrency} virtual users for {args.duration:.0f}s against {base_url}", file=sys.stderr)
+
+    try:
+        recorder, elapsed = run(base_url, catalogue, mix, args.concurrency, args.duration, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if upload_root is not None:
+            _remove_uploads(upload_root, catalogue["uploaded"])
+
+    rows = summarize(recorder, elapsed)
+    print_report(rows, elapsed, args.concurrency)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Route benchmarks over the in-memory RTDB stand-in.
+
+    python -m bench.run_bench                         # 1k, 10k and 100k users
+    python -m bench.run_bench --sizes 1000,10000 --repeat 10 --json before.json
+    python -m bench.run_bench --compare before.json   # add a delta column
+    python -m bench.run_bench --backend sqlite        # same routes on the SQLite repository
+
+Every timed request goes through the Flask test client with the render caches
+cleared first, so the numbers are for a cold page, not a cache hit.
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from typing import Dict, Any, List
+
+import clients
+from caching import clear_render_caches
+from bench import datasets
+from bench.environment import build_app
+
+def _admin(client) -> None:
+    with client.session_transaction() as session:
+        session['admin-user'] = 'admin'
+
+def _anonymous(client) -> None:
+    with client.session_transaction() as session:
+        session.clear()
+
+# name: (prepare client, issue request)
+ROUTES : Dict[str, tuple] = {
+    "home_exchange"    : (_anonymous, lambda c, n: c.get("/home-exchange?page=2")),
+    "search"           : (_anonymous, lambda c, n: c.get("/home-exchange?q=quiet+sea+vi")),
+    "facets"           : (_anonymous, lambda c, n: c.get("/home-exchange?unique_facilities=Pool&amenities=Wifi&house_rules=Pets+Welcome")),
+    "nearby"           : (_anonymous, lambda c, n: c.get("/home-exchange?near=560001&radius=25")),
+    "dashboard"        : (_admin,     lambda c, n: c.get("/dashboard")),
+    "all_homes"        : (_admin,     lambda c, n: c.get("/all-homes")),
+    "all_homes_data"   : (_admin,     lambda c, n: c.get("/all-homes/data?status=Verified&sort=name&q=a")),
+    "exchange_request" : (_admin,     lambda c, n: c.get("/exchange-request")),
+    "forgot_password"  : (_anonymous, lambda c, n: c.post("/forgot-password", data={"email": datasets.email_for(n - 1)})),
+}
+
+class DbUsage:
+    """Counts RTDB calls and bytes through the admin_db listener hook."""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        clients.add_db_listener(self)
+
+    def __call__(self, op, path, query, shallow, seconds, nbytes, error) -> None:
+        self.calls += 1
+        self.bytes += nbytes
+
+    def reset(self) -> None:
+        self.calls = self.bytes = 0
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def bench_size(users: int, routes: List[str], repeat: int, latency: float, usage: DbUsage,
+               backend: str = "rtdb") -> List[Dict[str, Any]]:
+    started = time.perf_counter()
+    app, _, _ = build_app(users, latency=latency, backend=backend)
+    print(f"# {users} users: dataset built in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    client  = app.test_client()
+    results = []
+    for name in routes:
+        prepare, issue = ROUTES[name]
+        prepare(client)
+
+        timings, statuses = [], set()
+        for _ in range(repeat + 1):
+            clear_render_caches()
+            usage.reset()
+            started  = time.perf_counter()
+            response = issue(client, users)
+            timings.append(time.perf_counter() - started)
+            statuses.add(response.status_code)
+
+        timings = timings[1:]   # first run warms templates and imports
+        results.append({
+            "users"     : users,
+            "route"     : name,
+            "status"    : sorted(statuses),
+            "median_ms" : statistics.median(timings) * 1000,
+            "p95_ms"    : _percentile(timings, 0.95) * 1000,
+            "min_ms"    : min(timings) * 1000,
+            "rtdb_calls": usage.calls,
+            "rtdb_bytes": usage.bytes,
+        })
+    return results
+
+def print_report(results: List[Dict[str, Any]], baseline: Dict[tuple, Dict[str, Any]]) -> None:
+    header = f"{'users':>8}  {'route':<18} {'status':<9} {'median ms':>10} {'p95 ms':>10} {'min ms':>10} {'rtdb calls':>10} {'rtdb MB':>9}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+
+    for row in results:
+        line = (f"{row['users']:>8}  {row['route']:<18} {','.join(map(str, row['status'])):<9} "
+                f"{row['median_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['min_ms']:>10.1f} "
+                f"{row['rtdb_calls']:>10} {row['rtdb_bytes'] / 1e6:>9.2f}")
+        base = baseline.get((row['users'], row['route']))
+        if base:
+            line += f" {(row['median_ms'] / base['median_ms'] - 1) * 100:>+8.0f}%"
+        print(line)
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark routes against synthetic datasets.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated user counts")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="comma-separated routes to time")
+    parser.add_argument("--repeat", type=int, default=5, help="timed requests per route")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per RTDB call")
+    parser.add_argument("--backend", choices=["rtdb", "sqlite"], default="rtdb", help="data backend to serve from")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--compare", help="results file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    routes = [r for r in args.routes.split(",") if r]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = {(row["users"], row["route"]): row for row in json.load(fh)}
+
+    usage   = DbUsage()
+    results = []
+    for users in (int(size) for size in args.sizes.split(",") if size):
+        results.extend(bench_size(users, routes, args.repeat, args.latency_ms / 1000, usage, args.backend))
+
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
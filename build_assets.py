@@ -0,0 +1,228 @@
+"""
+Bundle, minify and precompress the static CSS/JS used by the templates.
+
+    python build_assets.py [--prune-fonts]
+
+Writes ``static/dist/site.css`` and ``static/dist/site.js`` with ``.gz``/``.br``
+siblings and a ``manifest.json``. The base layout switches to the bundles
+once they exist.
+"""
+import os
+import re
+import gzip
+import json
+import argparse
+from typing import Dict, List, Set, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+ROOT          = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR    = os.path.join(ROOT, "static")
+TEMPLATES_DIR = os.path.join(ROOT, "templates")
+DIST          = "dist"
+
+STATIC_REF   = re.compile(r"url_for\(\s*'static'\s*,\s*filename\s*=\s*'([^']+\.(css|js))'\s*\)")
+CHARSET_RULE = re.compile(r"@charset\s+[\"'][^\"']*[\"']\s*;", re.I)
+IMPORT_RULE  = re.compile(r"@import\s+(?:url\(\s*)?([\"']?)(.*?)\1\s*\)?\s*;")
+URL_REF      = re.compile(r"url\(\s*([\"']?)(.*?)\1\s*\)")
+FONT_FACE    = re.compile(r"@font-face\s*\{[^}]*\}", re.S)
+SRC_DECL     = re.compile(r"src\s*:\s*([^;}]*);?")
+STRING_OR_COMMENT = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.S)
+
+MODERN_FONTS = (".woff2", ".woff")
+LEGACY_FONTS = (".eot", ".ttf", ".svg", ".otf")
+FONT_EXTS    = MODERN_FONTS + LEGACY_FONTS
+
+def is_external(url: str) -> bool:
+    return url.startswith(("http:", "https:", "//", "data:", "#", "/"))
+
+def template_assets() -> Tuple[List[str], List[str]]:
+    """Local CSS and JS files referenced by the templates, in first-use order."""
+    css: List[str] = []
+    js: List[str] = []
+    for folder, _, files in sorted(os.walk(TEMPLATES_DIR)):
+        for name in sorted(files):
+            if not name.endswith(".html"):
+                continue
+            with open(os.path.join(folder, name), encoding="utf-8") as fh:
+                for filename, kind in STATIC_REF.findall(fh.read()):
+                    if filename.startswith(DIST + "/"):
+                        continue
+                    target = css if kind == "css" else js
+                    if filename not in target:
+                        target.append(filename)
+    return css, js
+
+# CSS
+
+def _rebase_urls(css: str, source: str) -> str:
+    """Rewrite relative url()s in ``source`` so they resolve from ``static/dist``."""
+    base = os.path.dirname(source)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if is_external(url):
+            return match.group(0)
+        cut    = re.search(r"[?#]", url)
+        path   = url[:cut.start()] if cut else url
+        suffix = url[cut.start():] if cut else ""
+        target = os.path.normpath(os.path.join(base, path))
+        return f"url({quote}{os.path.relpath(target, DIST).replace(os.sep, '/')}{suffix}{quote})"
+
+    return URL_REF.sub(rebase, css)
+
+def _inline_css(source: str, remote_imports: List[str], seen: Set[str]) -> str:
+    if source in seen:
+        return ""
+    seen.add(source)
+
+    with open(os.path.join(STATIC_DIR, source), encoding="utf-8") as fh:
+        css = fh.read()
+
+    def inline(match):
+        url = match.group(2)
+        if is_external(url):
+            rule = match.group(0)
+            if rule not in remote_imports:
+                remote_imports.append(rule)
+            return ""
+        return _inline_css(os.path.normpath(os.path.join(os.path.dirname(source), url)), remote_imports, seen)
+
+    css = IMPORT_RULE.sub(inline, CHARSET_RULE.sub("", css))
+    return _rebase_urls(css, source)
+
+def _drop_legacy_fonts(css: str) -> str:
+    """Keep only woff2/woff sources in @font-face blocks that offer them."""
+    def prune_block(block_match):
+        block = block_match.group(0)
+        if not any(ext in block for ext in MODERN_FONTS):
+            return block
+
+        def prune_src(src_match):
+            entries = [e.strip() for e in src_match.group(1).split(",")]
+            kept = [e for e in entries if not any(ext in e.split(")")[0] for ext in LEGACY_FONTS)]
+            return f"src:{','.join(kept)};" if kept else ""
+
+        return SRC_DECL.sub(prune_src, block)
+
+    return FONT_FACE.sub(prune_block, css)
+
+def minify_css(css: str) -> str:
+    parts = []
+    last = 0
+    for match in STRING_OR_COMMENT.finditer(css):
+        parts.append(("code", css[last:match.start()]))
+        if match.group(1):
+            parts.append(("string", match.group(1)))
+        last = match.end()
+    parts.append(("code", css[last:]))
+
+    out = []
+    for kind, text in parts:
+        if kind == "code":
+            text = re.sub(r"\s+", " ", text)
+            text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+            text = text.replace(";}", "}")
+        out.append(text)
+    return "".join(out).strip()
+
+def build_css(sources: List[str]) -> str:
+    remote_imports: List[str] = []
+    seen: Set[str] = set()
+    body = "\n".join(_inline_css(src, remote_imports, seen) for src in sources)
+    return minify_css('@charset "UTF-8";\n' + "\n".join(remote_imports) + "\n" + _drop_legacy_fonts(body))
+
+# JS
+
+def build_js(sources: List[str]) -> str:
+    chunks = []
+    for source in sources:
+        with open(os.path.join(STATIC_DIR, source), encoding="utf-8") as fh:
+            js = fh.read()
+        if rjsmin and not source.endswith(".min.js"):
+            js = rjsmin.jsmin(js)
+        chunks.append(js.strip())
+    return "\n;\n".join(chunks) + "\n"
+
+# Output
+
+def write_with_variants(name: str, content: str) -> Dict[str, int]:
+    path = os.path.join(STATIC_DIR, DIST, name)
+    raw = content.encode("utf-8")
+    with open(path, "wb") as fh:
+        fh.write(raw)
+
+    sizes = {"raw": len(raw)}
+    with open(path + ".gz", "wb") as fh:
+        gz = gzip.compress(raw, compresslevel=9, mtime=0)
+        fh.write(gz)
+        sizes["gz"] = len(gz)
+
+    if brotli is not None:
+        br = brotli.compress(raw, quality=11)
+        with open(path + ".br", "wb") as fh:
+            fh.write(br)
+        sizes["br"] = len(br)
+    elif os.path.exists(path + ".br"):
+        os.remove(path + ".br")
+
+    return sizes
+
+def referenced_fonts(css: str) -> Set[str]:
+    fonts = set()
+    for _, url in URL_REF.findall(css):
+        path = re.split(r"[?#]", url)[0]
+        if not is_external(path) and path.lower().endswith(FONT_EXTS):
+            fonts.add(os.path.normpath(os.path.join(DIST, path)))
+    return fonts
+
+def prune_fonts(keep: Set[str]) -> List[str]:
+    """Delete font files under static/css that the bundle no longer references."""
+    removed = []
+    for folder, _, files in os.walk(os.path.join(STATIC_DIR, "css")):
+        for name in files:
+            if not name.lower().endswith(FONT_EXTS):
+                continue
+            rel = os.path.relpath(os.path.join(folder, name), STATIC_DIR)
+            if rel not in keep:
+                os.remove(os.path.join(folder, name))
+                removed.append(rel)
+    return sorted(removed)
+
+def build(prune: bool = False) -> Dict[str, dict]:
+    os.makedirs(os.path.join(STATIC_DIR, DIST), exist_ok=True)
+    css_sources, js_sources = template_assets()
+
+    css = build_css(css_sources)
+    js  = build_js(js_sources)
+
+    manifest = {
+        "site.css": {"sources": css_sources, **write_with_variants("site.css", css)},
+        "site.js" : {"sources": js_sources,  **write_with_variants("site.js", js)},
+    }
+    with open(os.path.join(STATIC_DIR, DIST, "manifest.json"), "w") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    if prune:
+        manifest["pruned_fonts"] = prune_fonts(referenced_fonts(css))
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prune-fonts", action="store_true", help="delete font files the bundle does not reference")
+    args = parser.parse_args()
+
+    result = build(prune=args.prune_fonts)
+    for name in ("site.css", "site.js"):
+        entry = result[name]
+        print(f"{name}: {len(entry['sources'])} files, {entry['raw']} bytes, gz {entry['gz']}, br {entry.get('br', '-')}")
+    for rel in result.get("pruned_fonts", []):
+        print(f"pruned {rel}")
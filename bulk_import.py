@@ -0,0 +1,399 @@
+import os
+import io
+import re
+import csv
+import json
+import time
+import uuid
+import shutil
+import logging
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from PIL import UnidentifiedImageError
+
+import metrics
+from caching import bump_listing_version
+from repository import repo, USERS
+from utils import (
+    validate_property_form,
+    save_upload_image,
+    ImageTooLargeError,
+    is_valid_key,
+    FEATURE_FIELDS,
+    REQUIRED_PROPERTY_FIELDS
+)
+
+# Bulk listing import for admins.
+#
+# An upload (CSV or a JSON list of rows, plus an optional ZIP holding the
+# images the rows name) becomes a job under <instance>/imports/<job id>/. The
+# job's state is a JSON file beside the upload, so whichever worker serves the
+# progress endpoint can read it. The job runs on a thread in the worker that
+# accepted the upload, in three passes:
+#
+#   1. every row is normalised and run through validate_property_form, and its
+#      owner (uid or account email) resolved; all per-row errors are reported
+#      together, before anything is written;
+#   2. images of valid rows, from the ZIP or over HTTP(S), are decoded and
+#      re-encoded by a pool of IMPORT_IMAGE_WORKERS threads;
+#   3. valid rows are written WRITE_CHUNK_SIZE at a time, each chunk a single
+#      multi-path update of users/<uid>/properties/<field>, so fields the row
+#      does not carry (and the owner's profile) are left alone.
+#
+# Rows carry the stored field names (pin_code, name, email, ...). List fields
+# (amenities, house_rules, images, ...) are JSON lists or ';'-separated text.
+#
+# The thread dies with its worker. A worker that exits cleanly (gunicorn's
+# max_requests recycling, a restart) marks its running jobs failed from the
+# worker_exit hook; a job whose worker was killed is reported failed once its
+# state has not moved for IMPORT_STALE_SECONDS. Chunks already written stay
+# written, so the file can be uploaded again (images of rows written before the
+# interruption are then added a second time).
+
+log = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+MAX_ROWS         = int(os.getenv("IMPORT_MAX_ROWS", 5000))
+IMAGE_WORKERS    = int(os.getenv("IMPORT_IMAGE_WORKERS", 4))
+WRITE_CHUNK_SIZE = int(os.getenv("IMPORT_WRITE_CHUNK_SIZE", 100))
+MAX_IMAGE_BYTES  = int(os.getenv("IMPORT_MAX_IMAGE_BYTES", 10 * 1024 * 1024))
+STALE_SECONDS    = int(os.getenv("IMPORT_STALE_SECONDS", 900))
+
+LIST_FIELDS    = (*FEATURE_FIELDS, "preferred_location_types")
+ROW_FIELDS     = (*REQUIRED_PROPERTY_FIELDS, *LIST_FIELDS)
+HOUSE_STATUSES = ("Verified", "Not Verified")
+
+JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+FINISHED    = ("done", "failed")
+INTERRUPTED = "Import interrupted: the worker running it stopped. {written} rows were written; upload the file again to finish."
+
+_running      : Dict[str, Dict[str, Any]] = {}     # job id -> state, for the jobs of this worker
+_running_lock = threading.Lock()
+
+class InvalidUpload(ValueError):
+    """The upload itself is unusable (as opposed to individual bad rows)."""
+
+TIME_FORMAT = "%d-%m-%Y, %H:%M"
+
+def _now() -> str:
+    return datetime.now(IST).strftime(TIME_FORMAT)
+
+def _is_stale(state: Dict[str, Any]) -> bool:
+    try:
+        updated = datetime.strptime(state.get("updated_at", ""), TIME_FORMAT).replace(tzinfo=IST)
+    except ValueError:
+        return False
+    # updated_at has minute resolution
+    return (datetime.now(IST) - updated).total_seconds() > STALE_SECONDS + 60
+
+# Job state
+
+def _jobs_dir(app) -> str:
+    return app.config.get("IMPORT_JOBS_PATH") or os.path.join(app.instance_path, "imports")
+
+def _job_dir(app, job_id: str) -> str:
+    return os.path.join(_jobs_dir(app), job_id)
+
+def _save_state(app, state: Dict[str, Any]) -> None:
+    path = os.path.join(_job_dir(app, state["id"]), "job.json")
+    temp = f"{path}.{os.getpid()}.tmp"
+    state["updated_at"] = _now()
+    with open(temp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh)
+    os.replace(temp, path)
+
+def load_job(app, job_id: str) -> Optional[Dict[str, Any]]:
+    """The job's state; an unfinished job that stopped moving is reported failed."""
+    if not JOB_ID_RE.fullmatch(job_id or ""):
+        return None
+    try:
+        with open(os.path.join(_job_dir(app, job_id), "job.json"), encoding="utf-8") as fh:
+            state = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if state.get("status") not in FINISHED and _is_stale(state):
+        state["status"], state["message"] = "failed", INTERRUPTED.format(written=state.get("written", 0))
+    return state
+
+def recent_jobs(app, limit: int = 10) -> List[Dict[str, Any]]:
+    try:
+        entries = [e for e in os.scandir(_jobs_dir(app)) if e.is_dir() and JOB_ID_RE.fullmatch(e.name)]
+    except OSError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    jobs = (load_job(app, e.name) for e in entries[:limit])
+    return [job for job in jobs if job]
+
+# Parsing and validation
+
+def _list_value(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or "").split(";") if v.strip()]
+
+def parse_rows(filename: str, payload: bytes) -> List[Dict[str, Any]]:
+    """Rows of a .csv or .json upload, with list fields split and text stripped."""
+    try:
+        text = payload.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise InvalidUpload("The file must be UTF-8 encoded.")
+
+    if filename.lower().endswith(".json"):
+        try:
+            raw_rows = json.loads(text)
+        except ValueError as exc:
+            raise InvalidUpload(f"Invalid JSON: {exc}")
+        if isinstance(raw_rows, dict):
+            raw_rows = raw_rows.get("rows", [])
+        if not isinstance(raw_rows, list) or not all(isinstance(r, dict) for r in raw_rows):
+            raise InvalidUpload("JSON must be a list of objects.")
+    elif filename.lower().endswith(".csv"):
+        raw_rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        raise InvalidUpload("Upload a .csv or .json file.")
+
+    if not raw_rows:
+        raise InvalidUpload("The file has no rows.")
+    if len(raw_rows) > MAX_ROWS:
+        raise InvalidUpload(f"At most {MAX_ROWS} rows can be imported at once.")
+
+    rows = []
+    for raw in raw_rows:
+        row = {}
+        for key, value in raw.items():
+            key = (key or "").strip()
+            if key in LIST_FIELDS or key == "images":
+                row[key] = _list_value(value)
+            elif key:
+                row[key] = str(value if value is not None else "").strip()
+        rows.append(row)
+    return rows
+
+def resolve_owners(owners: Iterable[str]) -> Dict[str, str]:
+    """owner (account email or uid) -> uid, with one lookup for the whole file."""
+    owners = set(owners)
+    emails = {owner for owner in owners if "@" in owner}
+    uids   = {owner for owner in owners - emails if is_valid_key(owner)}
+    return {**repo.uids_by_email(emails), **{uid: uid for uid in repo.existing_uids(uids)}}
+
+def validate_row(row: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """The listing fields of ``row`` and the problems found with them."""
+    data = {field: row.get(field, [] if field in LIST_FIELDS else "") for field in ROW_FIELDS}
+    missing = [field for field in REQUIRED_PROPERTY_FIELDS if not data[field]]
+    errors  = [f"Missing {', '.join(missing)}."] if missing else []
+
+    _, field_errors = validate_property_form(data)
+    errors.extend(message for field, message in field_errors.items() if field not in missing)
+
+    data["house_status"] = row.get("house_status") or "Verified"
+    if data["house_status"] not in HOUSE_STATUSES:
+        errors.append("House status must be 'Verified' or 'Not Verified'.")
+    data["guest_points"] = row.get("guest_points") or "0"
+    if not data["guest_points"].isdigit():
+        errors.append("Guest points must be a whole number.")
+    return data, errors
+
+# Images
+
+def _fetch_image(source: str, archive: Optional[zipfile.ZipFile], archive_lock: threading.Lock) -> bytes:
+    if source.startswith(("http://", "https://")):
+        from http_client import get_http_session
+        response = get_http_session().get(source, stream=True)
+        try:
+            response.raise_for_status()
+            data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+        finally:
+            response.close()
+    else:
+        if archive is None:
+            raise ValueError("no image archive was uploaded")
+        with archive_lock:
+            try:
+                info = archive.getinfo(source)
+            except KeyError:
+                raise ValueError("not found in the image archive")
+            if info.file_size > MAX_IMAGE_BYTES:
+                raise ImageTooLargeError(source)
+            data = archive.read(info)
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageTooLargeError(source)
+    return data
+
+def _process_image(app, uid: str, source: str, archive, archive_lock) -> str:
+    with app.app_context():
+        data     = _fetch_image(source, archive, archive_lock)
+        filename = f"{uuid.uuid4().hex}.webp"
+        abs_path = os.path.join(app.root_path, 'static', 'uploads', uid, filename)
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        save_upload_image(data, abs_path, "home")
+        return f"/static/uploads/{uid}/{filename}"
+
+def _remove_images(app, urls: List[str]) -> None:
+    for url in urls:
+        try:
+            os.remove(os.path.join(app.root_path, url.lstrip("/")))
+        except OSError:
+            pass
+
+# The job
+
+def _owner(row: Dict[str, Any]) -> str:
+    return row.get("owner") or row.get("uid") or ""
+
+def _validate(state: Dict[str, Any], rows: List[Dict[str, Any]]) -> List[Tuple[int, str, Dict[str, Any], List[str]]]:
+    valid    = []
+    owners   : Dict[str, int] = {}
+    resolved = resolve_owners(_owner(row) for row in rows if _owner(row))
+    for number, row in enumerate(rows, start=1):
+        data, errors = validate_row(row)
+        owner = _owner(row)
+        uid   = resolved.get(owner)
+        if not owner:
+            errors.append("Missing owner (uid or account email).")
+        elif uid is None:
+            errors.append(f"No user found for owner '{owner}'.")
+        elif uid in owners:
+            errors.append(f"Same owner as row {owners[uid]}.")
+        else:
+            owners[uid] = number
+
+        if errors:
+            state["errors"].append({"row": number, "owner": owner, "errors": errors})
+        else:
+            valid.append((number, uid, data, row.get("images", [])))
+    return valid
+
+def _run_job(app, state: Dict[str, Any], rows: List[Dict[str, Any]], archive_path: Optional[str]) -> None:
+    started = time.perf_counter()
+
+    state["status"] = "validating"
+    _save_state(app, state)
+    valid = _validate(state, rows)
+    state["valid_rows"], state["invalid_rows"] = len(valid), len(rows) - len(valid)
+
+    # Images, in parallel; a row with a failed image is not written
+    images : Dict[int, List[str]] = {number: [] for number, _, _, _ in valid}
+    failed : Dict[int, List[str]] = {}
+    tasks  = [(number, uid, source) for number, uid, _, sources in valid for source in sources]
+    state["status"], state["images_total"] = "images", len(tasks)
+    _save_state(app, state)
+
+    archive      = zipfile.ZipFile(archive_path) if archive_path else None
+    archive_lock = threading.Lock()
+    try:
+        with ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="import-image") as pool:
+            futures = [(number, source, pool.submit(_process_image, app, uid, source, archive, archive_lock))
+                       for number, uid, source in tasks]
+            for done, (number, source, future) in enumerate(futures, start=1):
+                try:
+                    images[number].append(future.result())
+                except ImageTooLargeError:
+                    failed.setdefault(number, []).append(f"Image '{source}' is too large.")
+                except (UnidentifiedImageError, OSError):
+                    failed.setdefault(number, []).append(f"Image '{source}' could not be read.")
+                except Exception as exc:
+                    failed.setdefault(number, []).append(f"Image '{source}': {exc}")
+                state["images_done"] = done
+                if done % 20 == 0:
+                    _save_state(app, state)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    for number, errors in failed.items():
+        _remove_images(app, images.pop(number))
+        state["errors"].append({"row": number, "owner": _owner(rows[number - 1]), "errors": errors})
+    state["errors"].sort(key=lambda error: error["row"])
+    state["valid_rows"]   -= len(failed)
+    state["invalid_rows"] += len(failed)
+
+    # Writes, one multi-path update per chunk
+    state["status"] = "writing"
+    _save_state(app, state)
+    writable  = [(number, uid, data) for number, uid, data, _ in valid if number not in failed]
+    existing  = repo.listing_images_of(uid for number, uid, _ in writable if images[number])
+    submitted = _now()
+    for start in range(0, len(writable), WRITE_CHUNK_SIZE):
+        chunk   = writable[start:start + WRITE_CHUNK_SIZE]
+        updates = {}
+        for number, uid, data in chunk:
+            base = f"{USERS}/{uid}/properties"
+            updates.update({f"{base}/{field}": value for field, value in data.items()})
+            updates[f"{base}/submitted_at"] = submitted
+            if images[number]:
+                updates[f"{base}/images"] = existing.get(uid, []) + images[number]
+        repo.apply_updates(updates)
+        for _, uid, _ in chunk:
+            bump_listing_version(uid)
+        state["written"] += len(chunk)
+        _save_state(app, state)
+
+    state["status"] = "done"
+    _save_state(app, state)
+    metrics.inc("listing_import_rows_total", state["written"], result="written")
+    metrics.inc("listing_import_rows_total", state["invalid_rows"], result="rejected")
+    metrics.histogram("listing_import_seconds", time.perf_counter() - started)
+
+def _run(app, state: Dict[str, Any], rows: List[Dict[str, Any]], archive_path: Optional[str]) -> None:
+    with _running_lock:
+        _running[state["id"]] = state
+    with app.app_context():
+        try:
+            _run_job(app, state, rows, archive_path)
+        except Exception as exc:
+            log.exception("listing import %s failed", state["id"])
+            state["status"], state["message"] = "failed", f"Import stopped: {exc}"
+            _save_state(app, state)
+        finally:
+            with _running_lock:
+                _running.pop(state["id"], None)
+
+def interrupt_imports(app) -> None:
+    """Mark the jobs still running in this worker failed; called as the worker exits."""
+    with _running_lock:
+        states = list(_running.values())
+    for state in states:
+        log.warning("listing import %s interrupted after %s rows", state["id"], state["written"])
+        state["status"], state["message"] = "failed", INTERRUPTED.format(written=state["written"])
+        _save_state(app, state)
+
+def start_import(app, rows_file, archive_file=None) -> str:
+    """Store the upload, start the job in the background and return its id."""
+    filename = os.path.basename(rows_file.filename or "")
+    rows     = parse_rows(filename, rows_file.read())
+    job_id   = uuid.uuid4().hex
+    job_dir  = _job_dir(app, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+
+    archive_path = None
+    if archive_file is not None and archive_file.filename:
+        archive_path = os.path.join(job_dir, "images.zip")
+        archive_file.save(archive_path)
+        if not zipfile.is_zipfile(archive_path):
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise InvalidUpload("The image archive must be a .zip file.")
+
+    state = {
+        "id"           : job_id,
+        "filename"     : filename,
+        "created_at"   : _now(),
+        "status"       : "queued",
+        "message"      : "",
+        "total_rows"   : len(rows),
+        "valid_rows"   : 0,
+        "invalid_rows" : 0,
+        "images_total" : 0,
+        "images_done"  : 0,
+        "written"      : 0,
+        "errors"       : [],
+    }
+    _save_state(app, state)
+    threading.Thread(target=_run, args=(app, state, rows, archive_path),
+                     name=f"listing-import-{job_id[:8]}", daemon=True).start()
+    return job_id
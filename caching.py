@@ -0,0 +1,274 @@
+import os
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from functools import wraps
+from typing import Dict, Any, Optional, Set, Tuple
+from cachetools import TTLCache
+from markupsafe import Markup
+from flask import current_app, request, session, make_response, Response, g, has_request_context
+import metrics
+
+# Listing version
+#
+# Every listing write appends the owner's uid to an append-only log shared by
+# all workers on the host. The log's identity and size form a version that is
+# cheap to read (one stat) and changes whenever any listing changes. The
+# version also moves on every LISTING_VERSION_MAX_AGE seconds, so ETags and
+# cached renders never outlive that, whatever the log missed.
+#
+# Once the log passes LISTING_LOG_MAX_BYTES the write that crossed the limit
+# renames it aside (listing_changes.log.1, replacing the previous one) and
+# starts a new, empty log. Readers see a new inode and rebuild from the
+# repository, so an entry that lands in the old file during the rename, or two
+# workers rotating at once, loses nothing.
+#
+# The log is a local file: this versioning covers one host. Writes made on
+# another host (or directly in the database) reach this host's caches and
+# ETags only through the max age, and its search index, admin rows and match
+# engine not at all until the log rotates or the workers restart.
+
+LISTING_LOG_NAME = "listing_changes.log"
+
+def listing_log_path() -> str:
+    return current_app.config.get("LISTING_LOG_PATH") or os.path.join(current_app.instance_path, LISTING_LOG_NAME)
+
+def listing_version() -> str:
+    max_age = current_app.config.get("LISTING_VERSION_MAX_AGE", 3600)
+    epoch   = f"-{int(time.time() // max_age):x}" if max_age else ""
+    try:
+        st = os.stat(listing_log_path())
+    except OSError:
+        return f"0{epoch}"
+    return f"{st.st_ino:x}-{st.st_size:x}{epoch}"
+
+def bump_listing_version(uid: str) -> None:
+    """Record that the listing (or profile) of ``uid`` changed."""
+    path = listing_log_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(f"{uid}\n")
+        size = fh.tell()
+    max_bytes = current_app.config.get("LISTING_LOG_MAX_BYTES", 4 * 1024 * 1024)
+    if max_bytes and size >= max_bytes:
+        try:
+            os.replace(path, f"{path}.1")
+            open(path, "a").close()
+            metrics.inc("listing_log_rotations_total")
+        except OSError:
+            pass        # another worker rotated it first
+    clear_render_caches()
+
+class ListingLogFollower(ABC):
+    """
+    A worker-local structure (search index, admin rows, match engine) kept
+    current from the listing log.
+
+    refresh() remembers the log's (path, inode) and the offset it has read up
+    to, and passes apply() the uids on the whole lines appended since; a line
+    still being written is picked up next time. The first call, a rotated or
+    truncated log, or more than ``rebuild_threshold`` changed uids rebuild
+    from listings() instead: rebuild() builds aside and swaps in under the
+    structure's own lock, so readers keep the old contents meanwhile.
+    """
+    rebuild_threshold = 5000
+    metrics_prefix    = "listing_log"      # <prefix>_rebuilds_total, <prefix>_updates_total
+
+    def __init__(self):
+        self.refresh_lock = threading.Lock()    # one rebuild / catch-up at a time
+        self.rebuilding   = False
+        self.built        = False
+        self.log_id       : Optional[Tuple[str, Optional[int]]] = None   # (path, inode)
+        self.offset       = 0
+
+    @abstractmethod
+    def listings(self) -> Dict[str, Any]:
+        """The users a rebuild starts from, read from the repository."""
+
+    @abstractmethod
+    def rebuild(self, listings: Dict[str, Any]) -> None:
+        """Replace the contents with ``listings``."""
+
+    @abstractmethod
+    def apply(self, uids: Set[str]) -> Set[str]:
+        """Re-read the changed ``uids``; returns the uids whose results changed."""
+
+    def after_fork(self) -> None:
+        # A thread of the parent may have held the lock when it forked
+        self.refresh_lock = threading.Lock()
+        self.rebuilding   = False
+
+    def refresh(self, log_path: str, rebuild: bool = True) -> Optional[Set[str]]:
+        """
+        Catch up with the log. Returns what apply() returned (empty when
+        already current), or None after a rebuild. With ``rebuild`` false, a
+        rebuild that is due (or running in another thread) is left alone and
+        None is returned without waiting.
+        """
+        try:
+            st = os.stat(log_path)
+            log_id, size = (log_path, st.st_ino), st.st_size
+        except OSError:
+            log_id, size = (log_path, None), 0
+
+        if self.built and log_id == self.log_id and size == self.offset:
+            return set()
+        if not rebuild and (self.rebuilding or not self.built or log_id != self.log_id or size < self.offset):
+            return None
+
+        with self.refresh_lock:
+            if self.built and log_id == self.log_id and size == self.offset:
+                return set()
+            if not self.built or log_id != self.log_id or size < self.offset:
+                # The offset is taken before the read, so writes racing the
+                # rebuild are replayed on the next refresh.
+                if rebuild:
+                    self._rebuild(log_id, size)
+                return None
+
+            with open(log_path, "rb") as fh:
+                fh.seek(self.offset)
+                chunk = fh.read(size - self.offset)
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            uids = {line for line in complete.decode("utf-8", "replace").split("\n") if line}
+            if len(uids) > self.rebuild_threshold:
+                if rebuild:
+                    self._rebuild(log_id, self.offset + len(complete))
+                return None
+            changed = self.apply(uids)
+            self.offset += len(complete)
+            metrics.inc(f"{self.metrics_prefix}_updates_total", len(uids))
+            return changed
+
+    def _rebuild(self, log_id: Tuple[str, Optional[int]], offset: int) -> None:
+        self.rebuilding = True
+        try:
+            self.rebuild(self.listings())
+            self.log_id, self.offset, self.built = log_id, offset, True
+        finally:
+            self.rebuilding = False
+        metrics.inc(f"{self.metrics_prefix}_rebuilds_total")
+
+# Conditional GET
+
+def mark_listings_stale() -> None:
+    """The response is built from listing data behind the current version: give it no ETag and do not cache it."""
+    if has_request_context():
+        g.listings_stale = True
+
+def _user_state() -> str:
+    if 'admin-user' in session:
+        return "admin"
+    return session.get('user') or "anonymous"
+
+def listing_page_etag() -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    key   = "|".join([listing_version(), request.path, query, _user_state()])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def conditional_listing_page(view):
+    """
+    Answer GETs for listing pages with 304 when the client's ETag still
+    matches, before the view touches the database or renders anything.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        etag = listing_page_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = make_response("", 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or g.get("listings_stale"):
+                return response
+
+        response.set_etag(etag)
+        response.vary.add("Cookie")
+        return response
+
+    return wrapper
+
+# Rendered page and fragment cache
+#
+# Keys include the listing version, so a write in any worker retires every
+# entry; the local clear in bump_listing_version just frees memory early.
+
+_cache_lock     = threading.Lock()
+_page_cache     : Optional[TTLCache] = None
+_fragment_cache : Optional[TTLCache] = None
+
+def _caches():
+    global _page_cache, _fragment_cache
+    if _page_cache is None:
+        with _cache_lock:
+            if _page_cache is None:
+                ttl = current_app.config.get("PAGE_CACHE_TTL", 300)
+                _fragment_cache = TTLCache(maxsize=current_app.config.get("FRAGMENT_CACHE_SIZE", 2048), ttl=ttl)
+                _page_cache     = TTLCache(maxsize=current_app.config.get("PAGE_CACHE_SIZE", 256), ttl=ttl)
+    return _page_cache, _fragment_cache
+
+def clear_render_caches() -> None:
+    with _cache_lock:
+        for cache in (_page_cache, _fragment_cache):
+            if cache is not None:
+                cache.clear()
+
+def _cache_get(cache: TTLCache, key):
+    with _cache_lock:
+        return cache.get(key)
+
+def _cache_set(cache: TTLCache, key, value) -> None:
+    with _cache_lock:
+        cache[key] = value
+
+def page_cache_key() -> tuple:
+    state = "authenticated" if ('user' in session or 'admin-user' in session) else "anonymous"
+    return (request.path, tuple(sorted(request.args.items(multi=True))), state, listing_version())
+
+def cached_page(view):
+    """
+    Serve repeat anonymous GETs from the rendered-response cache. Signed-in
+    users always render (the navbar is personal) but reuse cached fragments.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET' or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        key = page_cache_key()
+        if key[2] != "anonymous":
+            return view(*args, **kwargs)
+
+        pages, _ = _caches()
+        entry = _cache_get(pages, key)
+        if entry is not None:
+            metrics.inc("page_cache_total", result="hit", endpoint=request.endpoint)
+            body, status, headers = entry
+            return Response(body, status=status, headers=headers)
+
+        metrics.inc("page_cache_total", result="miss", endpoint=request.endpoint)
+        response = make_response(view(*args, **kwargs))
+        if (response.status_code == 200 and not response.direct_passthrough and not session.modified
+                and not g.get("listings_stale")):
+            _cache_set(pages, key, (response.get_data(), response.status_code, list(response.headers.items())))
+        return response
+
+    return wrapper
+
+LISTING_CARD_TEMPLATE = "base/components/home/listing-card.html"
+
+def listing_card(uid: str, item: dict) -> Markup:
+    """Render the listing card partial once per listing version."""
+    _, fragments = _caches()
+    key  = (uid, listing_version())
+    html = _cache_get(fragments, key)
+    if html is None:
+        html = Markup(current_app.jinja_env.get_template(LISTING_CARD_TEMPLATE).render(uid=uid, item=item))
+        _cache_set(fragments, key, html)
+    return html
+
+def init_caching(app) -> None:
+    app.jinja_env.globals['listing_card'] = listing_card
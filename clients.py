@@ -0,0 +1,223 @@
+import os
+import time
+import importlib
+import threading
+from typing import Dict, Any, Callable, List
+
+# Firebase Admin and the auth REST client hold HTTP sessions and background state
+# that must not be shared across a fork. Clients are created per process: the
+# owning pid is remembered, and a forked worker transparently builds its own set.
+#
+# The Google client stack is slow to import, so nothing here imports it until a
+# client is actually used.
+
+_lock      = threading.Lock()
+_state     : Dict[str, Any] = {"pid": None, "auth": None}
+_overrides : Dict[str, Any] = {}
+
+def firebase_config() -> Dict[str, str]:
+    return {
+        'apiKey'            : os.getenv("FIREBASE_API_KEY"),
+        'authDomain'        : os.getenv("FIREBASE_AUTH_DOMAIN"),
+        'databaseURL'       : os.getenv("FIREBASE_DATABASE_URL"),
+        'projectId'         : os.getenv("FIREBASE_PROJECT_ID"),
+        'storageBucket'     : os.getenv("FIREBASE_STORAGE_BUCKET"),
+        'messagingSenderId' : os.getenv("FIREBASE_MESSAGING_SENDER_ID"),
+        'appId'             : os.getenv("FIREBASE_APP_ID"),
+        'measurementId'     : os.getenv("FIREBASE_MEASUREMENT_ID")
+    }
+
+def init_clients() -> None:
+    """Initialise Firebase Admin and the auth client for the current process (idempotent)."""
+    pid = os.getpid()
+    if _state["pid"] == pid or "firebase_admin.db" in _overrides:
+        return
+
+    with _lock:
+        if _state["pid"] == pid:
+            return
+
+        import firebase_admin
+        from firebase_admin import credentials
+
+        try:
+            # Inherited from a parent process: drop it and start clean.
+            firebase_admin.delete_app(firebase_admin.get_app())
+        except ValueError:
+            pass
+
+        cred = credentials.Certificate(os.getenv("FIREBASE_CREDENTIALS", "serviceAccountKey.json"))
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': os.getenv("FIREBASE_DATABASE_URL")
+        })
+
+        # Measure RTDB payloads on the wire rather than re-serialising them
+        from firebase_admin import db
+        db.reference('/')._client.session.hooks['response'].append(_count_response)
+
+        _state["auth"] = AuthClient(firebase_config()['apiKey'])
+        _state["pid"]  = pid
+
+class AuthClient:
+    """
+    The pyrebase ``Auth`` calls the app uses, sent through the shared pooled
+    session (pyrebase itself posts with bare ``requests.post`` and no timeout).
+    Errors carry the response body, as pyrebase's do, so callers can match
+    codes such as EMAIL_EXISTS.
+    """
+
+    IDENTITY_URL = "https://www.googleapis.com/identitytoolkit/v3/relyingparty"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def _post(self, action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        from requests import HTTPError
+        from http_client import get_http_session
+
+        response = get_http_session().post(
+            f"{self.IDENTITY_URL}/{action}?key={self.api_key}",
+            headers={"content-type": "application/json; charset=UTF-8"},
+            json=payload
+        )
+        try:
+            response.raise_for_status()
+        except HTTPError as e:
+            raise HTTPError(e, response.text)
+        return response.json()
+
+    def create_user_with_email_and_password(self, email: str, password: str) -> Dict[str, Any]:
+        return self._post("signupNewUser", {"email": email, "password": password, "returnSecureToken": True})
+
+    def sign_in_with_email_and_password(self, email: str, password: str) -> Dict[str, Any]:
+        return self._post("verifyPassword", {"email": email, "password": password, "returnSecureToken": True})
+
+    def send_password_reset_email(self, email: str) -> Dict[str, Any]:
+        return self._post("getOobConfirmationCode", {"requestType": "PASSWORD_RESET", "email": email})
+
+def get_auth_client() -> AuthClient:
+    if "auth_client" in _overrides:
+        return _overrides["auth_client"]
+    init_clients()
+    return _state["auth"]
+
+class _LazyModule:
+    """Stands in for a firebase_admin module; imports it and initialises clients on first use."""
+
+    def __init__(self, name: str):
+        self._name   = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._name in _overrides:
+            return getattr(_overrides[self._name], attr)
+        init_clients()
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# RTDB call observation
+#
+# Every Reference/Query handed out by admin_db is wrapped so that each network
+# call (get, set, update, push, delete, ...) is reported to the registered
+# listeners with its path, duration and payload size.
+
+DB_OPERATIONS = {"get", "get_if_changed", "set", "set_if_unchanged", "update", "push", "delete", "transaction"}
+
+_db_listeners : List[Callable[..., None]] = []
+
+def add_db_listener(listener: Callable[..., None]) -> None:
+    """
+    Call ``listener(op=, path=, query=, shallow=, seconds=, nbytes=, error=)``
+    after every RTDB call. ``nbytes`` is the body size read (get) or sent
+    (writes), as reported by the transport through record_transfer().
+    """
+    if listener not in _db_listeners:
+        _db_listeners.append(listener)
+
+_wire = threading.local()
+
+def record_transfer(sent: int = 0, received: int = 0) -> None:
+    """Report request/response body sizes for the RTDB call in progress on this thread."""
+    _wire.sent     = getattr(_wire, "sent", 0) + sent
+    _wire.received = getattr(_wire, "received", 0) + received
+
+def _count_response(response, *args, **kwargs) -> None:
+    if "text/event-stream" in response.headers.get("Content-Type", ""):
+        return
+    record_transfer(sent=len(response.request.body or b""), received=len(response.content))
+
+class ObservedNode:
+    """Proxy for a db.Reference or db.Query that reports its network calls."""
+
+    def __init__(self, node: Any, path: str, query: str = ""):
+        self._node  = node
+        self._path  = path
+        self._query = query
+
+    @staticmethod
+    def _child_node(ref: Any) -> Any:
+        return ObservedNode(ref, ref.path) if ref is not None else None
+
+    def _call(self, op: str, method: Callable, *args, **kwargs) -> Any:
+        if not _db_listeners:
+            return method(*args, **kwargs)
+
+        _wire.sent = _wire.received = 0
+        started = time.perf_counter()
+        error   = None
+        try:
+            return method(*args, **kwargs)
+        except Exception as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            nbytes  = _wire.received if op in ("get", "get_if_changed") else _wire.sent
+            for listener in list(_db_listeners):
+                listener(op=op, path=self._path, query=self._query, shallow=bool(kwargs.get("shallow")),
+                         seconds=seconds, nbytes=nbytes, error=error)
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self._node, attr)
+        if attr in DB_OPERATIONS:
+            if attr == "push":
+                return lambda *args, **kwargs: self._child_node(self._call(attr, value, *args, **kwargs))
+            return lambda *args, **kwargs: self._call(attr, value, *args, **kwargs)
+        if attr == "parent":
+            return self._child_node(value)
+        if not callable(value):
+            return value
+
+        def chained(*args, **kwargs):
+            node = value(*args, **kwargs)
+            if attr == "child":
+                return self._child_node(node)
+            # Query builders (order_by_child, equal_to, limit_to_first, ...)
+            step = f"{attr}({', '.join(repr(a) for a in args)})"
+            return ObservedNode(node, self._path, f"{self._query}.{step}" if self._query else step)
+        return chained
+
+    def __repr__(self) -> str:
+        return f"<ObservedNode {self._path}{'?' + self._query if self._query else ''}>"
+
+class _LazyDatabase(_LazyModule):
+    """``firebase_admin.db`` whose references report their calls to the db listeners."""
+
+    def reference(self, path: str = "/", *args, **kwargs) -> ObservedNode:
+        ref = self.__getattr__("reference")(path, *args, **kwargs)
+        return ObservedNode(ref, ref.path)
+
+def use_backends(db: Any = None, auth: Any = None, auth_client: Any = None) -> None:
+    """
+    Serve admin_db, admin_auth and get_auth_client() from stand-ins instead of
+    Firebase (used by the benchmarks and load tests). Passing nothing restores
+    the real clients.
+    """
+    _overrides.clear()
+    for name, backend in (("firebase_admin.db", db), ("firebase_admin.auth", auth), ("auth_client", auth_client)):
+        if backend is not None:
+            _overrides[name] = backend
+
+admin_db   = _LazyDatabase("firebase_admin.db")
+admin_auth = _LazyModule("firebase_admin.auth")
@@ -0,0 +1,224 @@
+import zlib
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Flask
+
+import metrics
+
+try:
+    import brotli
+except ImportError:          # gzip only
+    brotli = None
+
+# On-the-fly response compression, as WSGI middleware around the app.
+#
+# Responses are compressed when the client accepts br or gzip (brotli is
+# preferred when the module is installed), the content type is in
+# COMPRESSIBLE_TYPES and the body is at least COMPRESSION_MIN_SIZE bytes.
+# Responses that are already encoded (the precompressed static bundles, see
+# assets.py), partial, bodiless or marked no-transform pass through untouched.
+#
+# A buffered response (one with a Content-Length) is compressed in one go. A
+# streamed response is held back only until COMPRESSION_MIN_SIZE bytes have
+# arrived, then each chunk is compressed and flushed as it comes, so the client
+# still sees the page progressively.
+
+COMPRESSIBLE_TYPES = (
+    "text/html", "text/plain", "text/css", "text/csv", "text/javascript", "text/xml",
+    "application/json", "application/javascript", "application/xml", "image/svg+xml",
+)
+
+# Preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+SKIP_STATUSES = {204, 206, 304}
+
+def accepted_encoding(header: str, encodings: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """The first of ``encodings`` (by default those we can compress to) that the Accept-Encoding header allows."""
+    accepted = {}
+    for value in header.split(","):
+        name, _, params = value.strip().partition(";")
+        quality = 1.0
+        params  = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+class _Compressor:
+    """Incremental br/gzip compressor with a sync flush between streamed chunks."""
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib   = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)     # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.process(data) if self.encoding == "br" else self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        return self._brotli.flush() if self.encoding == "br" else self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._brotli.finish() if self.encoding == "br" else self._zlib.flush()
+
+class CompressionMiddleware:
+    def __init__(self, wsgi_app: Callable, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.wsgi_app       = wsgi_app
+        self.min_size       = min_size
+        self.gzip_level     = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressible(self, status: int, headers: Dict[str, str]) -> bool:
+        if status < 200 or status in SKIP_STATUSES:
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        captured : List[Any] = []
+
+        def capture(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info is not None:
+                # An error after headers were captured but not sent: let the server handle it
+                return start_response(status, headers, exc_info)
+            captured[:] = [status, headers]
+            return _no_write
+
+        body = self.wsgi_app(environ, capture)
+        if not captured:
+            # The app sent its headers itself (via exc_info); nothing to rewrite
+            return body
+
+        status, headers = captured
+        lowered = {name.lower(): value for name, value in headers}
+        if environ.get("REQUEST_METHOD") == "HEAD" or not self._compressible(int(status.split(" ", 1)[0]), lowered):
+            start_response(status, headers)
+            return body
+
+        # Caches must keep the variants apart even when this client gets plain bytes
+        headers = _add_vary(headers)
+        encoding = accepted_encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        length   = lowered.get("content-length")
+        if encoding is None or (length is not None and length.isdigit() and int(length) < self.min_size):
+            start_response(status, headers)
+            return body
+
+        if length is not None:
+            return self._compress_buffered(body, status, headers, encoding, start_response)
+        return self._compress_streamed(body, status, headers, encoding, start_response)
+
+    def _compressed_headers(self, headers: List[Tuple[str, str]], encoding: str,
+                            length: Optional[int]) -> List[Tuple[str, str]]:
+        result = []
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == "content-length":
+                continue
+            if lowered == "etag" and not value.startswith("W/"):
+                # The bytes differ from the uncompressed entity; If-None-Match compares weakly
+                value = f"W/{value}"
+            result.append((name, value))
+        result.append(("Content-Encoding", encoding))
+        if length is not None:
+            result.append(("Content-Length", str(length)))
+        return result
+
+    def _compress_buffered(self, body: Iterable[bytes], status: str, headers: List[Tuple[str, str]],
+                           encoding: str, start_response: Callable) -> Iterable[bytes]:
+        try:
+            raw = b"".join(body)
+        finally:
+            _close(body)
+
+        if len(raw) < self.min_size:
+            start_response(status, headers)
+            return [raw]
+
+        compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+        data       = compressor.compress(raw) + compressor.finish()
+        _record(encoding, len(raw), len(data))
+        start_response(status, self._compressed_headers(headers, encoding, len(data)))
+        return [data]
+
+    def _compress_streamed(self, body: Iterable[bytes], status: str, headers: List[Tuple[str, str]],
+                           encoding: str, start_response: Callable) -> Iterator[bytes]:
+        chunks = iter(body)
+        try:
+            # Hold back only until it is clear the body is worth compressing
+            head, size = [], 0
+            for chunk in chunks:
+                head.append(chunk)
+                size += len(chunk)
+                if size >= self.min_size:
+                    break
+            else:
+                start_response(status, headers)
+                yield from head
+                return
+
+            compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+            start_response(status, self._compressed_headers(headers, encoding, None))
+            raw_bytes, sent_bytes = size, 0
+            data = compressor.compress(b"".join(head)) + compressor.flush()
+            sent_bytes += len(data)
+            yield data
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                raw_bytes += len(chunk)
+                data = compressor.compress(chunk) + compressor.flush()
+                if data:
+                    sent_bytes += len(data)
+                    yield data
+            data = compressor.finish()
+            sent_bytes += len(data)
+            yield data
+            _record(encoding, raw_bytes, sent_bytes)
+        finally:
+            _close(body)
+
+def _no_write(data: bytes) -> None:
+    raise RuntimeError("CompressionMiddleware does not support the WSGI write() callable")
+
+def _add_vary(headers: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == "vary":
+            if "accept-encoding" in value.lower() or value.strip() == "*":
+                return headers
+            headers = list(headers)
+            headers[index] = (name, f"{value}, Accept-Encoding")
+            return headers
+    return [*headers, ("Vary", "Accept-Encoding")]
+
+def _close(body: Iterable[bytes]) -> None:
+    close = getattr(body, "close", None)
+    if close is not None:
+        close()
+
+def _record(encoding: str, raw_bytes: int, sent_bytes: int) -> None:
+    metrics.inc("responses_compressed_total", encoding=encoding)
+    metrics.inc("response_bytes_uncompressed_total", raw_bytes)
+    metrics.inc("response_bytes_compressed_total", sent_bytes)
+
+def init_compression(app: Flask) -> None:
+    if not app.config.get("COMPRESSION", True):
+        return
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size       = int(app.config.get("COMPRESSION_MIN_SIZE", 1024)),
+        gzip_level     = int(app.config.get("COMPRESSION_GZIP_LEVEL", 6)),
+        brotli_quality = int(app.config.get("COMPRESSION_BROTLI_QUALITY", 4)),
+    )
@@ -0,0 +1,166 @@
+from array import array
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+from utils import FEATURE_FIELDS
+
+# Bitset facets over listing features (amenities, facilities, house rules, ...).
+#
+# Every (field, value) pair from utils.FEATURE_FIELDS gets a bit; a listing's
+# features pack into one 64-bit mask kept in an array('Q') indexed by slot.
+# Alongside, each bit has a column: a Python int with bit <slot> set for every
+# listing carrying that value, and city / location type get the same treatment
+# keyed by their lowercased value. A filter is then an AND of columns, and the
+# count for a facet value is ``(result & column).bit_count()``.
+#
+# Slots freed by removed listings are reused. Columns are built in one pass
+# after a bulk load and then updated in place on each add/remove.
+
+FACETS : List[Tuple[str, str]] = [(field, value) for field, values in FEATURE_FIELDS.items() for value in values]
+BITS   : Dict[Tuple[str, str], int] = {facet: bit for bit, facet in enumerate(FACETS)}
+
+assert len(FACETS) <= 64, "feature masks are stored as unsigned 64-bit integers"
+
+GROUP_FIELDS = ("city", "location_type")
+
+def feature_mask(properties: Dict[str, Any]) -> int:
+    mask = 0
+    for field in FEATURE_FIELDS:
+        values = properties.get(field) or []
+        if isinstance(values, dict):
+            values = values.values()
+        for value in values:
+            bit = BITS.get((field, value))
+            if bit is not None:
+                mask |= 1 << bit
+    return mask
+
+def selection_mask(selected: Dict[str, Iterable[str]]) -> int:
+    """Mask for the requested ``{field: [values]}``; unknown values are ignored."""
+    return feature_mask(selected)
+
+def _bitset(slots: Iterable[int], size: int) -> int:
+    buffer = bytearray(size // 8 + 1)
+    for slot in slots:
+        buffer[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+def _slots(bits: int) -> List[int]:
+    text = bin(bits)[:1:-1]
+    return [slot for slot, digit in enumerate(text) if digit == "1"]
+
+class FacetIndex:
+    def __init__(self):
+        self.uids    : List[Optional[str]] = []
+        self.masks   = array('Q')
+        self.groups  : List[Tuple[str, str]] = []        # per slot: lowercased (city, location_type)
+        self.slots   : Dict[str, int] = {}
+        self.free    : List[int] = []
+        self.names   : Dict[Tuple[str, str], str] = {}   # (field, lowercased) -> display value
+        self.columns : Optional[List[int]] = None        # per bit; None until finalize()
+        self.group_columns : Dict[Tuple[str, str], int] = {}
+        self.alive   = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    # Maintenance
+
+    def add(self, uid: str, properties: Dict[str, Any]) -> None:
+        self.remove(uid)
+        mask  = feature_mask(properties)
+        group = tuple((properties.get(field) or '').strip() for field in GROUP_FIELDS)
+        for field, value in zip(GROUP_FIELDS, group):
+            if value:
+                self.names.setdefault((field, value.lower()), value)
+        group = tuple(value.lower() for value in group)
+
+        if self.free:
+            slot = self.free.pop()
+            self.uids[slot], self.masks[slot], self.groups[slot] = uid, mask, group
+        else:
+            slot = len(self.uids)
+            self.uids.append(uid)
+            self.masks.append(mask)
+            self.groups.append(group)
+        self.slots[uid] = slot
+
+        if self.columns is not None:
+            flag = 1 << slot
+            self.alive |= flag
+            for bit in _slots(mask):
+                self.columns[bit] |= flag
+            for key in zip(GROUP_FIELDS, group):
+                self.group_columns[key] = self.group_columns.get(key, 0) | flag
+
+    def remove(self, uid: str) -> None:
+        slot = self.slots.pop(uid, None)
+        if slot is None:
+            return
+        if self.columns is not None:
+            keep = ~(1 << slot)
+            self.alive &= keep
+            for bit in _slots(self.masks[slot]):
+                self.columns[bit] &= keep
+            for key in zip(GROUP_FIELDS, self.groups[slot]):
+                self.group_columns[key] &= keep
+        self.uids[slot], self.masks[slot], self.groups[slot] = None, 0, ('', '')
+        self.free.append(slot)
+
+    def finalize(self) -> None:
+        """Build the column bitsets in one pass (after a bulk load)."""
+        size = len(self.uids)
+        per_bit   : List[List[int]] = [[] for _ in FACETS]
+        per_group : Dict[Tuple[str, str], List[int]] = {}
+        for uid, slot in self.slots.items():
+            mask = self.masks[slot]
+            while mask:
+                low = mask & -mask
+                per_bit[low.bit_length() - 1].append(slot)
+                mask ^= low
+            for key in zip(GROUP_FIELDS, self.groups[slot]):
+                per_group.setdefault(key, []).append(slot)
+
+        self.columns       = [_bitset(slots, size) for slots in per_bit]
+        self.group_columns = {key: _bitset(slots, size) for key, slots in per_group.items()}
+        self.alive         = _bitset(self.slots.values(), size)
+
+    # Queries
+
+    def select(self, required: int = 0, city: str = '', location_type: str = '',
+               exclude_uid: Optional[str] = None) -> int:
+        """Bitset of listings having every ``required`` bit and the given city / location type."""
+        if self.columns is None:
+            self.finalize()
+        bits = self.alive
+        for key in (("city", city), ("location_type", location_type)):
+            if key[1]:
+                bits &= self.group_columns.get(key, 0)
+        for bit in _slots(required):
+            bits &= self.columns[bit]
+        if exclude_uid in self.slots:
+            bits &= ~(1 << self.slots[exclude_uid])
+        return bits
+
+    def bitset_of(self, uids: Iterable[str]) -> int:
+        slots = self.slots
+        return _bitset((slots[uid] for uid in uids if uid in slots), len(self.uids))
+
+    def uids_in(self, bits: int) -> List[str]:
+        uids = self.uids
+        return [uids[slot] for slot in _slots(bits)]
+
+    def counts(self, bits: int) -> Dict[str, Dict[str, int]]:
+        """``{field: {value: listings in bits carrying value}}`` for every facet value."""
+        if self.columns is None:
+            self.finalize()
+        counts: Dict[str, Dict[str, int]] = {field: {} for field in FEATURE_FIELDS}
+        for (field, value), column in zip(FACETS, self.columns):
+            counts[field][value] = (bits & column).bit_count()
+        return counts
+
+    def group_values(self, field: str) -> List[str]:
+        """Display values of a group field present in the index, sorted."""
+        if self.columns is None:
+            self.finalize()
+        return sorted(self.names[key] for key, column in self.group_columns.items()
+                      if key[0] == field and column and key in self.names)
@@ -0,0 +1,53 @@
+import os
+import multiprocessing
+
+# Tunable through the environment; defaults suit a small container.
+
+bind         = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers      = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads      = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app  = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+timeout      = int(os.getenv("GUNICORN_TIMEOUT", 30))
+keepalive    = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# With preload_app the app is imported in this (master) process before the
+# workers fork; init_search checks this to leave the index build to post_fork
+if preload_app:
+    os.environ["GUNICORN_PRELOAD_PID"] = str(os.getpid())
+
+max_requests        = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+accesslog = "-"
+errorlog  = "-"
+
+def on_starting(server):
+    # Worker metric snapshots are summed by /metrics; a new server starts from zero
+    import metrics
+    metrics.reset_directory(os.getenv("METRICS_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "metrics"))
+
+def when_ready(server):
+    # With preload_app the master recorded start-up metrics (template warm-up)
+    import metrics
+    metrics.ensure_publisher()
+    metrics.publish()
+
+def post_fork(server, worker):
+    # The app is preloaded in the master without any Firebase clients;
+    # each worker opens its own connections here.
+    from clients import init_clients
+    init_clients()
+
+    # Threads do not survive the fork, and the master never builds: each worker
+    # builds its own search index in the background
+    import search
+    search.start_index_build()
+
+def worker_exit(server, worker):
+    # Recycling (max_requests) or a restart ends the worker's import threads
+    # with it; record those jobs as interrupted rather than leave them running
+    app = getattr(worker, "wsgi", None)      # unset if the worker never loaded the app
+    if app is not None:
+        import bulk_import
+        bulk_import.interrupt_imports(app)
@@ -0,0 +1,105 @@
+import os
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+from typing import Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError
+
+import metrics
+
+# Shared outbound HTTP client: one pooled keep-alive session per process, a
+# default (connect, read) timeout on every call, bounded retries with jittered
+# backoff (non-idempotent methods only when the connection was never made), and
+# latency metrics per endpoint (host + path, never the query, which carries the
+# API key).
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT    = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+MAX_RETRIES     = int(os.getenv("HTTP_MAX_RETRIES", 2))
+BACKOFF_BASE    = float(os.getenv("HTTP_BACKOFF_BASE", 0.2))
+BACKOFF_MAX     = 2.0
+POOL_SIZE       = int(os.getenv("HTTP_POOL_SIZE", 10))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Statuses that mean the request was not processed: safe to retry any method.
+NOT_PROCESSED_STATUSES = {429, 503}
+# Transient failures that may have been processed: retried for idempotent methods only.
+TRANSIENT_STATUSES     = {500, 502, 504}
+
+def endpoint_label(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+def failed_before_send(exc: Exception) -> bool:
+    """Whether ``exc`` shows no connection was made, so the request never reached the server."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number ``attempt`` (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+class OutboundSession(requests.Session):
+    def __init__(self, pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES):
+        super().__init__()
+        self.max_retries = max_retries
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def _should_retry_error(self, method: str, exc: Exception) -> bool:
+        if method in IDEMPOTENT_METHODS:
+            return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+        # A reset or read timeout may come after the server acted on a POST
+        return failed_before_send(exc)
+
+    def _should_retry_status(self, method: str, status: int) -> bool:
+        return status in NOT_PROCESSED_STATUSES or (status in TRANSIENT_STATUSES and method in IDEMPOTENT_METHODS)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+        method   = method.upper()
+        endpoint = endpoint_label(url)
+        attempt  = 0
+
+        while True:
+            started = time.perf_counter()
+            try:
+                response = super().request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                metrics.observe("outbound_http_seconds", time.perf_counter() - started, endpoint=endpoint)
+                metrics.inc("outbound_http_errors_total", endpoint=endpoint, error=type(exc).__name__)
+                if attempt >= self.max_retries or not self._should_retry_error(method, exc):
+                    raise
+            else:
+                metrics.observe("outbound_http_seconds", time.perf_counter() - started, endpoint=endpoint)
+                metrics.inc("outbound_http_requests_total", endpoint=endpoint, status=response.status_code)
+                if attempt >= self.max_retries or not self._should_retry_status(method, response.status_code):
+                    return response
+                response.close()
+
+            attempt += 1
+            metrics.inc("outbound_http_retries_total", endpoint=endpoint)
+            time.sleep(backoff_delay(attempt))
+
+_lock  = threading.Lock()
+_state : Dict[str, Any] = {"pid": None, "session": None}
+
+def get_http_session() -> OutboundSession:
+    """The process-wide session; a forked worker gets a fresh pool."""
+    pid = os.getpid()
+    if _state["pid"] != pid:
+        with _lock:
+            if _state["pid"] != pid:
+                _state["session"] = OutboundSession()
+                _state["pid"]     = pid
+    return _state["session"]
@@ -0,0 +1,61 @@
+import os
+import time
+from flask import g, request, has_request_context
+import metrics
+from clients import add_db_listener
+
+# Per-request metrics: latency and status per endpoint, and the RTDB calls,
+# bytes and time each request spent. Paths are reported by their top-level
+# node ("/users" for a full-tree read, "/users/*" below it) to keep label
+# cardinality bounded.
+
+def _endpoint() -> str:
+    return request.endpoint or "unmatched"
+
+def path_label(path: str) -> str:
+    segments = [s for s in path.split("/") if s]
+    if not segments:
+        return "/"
+    return f"/{segments[0]}" + ("/*" if len(segments) > 1 else "")
+
+def record_db_call(op: str, path: str, query: str, shallow: bool, seconds: float, nbytes: int, error) -> None:
+    endpoint = _endpoint() if has_request_context() else "background"
+    label    = path_label(path) + ("?query" if query else "") + ("?shallow" if shallow else "")
+
+    metrics.inc("rtdb_calls_total", endpoint=endpoint, op=op, path=label)
+    metrics.inc("rtdb_bytes_total", nbytes, endpoint=endpoint, op=op, path=label)
+    metrics.histogram("rtdb_call_seconds", seconds, op=op)
+    if error:
+        metrics.inc("rtdb_errors_total", op=op, error=error)
+
+    if has_request_context() and "rtdb_usage" in g:
+        usage = g.rtdb_usage
+        usage["calls"]   += 1
+        usage["bytes"]   += nbytes
+        usage["seconds"] += seconds
+
+def _start_timer() -> None:
+    g.request_started = time.perf_counter()
+    g.rtdb_usage      = {"calls": 0, "bytes": 0, "seconds": 0.0}
+
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+
+    endpoint = _endpoint()
+    metrics.histogram("http_request_seconds", time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    metrics.inc("http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+
+    usage = g.pop("rtdb_usage")
+    metrics.histogram("rtdb_calls_per_request", usage["calls"], metrics.COUNT_BUCKETS, endpoint=endpoint)
+    metrics.histogram("rtdb_bytes_per_request", usage["bytes"], metrics.SIZE_BUCKETS, endpoint=endpoint)
+    metrics.histogram("rtdb_seconds_per_request", usage["seconds"], endpoint=endpoint)
+    return response
+
+def init_instrumentation(app) -> None:
+    metrics.use_directory(app.config.get("METRICS_DIR") or os.path.join(app.instance_path, "metrics"))
+    add_db_listener(record_db_call)
+    app.before_request(metrics.ensure_publisher)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
@@ -0,0 +1,358 @@
+import os
+import math
+import time
+import heapq
+import bisect
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Set, Tuple, FrozenSet, NamedTuple
+
+import click
+import metrics
+from caching import ListingLogFollower, listing_log_path
+from repository import repo
+
+try:
+    import fcntl
+except ImportError:         # no flock (Windows): every worker runs its own engine
+    fcntl = None
+
+# Reciprocal exchange matches.
+#
+# Every verified listing reduces to a profile: location type, bedrooms, guest
+# capacity, guest points and the location types its owner prefers. How well
+# home B suits A's household is a weighted mix of capacity, bedrooms and A's
+# destination preferences; a pair scores the geometric mean of both directions,
+# scaled by how evenly their guest points balance.
+#
+# Listings with the same profile minus points share a group, so the pairwise
+# part is scored once per pair of groups and cached as each group's candidate
+# list, best first. A user's top N walks that list, taking each group's members
+# nearest in guest points first, and stops once no remaining group can beat
+# the N-th match so far.
+#
+# One worker per host (holding an flock) keeps the engine: it builds once from
+# the repository, then follows the listing change log like the search index
+# (caching.ListingLogFollower) and re-ranks only the users a change can affect:
+# the changed listing, users whose matches included it, and users it would now
+# enter the top N for. Results are stored at matches/<uid>, which my_home reads
+# as is.
+
+log = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+TOP_N             = int(os.getenv("MATCHES_TOP_N", 10))
+REFRESH_INTERVAL  = float(os.getenv("MATCHES_REFRESH_INTERVAL", 10))
+REBUILD_THRESHOLD = int(os.getenv("MATCHES_REBUILD_THRESHOLD", 5000))
+MIN_SCORE         = 0.35
+
+CAPACITY_WEIGHT   = 0.35
+BEDROOM_WEIGHT    = 0.25
+LOCATION_WEIGHT   = 0.40
+OPEN_PREFERENCE   = 0.6      # location score when the guest set no preferences
+POINTS_WEIGHT     = 0.25     # share of the score riding on guest point balance
+
+Group = Tuple[str, int, int, FrozenSet[str]]     # location type, bedrooms, capacity, preferences
+
+def _int(value: Any, default: int = 0) -> int:
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return default
+
+class Profile(NamedTuple):
+    group  : Group
+    points : int
+    card   : Dict[str, Any]        # what a match shows on my_home
+
+def profile_of(user: Optional[Dict[str, Any]]) -> Optional[Profile]:
+    properties = (user or {}).get('properties') or {}
+    if properties.get('house_status') != "Verified":
+        return None
+    prefers = properties.get('preferred_location_types') or []
+    if isinstance(prefers, dict):
+        prefers = prefers.values()
+    group = (
+        properties.get('location_type') or '',
+        max(_int(properties.get('bedrooms'), 1), 1),
+        max(_int(properties.get('guest_capacity'), 1), 1),
+        frozenset(prefers),
+    )
+    images = properties.get('images') or []
+    card   = {
+        'title'          : properties.get('title', ''),
+        'city'           : properties.get('city', ''),
+        'location_type'  : properties.get('location_type', ''),
+        'bedrooms'       : properties.get('bedrooms', ''),
+        'guest_capacity' : properties.get('guest_capacity', ''),
+        'guest_points'   : properties.get('guest_points', ''),
+        'image'          : images[0] if images else '',
+    }
+    return Profile(group, max(_int(properties.get('guest_points')), 0), card)
+
+def _suits(guest: Group, host: Group) -> float:
+    """How well the ``host`` home suits the ``guest`` household, 0..1."""
+    g_type, g_beds, g_capacity, g_prefers = guest
+    h_type, h_beds, h_capacity, _         = host
+    capacity = 1.0 if h_capacity >= g_capacity else h_capacity / g_capacity
+    bedrooms = 1.0 - min(abs(h_beds - g_beds), 4) / 4
+    location = (1.0 if h_type in g_prefers else 0.0) if g_prefers else OPEN_PREFERENCE
+    return CAPACITY_WEIGHT * capacity + BEDROOM_WEIGHT * bedrooms + LOCATION_WEIGHT * location
+
+def group_score(a: Group, b: Group) -> float:
+    return math.sqrt(_suits(a, b) * _suits(b, a))
+
+def points_balance(a: int, b: int) -> float:
+    high = max(a, b)
+    return 1.0 - abs(a - b) / high if high else 1.0
+
+def pair_score(bound: float, a_points: int, b_points: int) -> float:
+    return bound * (1.0 - POINTS_WEIGHT + POINTS_WEIGHT * points_balance(a_points, b_points))
+
+Ranked = List[Tuple[float, str]]        # (score, uid), best first
+
+class MatchEngine(ListingLogFollower):
+    rebuild_threshold = REBUILD_THRESHOLD
+    metrics_prefix    = "match_engine"
+
+    def __init__(self, top_n: int = TOP_N):
+        super().__init__()
+        self.top_n     = top_n
+        self.profiles  : Dict[str, Profile] = {}
+        self.groups    : Dict[Group, List[Tuple[int, str]]] = {}       # group -> (points, uid), sorted
+        self.order     : Dict[Group, List[Tuple[float, Group]]] = {}   # group -> candidate groups, best first
+        self.results   : Dict[str, Ranked] = {}
+        self.listed_in : Dict[str, Set[str]] = {}                      # uid -> users whose matches include it
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    # Maintenance
+
+    def _place(self, uid: str, profile: Profile) -> None:
+        self.profiles[uid] = profile
+        members = self.groups.get(profile.group)
+        if members is None:
+            members = self.groups[profile.group] = []
+            self.order.clear()
+        bisect.insort(members, (profile.points, uid))
+
+    def _unplace(self, uid: str) -> None:
+        profile = self.profiles.pop(uid, None)
+        if profile is None:
+            return
+        members = self.groups[profile.group]
+        del members[bisect.bisect_left(members, (profile.points, uid))]
+        if not members:
+            del self.groups[profile.group]
+            self.order.clear()
+
+    def _record(self, uid: str, ranked: Ranked) -> Ranked:
+        """Store ``uid``'s new matches, keeping listed_in in step; returns the old ones."""
+        old = self.results.pop(uid, [])
+        for _, other in old:
+            holders = self.listed_in[other]
+            holders.discard(uid)
+            if not holders:
+                del self.listed_in[other]
+        if ranked:
+            self.results[uid] = ranked
+            for _, other in ranked:
+                self.listed_in.setdefault(other, set()).add(uid)
+        return old
+
+    def listings(self) -> Dict[str, Any]:
+        return repo.verified_listings()
+
+    def rebuild(self, listings: Dict[str, Any]) -> None:
+        # Only the engine thread touches the engine, so it is rebuilt in place
+        self.profiles, self.groups, self.order = {}, {}, {}
+        self.results, self.listed_in = {}, {}
+        for uid, user in listings.items():
+            profile = profile_of(user)
+            if profile is not None:
+                self._place(uid, profile)
+        for uid in self.profiles:
+            self._record(uid, self._top(uid))
+
+    def update(self, changed: Dict[str, Optional[Dict[str, Any]]]) -> Set[str]:
+        """Apply changed users (uid -> user, None if gone); returns uids whose stored matches are stale."""
+        stale: Set[str] = set()
+        for uid, user in changed.items():
+            self._unplace(uid)
+            profile = profile_of(user)
+            if profile is not None:
+                self._place(uid, profile)
+            stale.add(uid)
+            stale.update(self.listed_in.get(uid, ()))
+
+        # Users a changed listing now beats the N-th match of (scores are symmetric)
+        for uid in changed:
+            profile = self.profiles.get(uid)
+            if profile is None:
+                continue
+            for bound, group in self._candidates(profile.group):
+                for points, other in self.groups[group]:
+                    if other in stale:
+                        continue
+                    current = self.results.get(other, [])
+                    floor   = current[-1][0] if len(current) >= self.top_n else MIN_SCORE
+                    if round(pair_score(bound, points, profile.points), 4) > floor:
+                        stale.add(other)
+
+        dirty = set()
+        for uid in stale:
+            ranked = self._top(uid) if uid in self.profiles else []
+            old    = self._record(uid, ranked)
+            # A changed listing's card is shown in other users' matches
+            if ranked != old or any(other in changed for _, other in ranked):
+                dirty.add(uid)
+        metrics.inc("match_engine_reranked_total", len(stale))
+        return dirty
+
+    # Queries
+
+    def _candidates(self, group: Group) -> List[Tuple[float, Group]]:
+        order = self.order.get(group)
+        if order is None:
+            scored = ((group_score(group, other), other) for other in self.groups)
+            order  = self.order[group] = sorted((item for item in scored if item[0] >= MIN_SCORE),
+                                                key=lambda item: item[0], reverse=True)
+        return order
+
+    def _top(self, uid: str) -> Ranked:
+        me   = self.profiles[uid]
+        best : List[Tuple[float, str]] = []        # min-heap of the best top_n so far
+        for bound, group in self._candidates(me.group):
+            if len(best) == self.top_n and bound <= best[0][0]:
+                break
+            # Walk outwards from my points, best-balanced side first, so the
+            # score only falls and the walk can stop at the first miss.
+            members = self.groups[group]
+            right   = bisect.bisect_left(members, (me.points, ""))
+            left    = right - 1
+            while left >= 0 or right < len(members):
+                if right >= len(members) or (left >= 0 and points_balance(me.points, members[left][0])
+                                             > points_balance(me.points, members[right][0])):
+                    points, other = members[left]
+                    left -= 1
+                else:
+                    points, other = members[right]
+                    right += 1
+                if other == uid:
+                    continue
+                score = round(pair_score(bound, me.points, points), 4)
+                if score < MIN_SCORE:
+                    break
+                if len(best) < self.top_n:
+                    heapq.heappush(best, (score, other))
+                elif score > best[0][0]:
+                    heapq.heapreplace(best, (score, other))
+                else:
+                    break
+        return sorted(best, key=lambda item: (-item[0], item[1]))
+
+    def document(self, uid: str, updated_at: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """What gets stored at matches/<uid>, or None when there are no matches."""
+        ranked = self.results.get(uid)
+        if not ranked:
+            return None
+        return {
+            'updated_at' : updated_at or datetime.now(IST).strftime("%d-%m-%Y, %H:%M"),
+            'items'      : [{'uid': other, 'score': score, **self.profiles[other].card} for score, other in ranked],
+        }
+
+    # Change log
+
+    def apply(self, uids: Set[str]) -> Set[str]:
+        return self.update({uid: repo.get_user(uid) for uid in uids})
+
+def _items(document: Optional[Dict[str, Any]]) -> Any:
+    return (document or {}).get('items')
+
+def store_all(engine: MatchEngine) -> int:
+    """Write every user's matches whose stored copy differs; returns how many were written."""
+    stored  = repo.all_matches()
+    now     = datetime.now(IST).strftime("%d-%m-%Y, %H:%M")
+    changes = {}
+    for uid in set(stored) | set(engine.results):
+        document = engine.document(uid, now)
+        if _items(document) != _items(stored.get(uid)):
+            changes[uid] = document
+    if changes:
+        repo.set_matches(changes)
+    return len(changes)
+
+def store(engine: MatchEngine, uids: Set[str]) -> int:
+    if uids:
+        repo.set_matches({uid: engine.document(uid) for uid in uids})
+    return len(uids)
+
+def refresh_matches(engine: MatchEngine) -> int:
+    started = time.perf_counter()
+    dirty   = engine.refresh(listing_log_path())
+    written = store_all(engine) if dirty is None else store(engine, dirty)
+    if written:
+        metrics.inc("matches_written_total", written)
+        metrics.histogram("match_refresh_seconds", time.perf_counter() - started)
+    return written
+
+_state : Dict[str, Any] = {"pid": None, "engine": None}
+_lock  = threading.Lock()
+
+def _lead(lock_path: str):
+    """Block until this process holds the host-wide engine lock."""
+    if fcntl is None:
+        return None
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    fh = open(lock_path, "a")
+    while True:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fh
+        except OSError:
+            # Another worker runs the engine; take over if it goes away
+            time.sleep(REFRESH_INTERVAL)
+
+def _run(app) -> None:
+    handle = _lead(os.path.join(app.instance_path, "match_engine.lock"))
+    engine = _state["engine"] = MatchEngine()
+    log.info("match engine running in pid %d", os.getpid())
+    try:
+        while True:
+            try:
+                with app.app_context():
+                    refresh_matches(engine)
+            except Exception:
+                log.exception("match engine refresh failed")
+            time.sleep(REFRESH_INTERVAL)
+    finally:
+        if handle is not None:
+            handle.close()
+
+def init_matching(app) -> None:
+    metrics.register_gauge("match_engine_listings", lambda: len(_state["engine"] or ()))
+
+    @app.cli.command('matches-rebuild')
+    def matches_rebuild() -> None:
+        """Recompute every user's exchange matches and store the ones that changed."""
+        engine = MatchEngine()
+        engine.rebuild(engine.listings())
+        click.echo(f"{len(engine)} listings, {store_all(engine)} match lists written")
+
+    if not app.config.get("MATCH_ENGINE", True):
+        return
+
+    @app.before_request
+    def start_match_engine() -> None:
+        # Started from a request so it runs in the forked worker, not the master
+        pid = os.getpid()
+        if _state["pid"] == pid:
+            return
+        with _lock:
+            if _state["pid"] == pid:
+                return
+            threading.Thread(target=_run, args=(app,), name="match-engine", daemon=True).start()
+            _state["pid"] = pid
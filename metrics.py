@@ -0,0 +1,306 @@
+import os
+import json
+import math
+import time
+import atexit
+import fcntl
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Any, Tuple, Callable, List, Optional
+
+# Metric registry. Keys are (name, sorted label pairs).
+#
+# Each gunicorn worker records into its own in-memory registry and publishes a
+# snapshot of it every PUBLISH_INTERVAL seconds (and at exit) to
+# <METRICS_DIR>/<pid>-<token>.json. /metrics adds up the snapshots of every
+# worker, so counters and histograms cover the whole server whichever worker
+# answers the scrape. Files of workers that have exited (gunicorn recycles
+# them after max_requests) are folded into archive.json rather than dropped,
+# so totals never go backwards. gunicorn.conf.py empties the directory when
+# the server starts.
+#
+# Gauges are read live by the worker serving the scrape.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS    = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+COUNT_BUCKETS   = (0, 1, 2, 3, 5, 10, 20, 50)
+
+_lock         = threading.Lock()
+_counters     : Dict[Tuple, float] = defaultdict(float)
+_observations : Dict[Tuple, list]  = {}
+_histograms   : Dict[Tuple, list]  = {}
+_buckets      : Dict[str, Tuple]   = {}
+_gauges       : Dict[str, Callable[[], float]] = {}
+
+log = logging.getLogger(__name__)
+
+PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", 5))
+ARCHIVE_NAME     = "archive.json"
+LOCK_NAME        = ".lock"
+
+_shared : Dict[str, Any] = {"dir": None, "owner": None, "pid": None, "file": None}
+_shared_lock = threading.Lock()
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Increase a counter."""
+    with _lock:
+        _counters[_key(name, labels)] += amount
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one observation (count, sum, max) for a measured value."""
+    key = _key(name, labels)
+    with _lock:
+        stats = _observations.get(key)
+        if stats is None:
+            _observations[key] = [1, value, value]
+        else:
+            stats[0] += 1
+            stats[1] += value
+            stats[2]  = max(stats[2], value)
+
+def histogram(name: str, value: float, buckets: Tuple = LATENCY_BUCKETS, **labels) -> None:
+    """Record ``value`` in a cumulative-bucket histogram (buckets are fixed per name)."""
+    key = _key(name, labels)
+    with _lock:
+        bounds = _buckets.setdefault(name, tuple(buckets))
+        stats  = _histograms.get(key)
+        if stats is None:
+            stats = _histograms[key] = [[0] * len(bounds), 0, 0.0]
+        index = bisect_left(bounds, value)
+        if index < len(bounds):
+            stats[0][index] += 1
+        stats[1] += 1
+        stats[2] += value
+
+def register_gauge(name: str, read: Callable[[], float]) -> None:
+    """Report ``read()`` as gauge ``name`` at every scrape."""
+    _gauges[name] = read
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "counters"     : dict(_counters),
+            "observations" : {k: list(v) for k, v in _observations.items()},
+            "histograms"   : {k: [list(v[0]), v[1], v[2]] for k, v in _histograms.items()},
+        }
+
+# Sharing across worker processes
+
+def _serialise(data: Dict[str, Any]) -> Dict[str, Any]:
+    def rows(series):
+        return [[name, [list(pair) for pair in pairs], value] for (name, pairs), value in series.items()]
+    return {
+        "counters"     : rows(data["counters"]),
+        "observations" : rows(data["observations"]),
+        "histograms"   : rows(data["histograms"]),
+        "buckets"      : {name: list(bounds) for name, bounds in data.get("buckets", {}).items()},
+    }
+
+def _deserialise(raw: Dict[str, Any]) -> Dict[str, Any]:
+    def series(rows):
+        return {(name, tuple(tuple(pair) for pair in pairs)): value for name, pairs, value in rows}
+    return {
+        "counters"     : series(raw.get("counters", [])),
+        "observations" : series(raw.get("observations", [])),
+        "histograms"   : series(raw.get("histograms", [])),
+        "buckets"      : {name: tuple(bounds) for name, bounds in raw.get("buckets", {}).items()},
+    }
+
+def _empty() -> Dict[str, Any]:
+    return {"counters": {}, "observations": {}, "histograms": {}, "buckets": {}}
+
+def _merge(into: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in data["counters"].items():
+        into["counters"][key] = into["counters"].get(key, 0) + value
+    for key, (count, total, peak) in data["observations"].items():
+        stats = into["observations"].get(key)
+        into["observations"][key] = [count, total, peak] if stats is None else \
+            [stats[0] + count, stats[1] + total, max(stats[2], peak)]
+    for key, (counts, count, total) in data["histograms"].items():
+        stats = into["histograms"].get(key)
+        into["histograms"][key] = [list(counts), count, total] if stats is None else \
+            [[a + b for a, b in zip(stats[0], counts)], stats[1] + count, stats[2] + total]
+    for name, bounds in data["buckets"].items():
+        into["buckets"].setdefault(name, bounds)
+    return into
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _local() -> Dict[str, Any]:
+    return {**snapshot(), "buckets": dict(_buckets)}
+
+def use_directory(path: str) -> None:
+    """Share this process's metrics through ``path`` (see the top of the module)."""
+    os.makedirs(path, exist_ok=True)
+    _shared.update(dir=path, owner=os.getpid())
+    if _shared["pid"] == os.getpid():
+        _shared["file"] = os.path.join(path, os.path.basename(_shared["file"]))
+
+def reset_directory(path: str) -> None:
+    """Forget every published snapshot; called once when the server starts."""
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".json") or name.endswith(".tmp"):
+            os.remove(os.path.join(path, name))
+
+def publish() -> None:
+    """Write this process's snapshot for the other workers to read."""
+    if not _shared["dir"] or _shared["pid"] != os.getpid():
+        return
+    try:
+        _write_json(_shared["file"], _serialise(_local()))
+    except OSError:
+        log.exception("publishing metrics failed")
+
+def _run_publisher() -> None:
+    while True:
+        time.sleep(PUBLISH_INTERVAL)
+        publish()
+
+def ensure_publisher() -> None:
+    """Start publishing from this process (again after a fork)."""
+    pid = os.getpid()
+    if _shared["pid"] == pid or not _shared["dir"]:
+        return
+    with _shared_lock:
+        if _shared["pid"] == pid:
+            return
+        if _shared["owner"] != pid:
+            # A forked worker starts empty; what it inherited is the parent's to report
+            with _lock:
+                _counters.clear()
+                _observations.clear()
+                _histograms.clear()
+            _shared["owner"] = pid
+        _shared["file"] = os.path.join(_shared["dir"], f"{pid}-{os.urandom(4).hex()}.json")
+        _shared["pid"]  = pid
+        threading.Thread(target=_run_publisher, name="metrics-publisher", daemon=True).start()
+        atexit.register(publish)
+
+def _compact(directory: str, names: List[str]) -> Dict[str, Any]:
+    """Fold snapshots of exited workers into the archive; returns the archive's data."""
+    archive_path = os.path.join(directory, ARCHIVE_NAME)
+    archive      = _read_json(archive_path) or {"merged": [], "data": _serialise(_empty())}
+    merged       = set(archive["merged"]) & set(names)    # folded in, but not yet removed
+    data         = _deserialise(archive["data"])
+
+    dead = [name for name in names if name not in merged and not _alive(int(name.split("-", 1)[0]))]
+    for name in dead:
+        raw = _read_json(os.path.join(directory, name))
+        if raw is not None:
+            _merge(data, _deserialise(raw))
+    if dead:
+        # Record the folded files before removing them, so a crash in between cannot count them twice
+        _write_json(archive_path, {"merged": sorted(merged | set(dead)), "data": _serialise(data)})
+    for name in merged | set(dead):
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    return data
+
+def collect() -> Dict[str, Any]:
+    """Counters, observations and histograms summed over every worker."""
+    directory = _shared["dir"]
+    if not directory:
+        return _local()
+
+    publish()
+    own = os.path.basename(_shared["file"] or "")
+    with open(os.path.join(directory, LOCK_NAME), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        names = [name for name in os.listdir(directory)
+                 if name.endswith(".json") and name != ARCHIVE_NAME and name[0].isdigit()]
+        total = _compact(directory, names)
+        for name in names:
+            raw = _read_json(os.path.join(directory, name)) if name != own else None
+            if raw is not None:        # None also for the files just folded into the archive
+                _merge(total, _deserialise(raw))
+    # Our own registry is read live rather than from the file
+    return _merge(total, _local())
+
+# Prometheus text exposition (format 0.0.4)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def _grouped(series: Dict[Tuple, Any]) -> Dict[str, List]:
+    grouped = defaultdict(list)
+    for (name, pairs), value in sorted(series.items()):
+        grouped[name].append((pairs, value))
+    return grouped
+
+def render_prometheus() -> str:
+    data  = collect()
+    lines = []
+
+    for name, series in _grouped(data["counters"]).items():
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(f"{name}{_labels(pairs)} {_number(value)}" for pairs, value in series)
+
+    for name, series in _grouped(data["observations"]).items():
+        lines.append(f"# TYPE {name} summary")
+        for pairs, (count, total, _) in series:
+            lines.append(f"{name}_count{_labels(pairs)} {_number(count)}")
+            lines.append(f"{name}_sum{_labels(pairs)} {_number(total)}")
+        lines.append(f"# TYPE {name}_max gauge")
+        lines.extend(f"{name}_max{_labels(pairs)} {_number(peak)}" for pairs, (_, _, peak) in series)
+
+    for name, series in _grouped(data["histograms"]).items():
+        bounds = data["buckets"][name]
+        lines.append(f"# TYPE {name} histogram")
+        for pairs, (counts, count, total) in series:
+            running = 0
+            for bound, hits in zip(bounds, counts):
+                running += hits
+                lines.append(f"{name}_bucket{_labels(pairs + (('le', _number(bound)),))} {running}")
+            lines.append(f"{name}_bucket{_labels(pairs + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_count{_labels(pairs)} {count}")
+            lines.append(f"{name}_sum{_labels(pairs)} {_number(total)}")
+
+    for name, read in sorted(_gauges.items()):
+        try:
+            value = read()
+        except Exception:
+            continue
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
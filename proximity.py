@@ -0,0 +1,147 @@
+import csv
+import math
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils import is_valid_pin_code
+
+# "Homes near a PIN code" without scanning users.
+#
+# PIN codes are hierarchical: the first digit is the postal zone, two digits
+# the circle, three the sorting district, six the delivery office. Listings are
+# bucketed under each prefix of their PIN, so homes sharing a prefix with the
+# searched PIN are a handful of set lookups away; the longer the shared prefix,
+# the closer they are assumed to be (PREFIX_RADIUS_KM approximates the reach of
+# each level).
+#
+# When a PIN -> latitude/longitude table is configured (PIN_COORDINATES_PATH, a
+# CSV with pincode,latitude,longitude columns such as India Post's public
+# directory export), listings with a known PIN are also bucketed on a lat/long
+# grid, and nearby homes are the grid cells covering the radius, ranked by
+# haversine distance. PINs missing from the table fall back to the prefix
+# hierarchy.
+
+log = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM   = 6371.0
+CELL_DEGREES      = 0.5                    # grid cell edge, about 55 km
+DEFAULT_RADIUS_KM = 25.0
+MAX_RADIUS_KM     = 500.0
+
+# Rough reach of a shared PIN prefix of each length
+PREFIX_RADIUS_KM = {6: 3.0, 5: 10.0, 4: 25.0, 3: 60.0, 2: 250.0, 1: 800.0}
+
+_coordinates : Dict[str, Tuple[float, float]] = {}
+
+def load_pin_coordinates(path: str) -> Dict[str, Tuple[float, float]]:
+    """Read a pincode,latitude,longitude CSV; malformed rows are skipped."""
+    table: Dict[str, Tuple[float, float]] = {}
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            pin = (row.get("pincode") or "").strip()
+            try:
+                lat, lon = float(row["latitude"]), float(row["longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if is_valid_pin_code(pin) and -90 <= lat <= 90 and -180 <= lon <= 180:
+                table.setdefault(pin, (lat, lon))
+    return table
+
+def pin_location(pin: str) -> Optional[Tuple[float, float]]:
+    return _coordinates.get(pin)
+
+def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+def _cell(point: Tuple[float, float]) -> Tuple[int, int]:
+    return int(math.floor(point[0] / CELL_DEGREES)), int(math.floor(point[1] / CELL_DEGREES))
+
+class PinIndex:
+    def __init__(self):
+        self.pins     : Dict[str, str] = {}                   # uid -> pin
+        self.prefixes : Dict[str, Set[str]] = {}              # pin prefix -> uids
+        self.cells    : Dict[Tuple[int, int], Set[str]] = {}  # grid cell -> uids with coordinates
+        self.points   : Dict[str, Tuple[float, float]] = {}   # uid -> lat/long of its PIN
+
+    def add(self, uid: str, pin: str) -> None:
+        self.remove(uid)
+        pin = (pin or "").strip()
+        if not is_valid_pin_code(pin):
+            return
+        self.pins[uid] = pin
+        for length in range(1, 7):
+            self.prefixes.setdefault(pin[:length], set()).add(uid)
+        point = pin_location(pin)
+        if point is not None:
+            self.points[uid] = point
+            self.cells.setdefault(_cell(point), set()).add(uid)
+
+    def remove(self, uid: str) -> None:
+        pin = self.pins.pop(uid, None)
+        if pin is None:
+            return
+        for length in range(1, 7):
+            bucket = self.prefixes[pin[:length]]
+            bucket.discard(uid)
+            if not bucket:
+                del self.prefixes[pin[:length]]
+        point = self.points.pop(uid, None)
+        if point is not None:
+            cell   = _cell(point)
+            bucket = self.cells[cell]
+            bucket.discard(uid)
+            if not bucket:
+                del self.cells[cell]
+
+    def _by_prefix(self, pin: str, radius_km: float, found: Dict[str, float]) -> None:
+        # Longest shared prefix first; stop at the first level reaching past the radius
+        for length in range(6, 0, -1):
+            reach = PREFIX_RADIUS_KM[length]
+            if reach > radius_km and length < 6:
+                break
+            for uid in self.prefixes.get(pin[:length], ()):
+                if uid not in found:
+                    # Estimated distance, ordered within a level by PIN difference
+                    found[uid] = reach + abs(int(self.pins[uid]) - int(pin)) * 1e-6
+
+    def _by_distance(self, origin: Tuple[float, float], radius_km: float, found: Dict[str, float]) -> None:
+        lat_span = radius_km / 111.0
+        lon_span = radius_km / max(1e-6, 111.0 * math.cos(math.radians(origin[0])))
+        low, high = _cell((origin[0] - lat_span, origin[1] - lon_span)), _cell((origin[0] + lat_span, origin[1] + lon_span))
+        for x in range(low[0], high[0] + 1):
+            for y in range(low[1], high[1] + 1):
+                for uid in self.cells.get((x, y), ()):
+                    distance = haversine_km(origin, self.points[uid])
+                    if distance <= radius_km:
+                        found[uid] = distance
+
+    def nearby(self, pin: str, radius_km: float = DEFAULT_RADIUS_KM) -> Dict[str, float]:
+        """uid -> distance in km (estimated where coordinates are unknown) within ``radius_km``."""
+        if not is_valid_pin_code(pin):
+            return {}
+        radius_km = min(max(radius_km, 0.0), MAX_RADIUS_KM)
+        found: Dict[str, float] = {}
+
+        origin = pin_location(pin)
+        if origin is not None:
+            self._by_distance(origin, radius_km, found)
+        # Listings whose PIN has no coordinates (or when the searched PIN has none)
+        prefix_found: Dict[str, float] = {}
+        self._by_prefix(pin, radius_km, prefix_found)
+        for uid, distance in prefix_found.items():
+            if origin is None or uid not in self.points:
+                found.setdefault(uid, distance)
+        return found
+
+def init_proximity(app) -> None:
+    _coordinates.clear()
+    path = app.config.get("PIN_COORDINATES_PATH")
+    if not path:
+        return
+    try:
+        _coordinates.update(load_pin_coordinates(path))
+        log.info("loaded %d PIN coordinates from %s", len(_coordinates), path)
+    except OSError as exc:
+        log.warning("PIN coordinates not loaded from %s: %s", path, exc)
@@ -0,0 +1,39 @@
+import os
+from flask import request, session
+from flask_limiter import Limiter, RequestLimit
+from flask_limiter.util import get_remote_address
+import metrics
+
+# Limits are per client IP unless noted; the account limits key on the submitted
+# email (or the signed-in uid) so one account cannot be hammered from many IPs.
+# Storage defaults to memory:// (per worker); set RATELIMIT_STORAGE_URI for a
+# shared backend.
+
+LOGIN_LIMIT            = os.getenv("RATELIMIT_LOGIN",            "10 per minute;50 per hour")
+LOGIN_ACCOUNT_LIMIT    = os.getenv("RATELIMIT_LOGIN_ACCOUNT",    "5 per minute;20 per hour")
+SIGNUP_LIMIT           = os.getenv("RATELIMIT_SIGNUP",           "5 per minute;20 per hour")
+FORGOT_LIMIT           = os.getenv("RATELIMIT_FORGOT",           "3 per minute;10 per hour")
+FORGOT_ACCOUNT_LIMIT   = os.getenv("RATELIMIT_FORGOT_ACCOUNT",   "3 per hour")
+ADMIN_LOGIN_LIMIT      = os.getenv("RATELIMIT_ADMIN_LOGIN",      "5 per minute;20 per hour")
+PUBLIC_FORM_LIMIT      = os.getenv("RATELIMIT_PUBLIC_FORM",      "5 per minute;30 per hour")
+EXCHANGE_ACCOUNT_LIMIT = os.getenv("RATELIMIT_EXCHANGE_ACCOUNT", "10 per hour")
+
+# Endpoints whose clients expect a JSON error body (the auth modals).
+JSON_ENDPOINTS = {'main.signup', 'main.login', 'main.forgot_password', 'main.admin'}
+
+def account_key() -> str:
+    email = request.form.get('email', '').strip().lower()
+    return f"account:{email}" if email else get_remote_address()
+
+def session_account_key() -> str:
+    uid = session.get('user')
+    return f"uid:{uid}" if uid else get_remote_address()
+
+def count_rejection(limit: RequestLimit) -> None:
+    metrics.inc("rate_limit_rejected_total", endpoint=request.endpoint, limit=str(limit.limit))
+
+limiter = Limiter(
+    key_func        = get_remote_address,
+    on_breach       = count_rejection,
+    headers_enabled = True,
+)
@@ -0,0 +1,590 @@
+import os
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, NamedTuple, Iterable, Set
+
+import click
+from clients import admin_db
+
+# Data access for users, listings, exchange requests, plan inquiries, contact
+# forms, subscriptions and exchange matches.
+#
+# The domain methods live on Repository and are written against four path
+# primitives (get / set / update / delete) with Realtime Database semantics.
+# RtdbRepository maps those straight onto admin_db references; SqliteRepository
+# stores each collection in its own table, with the fields the site filters
+# and sorts on extracted into indexed columns, and overrides the hot queries.
+#
+# DATA_BACKEND selects the backend ("rtdb" by default, or "sqlite");
+# `flask data-sync` copies everything from one backend to the other.
+
+USERS             = 'users'
+EXCHANGE_REQUESTS = 'exchange_requests'
+PLAN_INQUIRIES    = 'plan_inquiries'
+CONTACT_FORMS     = 'contact_form'
+SUBSCRIPTIONS     = 'subscriptions'
+MATCHES           = 'matches'
+
+COLLECTIONS = (USERS, EXCHANGE_REQUESTS, PLAN_INQUIRIES, CONTACT_FORMS, SUBSCRIPTIONS, MATCHES)
+
+IMPORT_CHUNK_SIZE = 500
+
+def split_path(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+def _image_list(images: Any) -> List[str]:
+    if not images:
+        return []
+    if isinstance(images, dict):
+        return list(images.values())
+    return [image for image in images if image]
+
+class Repository(ABC):
+    name = "base"
+
+    # Path primitives
+
+    @abstractmethod
+    def get(self, path: str, shallow: bool = False) -> Any: ...
+
+    @abstractmethod
+    def set(self, path: str, value: Any) -> None: ...
+
+    @abstractmethod
+    def update(self, path: str, fields: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def delete(self, path: str) -> None: ...
+
+    def ping(self) -> bool:
+        try:
+            self.get('healthcheck', shallow=True)
+            return True
+        except Exception:
+            return False
+
+    def apply_updates(self, updates: Dict[str, Any]) -> None:
+        """One multi-path write from the root (``{"a/b": value, ...}``)."""
+        self.update('/', updates)
+
+    # Users
+
+    def get_user(self, uid: str) -> Optional[Dict[str, Any]]:
+        return self.get(f'{USERS}/{uid}')
+
+    def user_field(self, uid: str, field: str) -> Any:
+        return self.get(f'{USERS}/{uid}/{field}')
+
+    def all_users(self) -> Dict[str, Any]:
+        return self.get(USERS) or {}
+
+    def count_users(self) -> int:
+        return len(self.get(USERS, shallow=True) or {})
+
+    def create_user(self, uid: str, data: Dict[str, Any]) -> None:
+        self.set(f'{USERS}/{uid}', data)
+
+    def update_user(self, uid: str, fields: Dict[str, Any]) -> None:
+        self.update(f'{USERS}/{uid}', fields)
+
+    def find_uid_by_email(self, email: str) -> Optional[str]:
+        # A server-side query would need an ".indexOn" rule, so scan.
+        for uid, user in self.all_users().items():
+            if user.get('email') == email:
+                return uid
+        return None
+
+    def uids_by_email(self, emails: Iterable[str]) -> Dict[str, str]:
+        """email -> uid for the given emails that belong to a user, in one scan."""
+        wanted = set(emails)
+        found  = {}
+        if wanted:
+            for uid, user in self.all_users().items():
+                email = (user or {}).get('email')
+                if email in wanted and email not in found:
+                    found[email] = uid
+        return found
+
+    def existing_uids(self, uids: Iterable[str]) -> Set[str]:
+        """The given uids that have a user record (keys only, one shallow read)."""
+        wanted = set(uids)
+        return wanted & set(self.get(USERS, shallow=True) or {}) if wanted else set()
+
+    def set_membership(self, uid: str, fields: Dict[str, Any]) -> None:
+        self.update(f'{USERS}/{uid}/membership_details', fields)
+
+    def remove_membership(self, uid: str) -> None:
+        self.delete(f'{USERS}/{uid}/membership_details')
+
+    def add_guest_points(self, uid: str, increment: int) -> int:
+        try:
+            current = int(self.get(f'{USERS}/{uid}/gp_wallet/guest_points'))
+        except (TypeError, ValueError):
+            current = 0
+        total = current + increment
+        self.update(f'{USERS}/{uid}/gp_wallet', {'guest_points': total})
+        return total
+
+    # Listings (users/<uid>/properties)
+
+    def verified_listings(self, exclude_uid: Optional[str] = None) -> Dict[str, Any]:
+        """Users whose listing is verified, keyed by uid."""
+        return {
+            uid: data for uid, data in self.all_users().items()
+            if uid != exclude_uid and (data.get('properties') or {}).get('house_status') == "Verified"
+        }
+
+    def listed_users(self) -> Dict[str, Any]:
+        """Users with a listing in any review state."""
+        return {
+            uid: data for uid, data in self.all_users().items()
+            if 'properties' in data and (data['properties'].get('house_status') or '').strip() != ""
+        }
+
+    def update_listing(self, uid: str, fields: Dict[str, Any]) -> None:
+        self.update(f'{USERS}/{uid}/properties', fields)
+
+    def delete_listing(self, uid: str) -> None:
+        self.delete(f'{USERS}/{uid}/properties')
+
+    def listing_images(self, uid: str) -> List[str]:
+        return _image_list(self.get(f'{USERS}/{uid}/properties/images'))
+
+    def listing_images_of(self, uids: Iterable[str]) -> Dict[str, List[str]]:
+        """uid -> listing images for the given uids, in one read."""
+        wanted = set(uids)
+        if not wanted:
+            return {}
+        users = self.all_users()
+        return {uid: _image_list(((users.get(uid) or {}).get('properties') or {}).get('images')) for uid in wanted}
+
+    def set_listing_images(self, uid: str, images: List[str]) -> None:
+        self.set(f'{USERS}/{uid}/properties/images', images)
+
+    def reset_listing_review(self, uid: str) -> None:
+        """Send a listing edited by its owner back for verification."""
+        self.update_listing(uid, {'house_status': 'Not Verified', 'guest_points': '0'})
+
+    # Exchange requests (exchange_requests/<owner uid>/<request id>)
+
+    def exchange_requests(self) -> List[Dict[str, Any]]:
+        requests = []
+        for user_id, received in (self.get(EXCHANGE_REQUESTS) or {}).items():
+            for request_id, data in (received or {}).items():
+                requests.append({'user_id': user_id, 'request_id': request_id, **data})
+        return requests
+
+    def update_exchange_request(self, user_id: str, request_id: str, fields: Dict[str, Any]) -> None:
+        self.update(f'{EXCHANGE_REQUESTS}/{user_id}/{request_id}', fields)
+
+    # Plan inquiries, contact forms and subscriptions
+
+    def plan_inquiries(self) -> Dict[str, Any]:
+        return self.get(PLAN_INQUIRIES) or {}
+
+    def update_plan_inquiry(self, inquiry_id: str, fields: Dict[str, Any]) -> None:
+        self.update(f'{PLAN_INQUIRIES}/{inquiry_id}', fields)
+
+    def contact_forms(self) -> Dict[str, Any]:
+        return self.get(CONTACT_FORMS) or {}
+
+    def update_contact_form(self, form_id: str, fields: Dict[str, Any]) -> None:
+        self.update(f'{CONTACT_FORMS}/{form_id}', fields)
+
+    def subscriptions(self) -> Dict[str, Any]:
+        return self.get(SUBSCRIPTIONS) or {}
+
+    # Exchange match recommendations (matches/<uid>), written by matching.py
+
+    def matches(self, uid: str) -> Dict[str, Any]:
+        return self.get(f'{MATCHES}/{uid}') or {}
+
+    def all_matches(self) -> Dict[str, Any]:
+        return self.get(MATCHES) or {}
+
+    def set_matches(self, results: Dict[str, Optional[Dict[str, Any]]], chunk_size: int = IMPORT_CHUNK_SIZE) -> None:
+        """Replace the stored matches of each uid in ``results``; None removes them."""
+        items = [(f'{MATCHES}/{uid}', value or None) for uid, value in results.items()]
+        for start in range(0, len(items), chunk_size):
+            self.apply_updates(dict(items[start:start + chunk_size]))
+
+    # Bulk copy
+
+    def export_tree(self) -> Dict[str, Any]:
+        return {name: self.get(name) or {} for name in COLLECTIONS}
+
+    def import_tree(self, tree: Dict[str, Any], chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict[str, int]:
+        """Write every child of every collection in ``tree``, in chunked multi-path updates."""
+        counts = {}
+        for name, children in tree.items():
+            items = list((children or {}).items())
+            for start in range(0, len(items), chunk_size):
+                self.update(name, dict(items[start:start + chunk_size]))
+            counts[name] = len(items)
+        return counts
+
+class RtdbRepository(Repository):
+    name = "rtdb"
+
+    def get(self, path: str, shallow: bool = False) -> Any:
+        return admin_db.reference(path).get(shallow=shallow)
+
+    def set(self, path: str, value: Any) -> None:
+        admin_db.reference(path).set(value)
+
+    def update(self, path: str, fields: Dict[str, Any]) -> None:
+        admin_db.reference(path).update(fields)
+
+    def delete(self, path: str) -> None:
+        admin_db.reference(path).delete()
+
+# SQLite backend
+
+def _timestamp(value: Any) -> Optional[str]:
+    """'dd-mm-YYYY, HH:MM' as a sortable 'YYYY-mm-dd HH:MM'."""
+    try:
+        return datetime.strptime(value, "%d-%m-%Y, %H:%M").strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return None
+
+def _lower(value: Any) -> Optional[str]:
+    return value.strip().lower() if isinstance(value, str) else None
+
+def _field(*path: str) -> Callable[[Dict[str, Any]], Any]:
+    def extract(doc: Dict[str, Any]) -> Any:
+        for key in path:
+            doc = doc.get(key) if isinstance(doc, dict) else None
+        return doc
+    return extract
+
+class Table(NamedTuple):
+    name    : str
+    keys    : tuple                                    # key columns, outermost first
+    columns : Dict[str, Callable[[Dict[str, Any]], Any]]
+    indexes : tuple
+
+TABLES = {
+    USERS: Table("users", ("uid",), {
+        "email"         : _field("email"),
+        "submitted_at"  : lambda doc: _timestamp(_field("submitted_at")(doc)),
+        "house_status"  : _field("properties", "house_status"),
+        "city"          : lambda doc: _lower(_field("properties", "city")(doc)),
+        "location_type" : lambda doc: _lower(_field("properties", "location_type")(doc)),
+        "listed_at"     : lambda doc: _timestamp(_field("properties", "submitted_at")(doc)),
+    }, ("email", "submitted_at", "house_status", "city", "location_type", "listed_at")),
+    EXCHANGE_REQUESTS: Table("exchange_requests", ("user_id", "request_id"), {
+        "query_status"  : _field("query_status"),
+        "submitted_at"  : lambda doc: _timestamp(_field("submitted_at")(doc)),
+    }, ("query_status", "submitted_at")),
+    PLAN_INQUIRIES: Table("plan_inquiries", ("inquiry_id",), {
+        "action"        : _field("action"),
+        "submitted_at"  : lambda doc: _timestamp(_field("submitted_at")(doc)),
+    }, ("action", "submitted_at")),
+    CONTACT_FORMS: Table("contact_forms", ("form_id",), {
+        "query_status"  : _field("query_status"),
+        "submitted_at"  : lambda doc: _timestamp(_field("submitted_at")(doc)),
+    }, ("query_status", "submitted_at")),
+    SUBSCRIPTIONS: Table("subscriptions", ("subscription_id",), {
+        "email"         : _field("email"),
+        "submitted_at"  : lambda doc: _timestamp(_field("submitted_at")(doc)),
+    }, ("email", "submitted_at")),
+    MATCHES: Table("matches", ("uid",), {}, ()),
+}
+
+# Any other top-level node (healthcheck, ...) lives in a generic table.
+NODES = Table("nodes", ("collection", "node_key"), {}, ())
+
+def _prune(value: Any) -> Any:
+    """RTDB keeps no nulls or empty objects."""
+    if isinstance(value, dict):
+        cleaned = {k: v for k, v in ((k, _prune(v)) for k, v in value.items()) if v is not None}
+        return cleaned or None
+    if isinstance(value, list):
+        cleaned = [_prune(v) for v in value]
+        return cleaned if any(v is not None for v in cleaned) else None
+    return value
+
+def _navigate(value: Any, segments: List[str]) -> Any:
+    for segment in segments:
+        if isinstance(value, dict):
+            value = value.get(segment)
+        elif isinstance(value, list) and segment.isdigit() and int(segment) < len(value):
+            value = value[int(segment)]
+        else:
+            return None
+    return value
+
+def _assign(doc: Any, segments: List[str], value: Any) -> Any:
+    """Return ``doc`` with ``value`` placed at ``segments`` (None removes it)."""
+    if not segments:
+        return value
+    if isinstance(doc, list):
+        doc = {str(i): v for i, v in enumerate(doc)}
+    if not isinstance(doc, dict):
+        doc = {}
+    head, rest = segments[0], segments[1:]
+    doc[head] = _assign(doc.get(head), rest, value)
+    return doc
+
+class SqliteRepository(Repository):
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        # No connection here: create_app runs in the gunicorn master with
+        # preload_app, and a SQLite handle must not cross a fork.
+        self.path         = path
+        self._local       = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_pid  = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in list(TABLES.values()) + [NODES]:
+                columns = ", ".join(f"{c} TEXT NOT NULL" for c in table.keys)
+                extra   = "".join(f", {c} TEXT" for c in table.columns)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table.name} "
+                             f"({columns}, doc TEXT NOT NULL{extra}, PRIMARY KEY ({', '.join(table.keys)}))")
+                for column in table.indexes:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {table.name}_{column} ON {table.name} ({column})")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process, reused across calls; reads
+        # need no transaction under WAL, writes take the write lock up front.
+        pid  = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, pid
+            if self._schema_pid != pid:
+                with self._schema_lock:
+                    if self._schema_pid != pid:
+                        self._create_schema(conn)
+                        self._schema_pid = pid
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _scope(self, segments: List[str]):
+        """(table, fixed key values, remaining path) for a path below a collection."""
+        if segments[0] in TABLES:
+            return TABLES[segments[0]], [], segments[1:]
+        return NODES, [segments[0]], segments[1:]
+
+    # Row access
+
+    def _select(self, conn, table: Table, key: List[str], what: str = "doc"):
+        where = " AND ".join(f"{c} = ?" for c in table.keys[:len(key)]) or "1"
+        order = ", ".join(table.keys)
+        return conn.execute(f"SELECT {what} FROM {table.name} WHERE {where} ORDER BY {order}", key)
+
+    def _write_row(self, conn, table: Table, key: List[str], doc: Any) -> None:
+        doc = _prune(doc)
+        if doc is None:
+            where = " AND ".join(f"{c} = ?" for c in table.keys)
+            conn.execute(f"DELETE FROM {table.name} WHERE {where}", key)
+            return
+        source  = doc if isinstance(doc, dict) else {}
+        columns = list(table.keys) + ["doc"] + list(table.columns)
+        values  = list(key) + [json.dumps(doc)] + [extract(source) for extract in table.columns.values()]
+        conn.execute(f"INSERT OR REPLACE INTO {table.name} ({', '.join(columns)}) "
+                     f"VALUES ({', '.join('?' * len(columns))})", values)
+
+    def _tree(self, conn, table: Table, key: List[str], shallow: bool) -> Any:
+        depth = len(key)
+        keys  = ", ".join(table.keys)
+        tree  : Dict[str, Any] = {}
+        for row in self._select(conn, table, key, f"{keys}, doc"):
+            node = tree
+            for part in row[depth:-2]:
+                node = node.setdefault(part, {})
+            node[row[-2]] = True if shallow and depth == len(table.keys) - 1 else json.loads(row[-1])
+        if shallow:
+            return {k: True for k in tree} or None
+        return tree or None
+
+    # Path primitives
+
+    def _get(self, conn, segments: List[str], shallow: bool) -> Any:
+        if not segments:
+            tree = {name: self._get(conn, [name], shallow) for name in self._collections(conn)}
+            tree = {k: v for k, v in tree.items() if v is not None}
+            return ({k: True for k in tree} if shallow else tree) or None
+
+        table, fixed, rest = self._scope(segments)
+        key = fixed + rest[:len(table.keys) - len(fixed)]
+        if len(key) < len(table.keys):
+            return self._tree(conn, table, key, shallow)
+
+        row   = self._select(conn, table, key).fetchone()
+        value = _navigate(json.loads(row[0]), rest[len(key) - len(fixed):]) if row else None
+        if shallow and isinstance(value, (dict, list)):
+            return {str(k): True for k in (value if isinstance(value, dict) else range(len(value)))}
+        return value
+
+    def _set(self, conn, segments: List[str], value: Any) -> None:
+        if not segments:
+            for name in self._collections(conn):
+                self._set(conn, [name], None)
+            for name, child in (value or {}).items():
+                self._set(conn, [name], child)
+            return
+
+        table, fixed, rest = self._scope(segments)
+        key = fixed + rest[:len(table.keys) - len(fixed)]
+        if len(key) < len(table.keys):
+            # Replacing a subtree: drop its rows, then write each child
+            where = " AND ".join(f"{c} = ?" for c in table.keys[:len(key)]) or "1"
+            conn.execute(f"DELETE FROM {table.name} WHERE {where}", key)
+            if isinstance(value, dict):
+                for child_key, child in value.items():
+                    self._set(conn, segments + [child_key], child)
+            return
+
+        sub = rest[len(key) - len(fixed):]
+        if sub:
+            row   = self._select(conn, table, key).fetchone()
+            value = _assign(json.loads(row[0]) if row else {}, sub, value)
+        self._write_row(conn, table, key, value)
+
+    def _collections(self, conn) -> List[str]:
+        nodes = [row[0] for row in conn.execute(f"SELECT DISTINCT collection FROM {NODES.name}")]
+        return list(TABLES) + nodes
+
+    def get(self, path: str, shallow: bool = False) -> Any:
+        return self._get(self._connection(), split_path(path), shallow)
+
+    def set(self, path: str, value: Any) -> None:
+        if value is None:
+            raise ValueError("Value must not be None.")
+        with self._transaction() as conn:
+            self._set(conn, split_path(path), value)
+
+    def update(self, path: str, fields: Dict[str, Any]) -> None:
+        if not fields or not isinstance(fields, dict):
+            raise ValueError("Value argument must be a non-empty dictionary.")
+        base = split_path(path)
+        with self._transaction() as conn:
+            for child, value in fields.items():
+                self._set(conn, base + split_path(child), value)
+
+    def delete(self, path: str) -> None:
+        with self._transaction() as conn:
+            self._set(conn, split_path(path), None)
+
+    def ping(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    # Indexed queries
+
+    def _users_where(self, where: str, params: tuple = ()) -> Dict[str, Any]:
+        rows = self._connection().execute(f"SELECT uid, doc FROM users WHERE {where} ORDER BY uid", params)
+        return {uid: json.loads(doc) for uid, doc in rows}
+
+    def count_users(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def find_uid_by_email(self, email: str) -> Optional[str]:
+        row = self._connection().execute("SELECT uid FROM users WHERE email = ? LIMIT 1", (email,)).fetchone()
+        return row[0] if row else None
+
+    def _column_in(self, column: str, values: Iterable[str]) -> List[tuple]:
+        values, rows = list(values), []
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            rows.extend(self._connection().execute(
+                f"SELECT {column}, uid FROM users WHERE {column} IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def uids_by_email(self, emails: Iterable[str]) -> Dict[str, str]:
+        found = {}
+        for email, uid in self._column_in("email", set(emails)):
+            found.setdefault(email, uid)
+        return found
+
+    def existing_uids(self, uids: Iterable[str]) -> Set[str]:
+        return {uid for uid, _ in self._column_in("uid", set(uids))}
+
+    def listing_images_of(self, uids: Iterable[str]) -> Dict[str, List[str]]:
+        uids, found = list(set(uids)), {}
+        for start in range(0, len(uids), 500):
+            chunk = uids[start:start + 500]
+            found.update(self._users_where(f"uid IN ({', '.join('?' * len(chunk))})", tuple(chunk)))
+        return {uid: _image_list(((found.get(uid) or {}).get('properties') or {}).get('images')) for uid in uids}
+
+    def verified_listings(self, exclude_uid: Optional[str] = None) -> Dict[str, Any]:
+        return self._users_where("house_status = 'Verified' AND uid != ?", (exclude_uid or "",))
+
+    def listed_users(self) -> Dict[str, Any]:
+        return self._users_where("TRIM(COALESCE(house_status, '')) != ''")
+
+    def exchange_requests(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute("SELECT user_id, request_id, doc FROM exchange_requests ORDER BY user_id, request_id")
+        return [{'user_id': user_id, 'request_id': request_id, **json.loads(doc)} for user_id, request_id, doc in rows]
+
+# Active backend
+
+_active : Dict[str, Repository] = {"repo": RtdbRepository()}
+
+def build_repository(backend: str, sqlite_path: Optional[str] = None) -> Repository:
+    if backend == "sqlite":
+        return SqliteRepository(sqlite_path)
+    if backend == "rtdb":
+        return RtdbRepository()
+    raise ValueError(f"Unknown data backend: {backend!r}")
+
+class _ActiveRepository:
+    """Module-level handle that forwards to the configured backend."""
+
+    def __getattr__(self, attr: str):
+        return getattr(_active["repo"], attr)
+
+repo = _ActiveRepository()
+
+def _sqlite_path(app) -> str:
+    return app.config.get("SQLITE_DATABASE_PATH") or os.path.join(app.instance_path, "cosmo.sqlite3")
+
+def init_repository(app) -> None:
+    _active["repo"] = build_repository(app.config.get("DATA_BACKEND") or "rtdb", _sqlite_path(app))
+
+    @app.cli.command('data-sync')
+    @click.argument('source', type=click.Choice(["rtdb", "sqlite"]))
+    @click.argument('target', type=click.Choice(["rtdb", "sqlite"]))
+    @click.option('--sqlite-path', help="SQLite file (defaults to SQLITE_DATABASE_PATH).")
+    def data_sync(source: str, target: str, sqlite_path: Optional[str]) -> None:
+        """Copy every collection from SOURCE to TARGET (existing children are overwritten)."""
+        if source == target:
+            raise click.UsageError("SOURCE and TARGET must differ.")
+
+        path   = sqlite_path or _sqlite_path(app)
+        counts = build_repository(target, path).import_tree(build_repository(source, path).export_tree())
+        for name, count in counts.items():
+            click.echo(f"{name}: {count}")
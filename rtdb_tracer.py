@@ -0,0 +1,95 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+from flask import g, request, has_request_context
+from clients import add_db_listener
+
+# RTDB tracing mode (RTDB_TRACE=1). Logs every database access and, per
+# request, flags reads that repeat or overlap an earlier read, plus reads above
+# the size or time thresholds, then logs a one-line summary for the request.
+
+log = logging.getLogger("rtdb.trace")
+
+READ_OPERATIONS = {"get", "get_if_changed"}
+
+def _covers(earlier: Dict[str, Any], path: str) -> bool:
+    """Whether a full (non-shallow, unfiltered) read of ``earlier`` already returned ``path``."""
+    if earlier["shallow"] or earlier["query"]:
+        return False
+    base = earlier["path"].rstrip("/")
+    return path == base or path.startswith(base + "/") or base == ""
+
+def _overlap(trace: List[Dict[str, Any]], access: Dict[str, Any]) -> Optional[str]:
+    reads = [earlier for earlier in trace if earlier["op"] in READ_OPERATIONS]
+    target = (access["path"], access["query"], access["shallow"])
+    if any((earlier["path"], earlier["query"], earlier["shallow"]) == target for earlier in reads):
+        return "duplicate"
+    for earlier in reads:
+        if _covers(earlier, access["path"]) or (not access["shallow"] and not access["query"] and _covers(access, earlier["path"])):
+            return f"overlaps {earlier['path']}"
+    return None
+
+def _describe(access: Dict[str, Any]) -> str:
+    query = f"?{access['query']}" if access["query"] else ""
+    return (f"{access['op']} {access['path']}{query} shallow={access['shallow']} "
+            f"{access['nbytes']}B {access['seconds'] * 1000:.1f}ms")
+
+class RtdbTracer:
+    def __init__(self, large_bytes: int, slow_seconds: float):
+        self.large_bytes  = large_bytes
+        self.slow_seconds = slow_seconds
+
+    def record(self, op: str, path: str, query: str, shallow: bool, seconds: float, nbytes: int, error) -> None:
+        access = {"op": op, "path": path, "query": query, "shallow": shallow,
+                  "seconds": seconds, "nbytes": nbytes, "flags": []}
+
+        if has_request_context() and "rtdb_trace" in g:
+            trace = g.rtdb_trace
+            if op in READ_OPERATIONS:
+                overlap = _overlap(trace, access)
+                if overlap:
+                    access["flags"].append(overlap)
+            trace.append(access)
+        if nbytes > self.large_bytes:
+            access["flags"].append("large")
+        if seconds > self.slow_seconds:
+            access["flags"].append("slow")
+        if error:
+            access["flags"].append(f"error={error}")
+
+        origin = f"{request.method} {request.path}" if has_request_context() else "background"
+        flags  = f" [{', '.join(access['flags'])}]" if access["flags"] else ""
+        level  = logging.WARNING if access["flags"] else logging.INFO
+        log.log(level, "%s: %s%s", origin, _describe(access), flags)
+
+    def start_request(self) -> None:
+        g.rtdb_trace = []
+
+    def summarize_request(self, exc=None) -> None:
+        trace = g.pop("rtdb_trace", None)
+        if not trace:
+            return
+
+        reads = [a for a in trace if a["op"] in READ_OPERATIONS]
+        flags = [flag.split(" ")[0] for a in trace for flag in a["flags"]]
+        counts = ", ".join(f"{flags.count(f)} {f}" for f in sorted(set(flags)))
+
+        log.log(logging.WARNING if flags else logging.INFO,
+                "%s %s (%s): %d rtdb calls, %d reads, %d bytes read, %.1fms%s",
+                request.method, request.path, request.endpoint, len(trace), len(reads),
+                sum(a["nbytes"] for a in reads), sum(a["seconds"] for a in trace) * 1000,
+                f"; {counts}" if counts else "")
+
+def init_rtdb_tracer(app) -> None:
+    if not app.config.get("RTDB_TRACE"):
+        return
+
+    tracer = RtdbTracer(app.config.get("RTDB_TRACE_LARGE_BYTES", 256_000),
+                        app.config.get("RTDB_TRACE_SLOW_SECONDS", 0.5))
+    add_db_listener(tracer.record)
+    app.before_request(tracer.start_request)
+    app.teardown_request(tracer.summarize_request)
+
+    if not log.handlers and not logging.getLogger().handlers:
+        logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    log.setLevel(logging.INFO)
@@ -0,0 +1,384 @@
+import os
+import re
+import math
+import heapq
+import bisect
+import time
+import logging
+import threading
+from collections import defaultdict
+from operator import itemgetter
+from typing import Dict, Any, List, Optional, Set, Tuple, NamedTuple, Union
+
+import metrics
+from caching import ListingLogFollower, listing_log_path, mark_listings_stale
+from repository import repo
+from facets import FacetIndex, selection_mask
+from proximity import PinIndex, DEFAULT_RADIUS_KM
+
+# Full-text search over verified listings.
+#
+# Each worker keeps an inverted index (token -> {uid: weight}) over the
+# searchable fields of users/<uid>/properties. It is built once from the
+# repository and then kept current from the listing change log: before each
+# query it re-reads only the listings whose uids were appended since. A rotated
+# or truncated log, or a backlog larger than REBUILD_THRESHOLD, triggers a
+# rebuild.
+#
+# Query terms are ANDed. A term matches a token exactly or as a prefix
+# (scored lower), and documents are ranked by the sum over terms of the best
+# field-weighted, idf-scaled match. Feature, city and location type filters
+# and the facet counts come from the bitsets in facets.py, and "near a PIN"
+# from proximity.py; both are maintained alongside the postings. Following the
+# log is caching.ListingLogFollower, shared with admin_homes and matching.
+#
+# The build itself runs in a background thread, started with the app, or under
+# gunicorn with preload_app from post_fork in each worker (the master opens no
+# Firebase clients). Later rebuilds (a rotated log, a large backlog) are built
+# aside while queries keep the previous index. Only until a worker's first build
+# is done are searches served by ListingScan: one pass over the listings, as
+# before the index, shared by all requests, with text matches unranked. Pages
+# answered from a stale index or the scan are not cached (caching.
+# mark_listings_stale). SEARCH_WARM_INDEX off builds on the first search
+# instead, in the request.
+
+log = logging.getLogger(__name__)
+
+FIELD_WEIGHTS = {
+    "title"             : 3.0,
+    "city"              : 3.0,
+    "state"             : 2.0,
+    "location_type"     : 2.0,
+    "property_type"     : 2.0,
+    "amenities"         : 1.5,
+    "unique_facilities" : 1.5,
+    "address"           : 1.0,
+    "description"       : 1.0,
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was with".split()
+)
+
+MIN_PREFIX_LENGTH   = 2
+MAX_PREFIX_TOKENS   = 50      # most frequent tokens a prefix expands to
+PREFIX_WEIGHT       = 0.6
+REBUILD_THRESHOLD   = int(os.getenv("SEARCH_REBUILD_THRESHOLD", 5000))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def _fold(token: str) -> str:
+    # Plural folding: "villas" ~ "villa", "homes" ~ "home"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [_fold(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value if v)
+    if isinstance(value, dict):
+        return " ".join(str(v) for v in value.values() if v)
+    return str(value or "")
+
+def document_weights(properties: Dict[str, Any]) -> Dict[str, float]:
+    """Token -> field-weighted, log-scaled term frequency for one listing."""
+    weights: Dict[str, float] = defaultdict(float)
+    for field, field_weight in FIELD_WEIGHTS.items():
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokenize(_field_text(properties.get(field))):
+            counts[token] += 1
+        for token, count in counts.items():
+            weights[token] += field_weight * (1 + math.log(count))
+    return dict(weights)
+
+class ListingIndex(ListingLogFollower):
+    rebuild_threshold = REBUILD_THRESHOLD
+    metrics_prefix    = "search_index"
+
+    def __init__(self):
+        super().__init__()
+        self.lock         = threading.RLock()       # guards the structures below
+        self.postings     : Dict[str, Dict[str, float]] = {}
+        self.vocab        : List[str] = []                    # sorted, for prefix lookups
+        self.docs         : Dict[str, Tuple[str, ...]] = {}   # uid -> its tokens
+        self.features     = FacetIndex()                      # feature / city bitsets
+        self.places       = PinIndex()                        # PIN prefixes and grid
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # Maintenance
+
+    def after_fork(self) -> None:
+        super().after_fork()
+        self.lock = threading.RLock()
+
+    def _remove(self, uid: str) -> None:
+        for token in self.docs.pop(uid, ()):
+            posting = self.postings[token]
+            posting.pop(uid, None)
+            if not posting:
+                del self.postings[token]
+                del self.vocab[bisect.bisect_left(self.vocab, token)]
+        self.features.remove(uid)
+        self.places.remove(uid)
+
+    def _add(self, uid: str, properties: Dict[str, Any]) -> List[str]:
+        """Post ``uid``'s tokens; returns tokens seen for the first time."""
+        new_tokens = []
+        weights    = document_weights(properties)
+        for token, weight in weights.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                new_tokens.append(token)
+            posting[uid] = weight
+        self.docs[uid] = tuple(weights)
+        self.features.add(uid, properties)
+        self.places.add(uid, properties.get('pin_code'))
+        return new_tokens
+
+    def index(self, uid: str, user: Optional[Dict[str, Any]]) -> None:
+        """(Re)index ``uid``; listings that are missing or not verified are dropped."""
+        properties = (user or {}).get('properties') or {}
+        with self.lock:
+            self._remove(uid)
+            if properties.get('house_status') == "Verified":
+                for token in self._add(uid, properties):
+                    bisect.insort(self.vocab, token)
+
+    def listings(self) -> Dict[str, Any]:
+        return repo.verified_listings()
+
+    def rebuild(self, listings: Dict[str, Any]) -> None:
+        # Built aside and swapped in, so queries keep using the old index meanwhile
+        fresh = ListingIndex()
+        for uid, user in listings.items():
+            properties = (user or {}).get('properties') or {}
+            if properties.get('house_status') == "Verified":
+                fresh._add(uid, properties)
+        fresh.features.finalize()
+        with self.lock:
+            self.postings, self.docs, self.features = fresh.postings, fresh.docs, fresh.features
+            self.places = fresh.places
+            self.vocab = sorted(fresh.postings)
+
+    def apply(self, uids: Set[str]) -> Set[str]:
+        for uid in uids:
+            self.index(uid, repo.get_user(uid))
+        return uids
+
+    # Queries
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Tokens matched by ``term``, with the multiplier each match earns."""
+        matches = [(term, 1.0)] if term in self.postings else []
+        if len(term) >= MIN_PREFIX_LENGTH:
+            prefixed = []
+            for position in range(bisect.bisect_left(self.vocab, term), len(self.vocab)):
+                token = self.vocab[position]
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    prefixed.append(token)
+            prefixed.sort(key=lambda token: len(self.postings[token]), reverse=True)
+            matches.extend((token, PREFIX_WEIGHT) for token in prefixed[:MAX_PREFIX_TOKENS])
+        return matches
+
+    def _score(self, terms: List[str]) -> Dict[str, float]:
+        """uid -> score for documents matching every term."""
+        total  = len(self.docs) or 1
+        scores : Optional[Dict[str, float]] = None
+        # Rarest terms first, so the candidate set shrinks quickly
+        for term in sorted(terms, key=lambda t: len(self.postings.get(t, ())) or total):
+            best: Optional[Dict[str, float]] = None
+            for token, multiplier in self._expand(term):
+                posting = self.postings[token]
+                factor  = math.log(1 + total / len(posting)) * multiplier
+                if scores is None:
+                    part = {uid: w * factor for uid, w in posting.items()}
+                elif len(posting) <= len(scores):
+                    part = {uid: w * factor for uid, w in posting.items() if uid in scores}
+                else:
+                    part = {uid: posting[uid] * factor for uid in scores if uid in posting}
+                if best is None:
+                    best = part
+                else:
+                    for uid, score in part.items():
+                        if score > best.get(uid, 0.0):
+                            best[uid] = score
+            if not best:
+                return {}
+            scores = best if scores is None else {uid: scores[uid] + score for uid, score in best.items()}
+        return scores or {}
+
+    def find(self, query: str = '', city: str = '', location_type: str = '',
+             features: Optional[Dict[str, List[str]]] = None, exclude_uid: Optional[str] = None,
+             offset: int = 0, limit: Optional[int] = None,
+             near: str = '', radius_km: float = DEFAULT_RADIUS_KM) -> "ListingMatches":
+        """
+        Listings with every selected feature, in the given city / location
+        type (lowercased), matching all terms of ``query`` and within
+        ``radius_km`` of the PIN ``near`` when those are set. Ordered by
+        distance when ``near`` is given, else by text score, else by uid.
+        """
+        stop = offset + limit if limit is not None else None
+        with self.lock:
+            bits = self.features.select(selection_mask(features or {}), city, location_type, exclude_uid)
+
+            if query.strip() or near:
+                scores    = self._score(list(dict.fromkeys(tokenize(query)))) if query.strip() else None
+                distances = self.places.nearby(near, radius_km) if near else None
+                if scores is not None and distances is not None:
+                    ranking = {uid: (distances[uid], -score) for uid, score in scores.items() if uid in distances}
+                elif distances is not None:
+                    ranking = {uid: (distance,) for uid, distance in distances.items()}
+                else:
+                    ranking = {uid: (-score,) for uid, score in scores.items()}
+
+                if bits != self.features.alive:
+                    allowed = set(self.features.uids_in(bits))
+                    ranking = {uid: key for uid, key in ranking.items() if uid in allowed}
+                bits  = self.features.bitset_of(ranking)
+                total = len(ranking)
+                if stop is None:
+                    ranked = sorted(ranking.items(), key=itemgetter(1))
+                else:
+                    ranked = heapq.nsmallest(stop, ranking.items(), key=itemgetter(1))
+                uids = [uid for uid, _ in ranked[offset:]]
+            else:
+                matched = sorted(self.features.uids_in(bits))
+                total   = len(matched)
+                uids    = matched[offset:stop]
+
+            return ListingMatches(total, uids, self.features.counts(bits))
+
+    def facet_values(self) -> Tuple[List[str], List[str]]:
+        """Sorted distinct cities and location types of indexed listings."""
+        with self.lock:
+            return self.features.group_values("city"), self.features.group_values("location_type")
+
+class ListingMatches(NamedTuple):
+    total  : int
+    uids   : List[str]                      # the requested page
+    counts : Dict[str, Dict[str, int]]      # feature field -> value -> matches carrying it
+
+class ListingScan:
+    """
+    ListingIndex.find() and facet_values() by one pass over ``listings``, for
+    a worker whose index is still being built. Text matches are not ranked.
+    """
+    def __init__(self, listings: Dict[str, Any]):
+        self.properties : Dict[str, Dict[str, Any]] = {}
+        self.features   = FacetIndex()
+        self.places     = PinIndex()
+        for uid, user in listings.items():
+            properties = (user or {}).get('properties') or {}
+            if properties.get('house_status') == "Verified":
+                self.properties[uid] = properties
+                self.features.add(uid, properties)
+                self.places.add(uid, properties.get('pin_code'))
+        self.features.finalize()
+
+    def _matches(self, uid: str, terms: List[str]) -> bool:
+        properties = self.properties[uid]
+        tokens     = set(tokenize(" ".join(_field_text(properties.get(field)) for field in FIELD_WEIGHTS)))
+        return all(
+            term in tokens or (len(term) >= MIN_PREFIX_LENGTH and any(token.startswith(term) for token in tokens))
+            for term in terms
+        )
+
+    def find(self, query: str = '', city: str = '', location_type: str = '',
+             features: Optional[Dict[str, List[str]]] = None, exclude_uid: Optional[str] = None,
+             offset: int = 0, limit: Optional[int] = None,
+             near: str = '', radius_km: float = DEFAULT_RADIUS_KM) -> "ListingMatches":
+        bits  = self.features.select(selection_mask(features or {}), city, location_type, exclude_uid)
+        uids  = sorted(self.features.uids_in(bits))
+        terms = list(dict.fromkeys(tokenize(query)))
+        if terms:
+            uids = [uid for uid in uids if self._matches(uid, terms)]
+        if near:
+            distances = self.places.nearby(near, radius_km)
+            uids      = sorted((uid for uid in uids if uid in distances), key=distances.__getitem__)
+        if terms or near:
+            bits = self.features.bitset_of(uids)
+        stop = offset + limit if limit is not None else None
+        return ListingMatches(len(uids), uids[offset:stop], self.features.counts(bits))
+
+    def facet_values(self) -> Tuple[List[str], List[str]]:
+        return self.features.group_values("city"), self.features.group_values("location_type")
+
+_index = ListingIndex()
+_build = {"app": None, "background": False, "pid": None, "thread": None, "scan": None}
+_lock       = threading.Lock()
+_scan_lock  = threading.Lock()
+
+def _first_build_scan() -> ListingScan:
+    # One scan per worker, shared by every request until the first build lands
+    scan = _build["scan"]
+    if scan is None:
+        with _scan_lock:
+            scan = _build["scan"]
+            if scan is None:
+                metrics.inc("search_index_fallbacks_total")
+                scan = _build["scan"] = ListingScan(repo.verified_listings())
+    return scan
+
+def listing_index() -> Union[ListingIndex, ListingScan]:
+    """
+    The worker's index, caught up with the listing log. While a rebuild runs
+    in the background this is the previous index; before the first build is
+    done, a ListingScan shared by all requests.
+    """
+    background = _build["background"]
+    if _index.refresh(listing_log_path(), rebuild=not background) is not None or not background:
+        _build["scan"] = None
+        return _index
+    start_index_build()
+    mark_listings_stale()
+    return _index if _index.built else _first_build_scan()
+
+def find_listings(query: str = '', city: str = '', location_type: str = '',
+                  features: Optional[Dict[str, List[str]]] = None, exclude_uid: Optional[str] = None,
+                  offset: int = 0, limit: Optional[int] = None,
+                  near: str = '', radius_km: float = DEFAULT_RADIUS_KM) -> ListingMatches:
+    started = time.perf_counter()
+    result  = listing_index().find(query, city.lower(), location_type.lower(), features, exclude_uid,
+                                   offset, limit, near, radius_km)
+    metrics.histogram("search_seconds", time.perf_counter() - started)
+    return result
+
+def _build_index(app) -> None:
+    try:
+        with app.app_context():
+            _index.refresh(listing_log_path())
+    except Exception:
+        log.exception("search index build failed")
+
+def start_index_build() -> None:
+    """Build or catch up the index in a background thread, unless one is already running in this process."""
+    app = _build["app"]
+    if app is None or not _build["background"]:
+        return
+    pid = os.getpid()
+    with _lock:
+        if _build["pid"] == pid and _build["thread"].is_alive():
+            return
+        if _build["pid"] != pid:
+            _index.after_fork()
+            _build["scan"] = None
+        thread = threading.Thread(target=_build_index, args=(app,), name="search-index-build", daemon=True)
+        _build.update(pid=pid, thread=thread)
+        thread.start()
+
+def init_search(app) -> None:
+    metrics.register_gauge("search_index_documents", lambda: len(_index))
+    _build.update(app=app, background=bool(app.config.get("SEARCH_WARM_INDEX", True)))
+    # A preloading gunicorn master leaves the build to post_fork in each worker:
+    # a thread here would open Firebase clients in the master, and a worker
+    # forked while it held a lock would inherit the lock held
+    if os.environ.get("GUNICORN_PRELOAD_PID") != str(os.getpid()):
+        start_index_build()
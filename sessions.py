@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import secrets
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import click
+from flask import Flask, Request, Response
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+import metrics
+
+# Server-side sessions.
+#
+# The cookie carries only a signed, random session id; the session data (the
+# Firebase id/refresh tokens, uid and email) stays on the server. The store is
+# a SQLite file in WAL mode (SESSION_BACKEND "sqlite", the default), shared by
+# all workers on the host and surviving restarts; point SESSION_SQLITE_PATH at
+# /dev/shm for a RAM-backed shared store. "memory" keeps sessions in a dict in
+# the process, for a single-process server or tests.
+#
+# Sessions expire SESSION_IDLE_SECONDS after their last write. Reads do not
+# write back: the expiry is pushed out only once less than half of it is left.
+# Requests for static files skip the store entirely. `flask sessions-expire`
+# removes expired sessions, or every session of one user, or all of them.
+#
+# Setting or clearing the signed-in user (AUTH_KEYS) marks the session for
+# regeneration: it is saved under a fresh id and the old row is deleted, so an
+# id planted before login (session fixation) is worthless after it.
+
+SESSION_SALT = "cosmo-session"
+ADMIN_OWNER  = "admin"
+AUTH_KEYS    = ("user", "admin-user")
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial: Optional[Dict[str, Any]] = None, sid: Optional[str] = None,
+                 expires_at: float = 0.0, stale_cookie: bool = False):
+        def on_update(self) -> None:
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid          = sid
+        self.expires_at   = expires_at
+        self.stale_cookie = stale_cookie       # the request carried a cookie we could not use
+        self.new          = sid is None
+        self.modified     = False
+        self.regenerate   = False              # issue a new sid on save
+        self.owner        = session_owner(self)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in AUTH_KEYS:
+            self.regenerate = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if key in AUTH_KEYS:
+            self.regenerate = True
+        super().__delitem__(key)
+
+def session_owner(data: Dict[str, Any]) -> Optional[str]:
+    """Who a session belongs to, for expiring a user's sessions together."""
+    if data.get('user'):
+        return data['user']
+    return ADMIN_OWNER if data.get('admin-user') else None
+
+class MemorySessionStore:
+    def __init__(self):
+        self._lock     = threading.Lock()
+        self._sessions : Dict[str, Tuple[Dict[str, Any], float]] = {}
+
+    def load(self, sid: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        entry = self._sessions.get(sid)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return dict(entry[0]), entry[1]
+
+    def save(self, sid: str, data: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._sessions[sid] = (dict(data), expires_at)
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                self._sessions[sid] = (entry[0], expires_at)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def expire(self, owner: Optional[str] = None, everything: bool = False) -> int:
+        now = time.time()
+        with self._lock:
+            doomed = [sid for sid, (data, expires_at) in self._sessions.items()
+                      if everything or expires_at <= now or (owner is not None and session_owner(data) == owner)]
+            for sid in doomed:
+                del self._sessions[sid]
+        return len(doomed)
+
+    def count(self) -> int:
+        now = time.time()
+        return sum(1 for _, expires_at in self._sessions.values() if expires_at > now)
+
+class SqliteSessionStore:
+    def __init__(self, path: str):
+        self.path   = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                   sid        TEXT PRIMARY KEY,
+                   owner      TEXT,
+                   data       TEXT NOT NULL,
+                   expires_at REAL NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_owner ON sessions (owner)")
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: a forked worker reconnects)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def load(self, sid: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        row = self._connection().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def save(self, sid: str, data: Dict[str, Any], expires_at: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (sid, owner, data, expires_at) VALUES (?, ?, ?, ?)",
+            (sid, session_owner(data), json.dumps(data), expires_at)
+        )
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        self._connection().execute("UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid))
+
+    def delete(self, sid: str) -> None:
+        self._connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def expire(self, owner: Optional[str] = None, everything: bool = False) -> int:
+        conn = self._connection()
+        if everything:
+            return conn.execute("DELETE FROM sessions").rowcount
+        if owner is not None:
+            return conn.execute("DELETE FROM sessions WHERE owner = ? OR expires_at <= ?", (owner, time.time())).rowcount
+        return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def count(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+class ServerSideSessionInterface(SessionInterface):
+    session_class = ServerSideSession
+
+    def __init__(self, store, idle_seconds: int):
+        self.store        = store
+        self.idle_seconds = idle_seconds
+
+    def _signer(self, app: Flask) -> Optional[Signer]:
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=SESSION_SALT)
+
+    def open_session(self, app: Flask, request: Request) -> Optional[ServerSideSession]:
+        signer = self._signer(app)
+        if signer is None:
+            return None
+
+        static_prefix = f"{app.static_url_path}/"
+        if request.path.startswith(static_prefix):
+            return self.session_class()
+
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self.session_class()
+        try:
+            sid = signer.unsign(cookie).decode("ascii")
+        except (BadSignature, UnicodeDecodeError):
+            # e.g. a cookie from the old client-side sessions
+            return self.session_class(stale_cookie=True)
+
+        entry = self.store.load(sid)
+        if entry is None:
+            metrics.inc("sessions_missed_total")
+            return self.session_class(stale_cookie=True)
+        data, expires_at = entry
+        return self.session_class(data, sid=sid, expires_at=expires_at)
+
+    def _delete_cookie(self, app: Flask, response: Response) -> None:
+        response.delete_cookie(
+            self.get_cookie_name(app),
+            domain   = self.get_cookie_domain(app),
+            path     = self.get_cookie_path(app),
+            secure   = self.get_cookie_secure(app),
+            httponly = self.get_cookie_httponly(app),
+            samesite = self.get_cookie_samesite(app),
+        )
+
+    def save_session(self, app: Flask, session: ServerSideSession, response: Response) -> None:
+        if not session:
+            if session.sid is not None and session.modified:
+                self.store.delete(session.sid)
+            if (session.sid is not None and session.modified) or session.stale_cookie:
+                self._delete_cookie(app, response)
+            return
+
+        now        = time.time()
+        expires_at = now + self.idle_seconds
+        if session.modified:
+            # pop()/clear()/update() bypass __setitem__, so also compare owners
+            if session.sid is not None and (session.regenerate or session_owner(session) != session.owner):
+                self.store.delete(session.sid)
+                session.sid = None
+                metrics.inc("sessions_regenerated_total")
+            if session.sid is None:
+                session.sid = secrets.token_urlsafe(32)
+                metrics.inc("sessions_created_total")
+            self.store.save(session.sid, dict(session), expires_at)
+        elif session.expires_at - now < self.idle_seconds / 2:
+            self.store.touch(session.sid, expires_at)
+        else:
+            return
+
+        if session.permanent:
+            cookie_expires = self.get_expiration_time(app, session)
+        else:
+            cookie_expires = None
+        response.set_cookie(
+            self.get_cookie_name(app),
+            self._signer(app).sign(session.sid.encode("ascii")).decode("ascii"),
+            expires  = cookie_expires,
+            domain   = self.get_cookie_domain(app),
+            path     = self.get_cookie_path(app),
+            secure   = self.get_cookie_secure(app),
+            httponly = self.get_cookie_httponly(app),
+            samesite = self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+def build_session_store(app: Flask):
+    backend = app.config.get("SESSION_BACKEND") or "sqlite"
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        path = app.config.get("SESSION_SQLITE_PATH") or os.path.join(app.instance_path, "sessions.sqlite3")
+        return SqliteSessionStore(path)
+    raise ValueError(f"Unknown session backend: {backend!r}")
+
+def init_sessions(app: Flask) -> None:
+    store = build_session_store(app)
+    app.session_interface = ServerSideSessionInterface(store, int(app.config.get("SESSION_IDLE_SECONDS", 7 * 24 * 3600)))
+    metrics.register_gauge("sessions_active", store.count)
+
+    @app.cli.command('sessions-expire')
+    @click.option('--user', 'owner', help="Also end every session of this uid ('admin' for the admin).")
+    @click.option('--all', 'everything', is_flag=True, help="End every session.")
+    def sessions_expire(owner: Optional[str], everything: bool) -> None:
+        """Remove expired sessions, plus those of --user, or all of them with --all."""
+        click.echo(f"{store.expire(owner=owner, everything=everything)} sessions removed")
@@ -0,0 +1,82 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+import click
+from repository import repo, SUBSCRIPTIONS
+from write_queue import enqueue_write, is_pending
+
+# Newsletter subscriptions are stored at subscriptions/<sha256 of the normalised
+# email>, so resubmitting an address cannot add another child. A resubmission is
+# not written at all: the first submitted_at is kept, as compaction keeps the
+# earliest. Entries written by the old push() flow are merged by
+# `flask compact-subscriptions`.
+
+SUBSCRIPTIONS_PATH = SUBSCRIPTIONS
+COMPACT_CHUNK_SIZE = 500
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def subscription_key(email: str) -> str:
+    return hashlib.sha256(normalize_email(email).encode("utf-8")).hexdigest()
+
+def subscribe(email: str, submitted_at: str) -> bool:
+    """Queue a subscription for ``email`` unless it already has one; returns whether one was queued."""
+    key = subscription_key(email)
+    if is_pending(SUBSCRIPTIONS_PATH, key) or repo.get(f"{SUBSCRIPTIONS_PATH}/{key}", shallow=True):
+        return False
+    enqueue_write(SUBSCRIPTIONS_PATH, {"email": email, "submitted_at": submitted_at}, key=key)
+    return True
+
+def _submitted_at(entry: Dict[str, Any]) -> datetime:
+    try:
+        return datetime.strptime(entry.get('submitted_at', ''), '%d-%m-%Y, %H:%M')
+    except (TypeError, ValueError):
+        return datetime.max
+
+def compaction_updates(raw: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    Multi-path update that rekeys every subscription by email hash, keeping the
+    earliest submission per address, and deletes the legacy push keys.
+    Returns the update and the number of unique subscribers.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for key, entry in raw.items():
+        email = (entry or {}).get('email', '')
+        if not email:
+            continue
+        groups.setdefault(subscription_key(email), []).append(entry)
+
+    updates: Dict[str, Any] = {}
+    for key, entry in raw.items():
+        email = (entry or {}).get('email', '')
+        if not email or subscription_key(email) != key:
+            updates[key] = None
+
+    for key, entries in groups.items():
+        first = min(entries, key=_submitted_at)
+        if raw.get(key) != first:
+            updates[key] = first
+
+    return updates, len(groups)
+
+def init_subscriptions(app) -> None:
+    @app.cli.command('compact-subscriptions')
+    @click.option('--dry-run', is_flag=True, help="Report what would change without writing.")
+    def compact_subscriptions(dry_run: bool) -> None:
+        """Merge duplicate newsletter subscriptions into one entry per email."""
+        raw = repo.subscriptions()
+        updates, unique = compaction_updates(raw)
+        removed = sum(1 for value in updates.values() if value is None)
+
+        click.echo(f"{len(raw)} entries, {unique} unique subscribers, "
+                   f"{len(updates) - removed} to write, {removed} to delete")
+        if dry_run or not updates:
+            return
+
+        # Writes before deletes, so an interrupted run never loses an address
+        items = sorted(updates.items(), key=lambda item: item[1] is None)
+        for start in range(0, len(items), COMPACT_CHUNK_SIZE):
+            repo.update(SUBSCRIPTIONS_PATH, dict(items[start:start + COMPACT_CHUNK_SIZE]))
+        click.echo("Done.")
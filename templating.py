@@ -0,0 +1,101 @@
+import os
+import time
+import logging
+from typing import Dict, Any, Callable, List, Tuple
+
+import click
+from flask import Flask, render_template
+from jinja2 import FileSystemBytecodeCache
+
+import metrics
+from utils import FEATURE_FIELDS
+
+# Template compilation off the request path.
+#
+# Compiled template code is kept in a FileSystemBytecodeCache (keyed by the
+# template source's checksum, so an edited template is simply recompiled), and
+# `flask templates-compile` fills it at build time. At startup every template
+# is loaded and the pages in PRERENDER_TEMPLATES are rendered once with an
+# empty context, which also pulls in the partials they include. With gunicorn's
+# preload_app this happens once in the master and the workers inherit the
+# compiled templates; otherwise each worker does it as it imports the app.
+#
+# Templates are only checked for changes with TEMPLATES_AUTO_RELOAD set, or in
+# debug mode when it is left unset (None, Flask's own default, which also
+# covers app.run(debug=True)), so production workers never stat them per
+# render. When they are checked, the warm-up is skipped: the cache would be
+# stale after the first edit anyway.
+
+log = logging.getLogger(__name__)
+
+def _empty_home_exchange() -> Dict[str, Any]:
+    return {
+        "house": {}, "page": 1, "total_pages": 1, "page_args": {}, "filter_args": {},
+        "cities": [], "location_types": [], "query": "", "selected_city": "", "selected_location": "",
+        "near": "", "radius": 25, "feature_fields": FEATURE_FIELDS, "selected_features": {},
+        "feature_counts": {field: dict.fromkeys(values, 0) for field, values in FEATURE_FIELDS.items()},
+        "total_matches": 0,
+    }
+
+# Pages served to anonymous visitors, rendered at startup with an empty result
+PRERENDER_TEMPLATES : Dict[str, Callable[[], Dict[str, Any]]] = {
+    "home.html"          : lambda: {"location_type_counts": {}},
+    "home-exchange.html" : _empty_home_exchange,
+    "about-us.html"      : dict,
+    "faq.html"           : dict,
+    "contact-us.html"    : dict,
+    "404.html"           : dict,
+    "503.html"           : dict,
+}
+
+def template_cache_path(app: Flask) -> str:
+    return app.config.get("TEMPLATE_CACHE_PATH") or os.path.join(app.instance_path, "jinja_cache")
+
+def compile_templates(app: Flask) -> Tuple[int, List[str]]:
+    """Load every template through the bytecode cache; returns (loaded, failed names)."""
+    loaded, failed = 0, []
+    for name in app.jinja_env.list_templates(extensions=("html",)):
+        try:
+            app.jinja_env.get_template(name)
+            loaded += 1
+        except Exception:
+            log.exception("template %s failed to compile", name)
+            failed.append(name)
+    return loaded, failed
+
+def prerender_templates(app: Flask) -> int:
+    """Render the startup pages once, outside any real request."""
+    rendered = 0
+    for name, context in PRERENDER_TEMPLATES.items():
+        try:
+            with app.test_request_context("/"):
+                render_template(name, **context())
+            rendered += 1
+        except Exception as exc:
+            log.warning("prerender of %s skipped: %s", name, exc)
+    return rendered
+
+def warm_templates(app: Flask) -> None:
+    started = time.perf_counter()
+    loaded, failed = compile_templates(app)
+    rendered = prerender_templates(app)
+    elapsed  = time.perf_counter() - started
+    metrics.observe("template_warmup_seconds", elapsed)
+    log.info("templates warmed in %.2fs: %d compiled, %d prerendered, %d failed",
+             elapsed, loaded, rendered, len(failed))
+
+def init_templating(app: Flask) -> None:
+    path = template_cache_path(app)
+    os.makedirs(path, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(path)
+
+    @app.cli.command('templates-compile')
+    def templates_compile() -> None:
+        """Compile every template into the bytecode cache."""
+        loaded, failed = compile_templates(app)
+        click.echo(f"{loaded} templates compiled into {path}")
+        if failed:
+            raise click.ClickException(f"Failed to compile: {', '.join(failed)}")
+
+    if app.config.get("TEMPLATE_WARMUP", True) and not app.jinja_env.auto_reload:
+        warm_templates(app)
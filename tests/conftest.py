@@ -0,0 +1,38 @@
+import pytest
+
+import clients
+from bench import datasets
+from bench.environment import build_app
+
+# Every test gets a fresh application over the bench stand-ins (FakeDatabase,
+# FakeAuth) with scratch files in a temporary directory.
+
+USERS = 40
+
+@pytest.fixture
+def env():
+    app, db, auth = build_app(USERS, config={"TEMPLATE_WARMUP": False})
+    yield app, db, auth
+    clients.use_backends()
+
+@pytest.fixture
+def app(env):
+    return env[0]
+
+@pytest.fixture
+def db(env):
+    return env[1]
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin-user'] = 'admin'
+    return client
+
+def login(client, index: int = 1):
+    return client.post("/login", data={"email": datasets.email_for(index), "password": datasets.PASSWORD})
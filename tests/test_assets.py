@@ -0,0 +1,32 @@
+import pytest
+
+@pytest.fixture
+def static(app, tmp_path):
+    (tmp_path / "site.css").write_text("body { color: red }")
+    (tmp_path / "site.css.br").write_bytes(b"br")
+    (tmp_path / "site.css.gz").write_bytes(b"gz")
+    app.static_folder = str(tmp_path)
+    return tmp_path
+
+@pytest.mark.parametrize("header, encoding", [
+    ("gzip, br",                    "br"),
+    ("br;q=0, gzip",                "gzip"),
+    ("br;q=0.0, gzip",              "gzip"),
+    ("br; q = 0, gzip;q=0.5",       "gzip"),
+    ("*",                           "br"),
+    ("*;q=0, gzip",                 "gzip"),
+    ("gzip;q=0, br;q=0.0",          None),
+    ("",                            None),
+])
+def test_a_precompressed_sibling_is_served_when_accepted(client, static, header, encoding):
+    response = client.get("/static/site.css", headers={"Accept-Encoding": header})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == encoding
+    assert "Accept-Encoding" in response.vary
+    assert response.mimetype == "text/css"
+
+def test_a_missing_sibling_falls_back_to_the_next_encoding(client, static):
+    (static / "site.css.br").unlink()
+    response = client.get("/static/site.css", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers.get("Content-Encoding") == "gzip"
+    assert response.get_data() == b"gz"
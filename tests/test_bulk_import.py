@@ -0,0 +1,79 @@
+import os
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import clients
+import bulk_import
+from bench import datasets
+from repository import repo
+
+def _reads(monkeypatch):
+    calls = []
+    monkeypatch.setattr(clients, "_db_listeners", [lambda **call: calls.append(call)])
+    return calls
+
+def test_owners_are_resolved_with_one_users_read(app, monkeypatch):
+    rows  = [{"owner": datasets.email_for(n)} for n in range(20)]
+    rows += [{"owner": datasets.uid_for(30)}, {"owner": "nobody@example.com"}, {"owner": "bad.$uid"}]
+    calls = _reads(monkeypatch)
+
+    state = {"errors": []}
+    bulk_import._validate(state, rows)
+
+    user_reads = [call for call in calls if call["op"] == "get" and call["path"].strip("/").startswith("users")]
+    assert len(user_reads) <= 2
+    unresolved = {error["owner"] for error in state["errors"]
+                  if any(message.startswith("No user found") for message in error["errors"])}
+    assert unresolved == {"nobody@example.com", "bad.$uid"}
+
+def test_resolve_owners_maps_emails_and_uids(app):
+    resolved = bulk_import.resolve_owners([datasets.email_for(3), datasets.uid_for(4), "u-missing"])
+    assert resolved == {datasets.email_for(3): datasets.uid_for(3), datasets.uid_for(4): datasets.uid_for(4)}
+
+def _job(app, **fields):
+    state = {"id": uuid.uuid4().hex, "status": "writing", "written": 3, "message": "", "errors": [], **fields}
+    os.makedirs(bulk_import._job_dir(app, state["id"]), exist_ok=True)
+    bulk_import._save_state(app, state)
+    return state
+
+def _age(app, state, seconds):
+    path  = os.path.join(bulk_import._job_dir(app, state["id"]), "job.json")
+    saved = json.load(open(path))
+    saved["updated_at"] = (datetime.now(bulk_import.IST) - timedelta(seconds=seconds)).strftime(bulk_import.TIME_FORMAT)
+    json.dump(saved, open(path, "w"))
+
+def test_a_job_that_stopped_moving_is_reported_failed(app):
+    running, stalled, done = _job(app), _job(app), _job(app, status="done")
+    _age(app, stalled, bulk_import.STALE_SECONDS + 120)
+    _age(app, done, bulk_import.STALE_SECONDS + 120)
+
+    assert bulk_import.load_job(app, running["id"])["status"] == "writing"
+    assert bulk_import.load_job(app, done["id"])["status"] == "done"
+    job = bulk_import.load_job(app, stalled["id"])
+    assert job["status"] == "failed"
+    assert "interrupted" in job["message"] and "3 rows" in job["message"]
+
+def test_an_exiting_worker_marks_its_running_imports_failed(app, monkeypatch):
+    state = _job(app)
+    monkeypatch.setattr(bulk_import, "_running", {state["id"]: state})
+    bulk_import.interrupt_imports(app)
+    assert bulk_import.load_job(app, state["id"])["status"] == "failed"
+
+def test_existing_images_are_read_once_for_the_whole_file(app, monkeypatch):
+    uids   = [datasets.uid_for(n) for n in range(10)]
+    before = {uid: repo.listing_images(uid) for uid in uids}
+    valid  = [(n + 1, uid, {"name": f"Home {n}"}, [f"img{n}.jpg"]) for n, uid in enumerate(uids)]
+    monkeypatch.setattr(bulk_import, "_validate", lambda state, rows: valid)
+    monkeypatch.setattr(bulk_import, "_process_image", lambda app, uid, source, *_: f"/static/uploads/{uid}/{source}")
+    monkeypatch.setattr(bulk_import, "bump_listing_version", lambda uid: None)
+    calls = _reads(monkeypatch)
+
+    state = _job(app, written=0)
+    bulk_import._run_job(app, state, [{} for _ in uids], None)
+
+    image_reads = [call for call in calls if call["op"] == "get" and call["path"].endswith("/images")]
+    assert image_reads == []
+    assert state["status"] == "done" and state["written"] == len(uids)
+    for n, uid in enumerate(uids):
+        assert repo.listing_images(uid) == before[uid] + [f"/static/uploads/{uid}/img{n}.jpg"]
@@ -0,0 +1,42 @@
+import os
+
+import caching
+from caching import bump_listing_version, listing_log_path, listing_version
+from repository import repo
+
+def _etag(response):
+    return response.headers["ETag"].strip('"')
+
+def test_a_listing_write_invalidates_the_etag(client, admin_client):
+    uid  = min(repo.verified_listings())
+    page = f"/home-details/{uid}"
+
+    first = client.get(page)
+    assert first.status_code == 200
+    assert client.get(page, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    admin_client.post("/all-homes", data={"user_id": uid, "dropdown_option": "Verified", "guest_points": "7"})
+
+    again = client.get(page, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 200
+    assert _etag(again) != _etag(first)
+    assert client.get(page, headers={"If-None-Match": again.headers["ETag"]}).status_code == 304
+
+def test_the_version_expires_after_its_max_age(app, monkeypatch):
+    app.config["LISTING_VERSION_MAX_AGE"] = 60
+    with app.app_context():
+        monkeypatch.setattr(caching.time, "time", lambda: 6000.0)
+        version = listing_version()
+        monkeypatch.setattr(caching.time, "time", lambda: 6059.0)
+        assert listing_version() == version
+        monkeypatch.setattr(caching.time, "time", lambda: 6060.0)
+        assert listing_version() != version
+
+def test_the_log_is_rotated_past_its_size_limit(app):
+    app.config["LISTING_LOG_MAX_BYTES"] = 100
+    with app.app_context():
+        path = listing_log_path()
+        for n in range(30):
+            bump_listing_version(f"u{n:07d}")
+        assert os.path.getsize(path) < 100
+        assert os.path.getsize(f"{path}.1") >= 100
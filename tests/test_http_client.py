@@ -0,0 +1,60 @@
+import socket
+import threading
+
+import pytest
+
+import http_client
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+
+@pytest.fixture
+def resetting_server():
+    """A server that reads each request and drops the connection unanswered; counts the requests."""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    received = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            with conn:
+                if conn.recv(65536):
+                    received.append(1)
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}/", received
+    listener.close()
+
+@pytest.fixture
+def closed_port():
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return f"http://127.0.0.1:{port}/"
+
+def _attempts(session, method, url):
+    calls = []
+    send  = session.get_adapter(url).send
+    session.get_adapter(url).send = lambda *args, **kwargs: calls.append(1) or send(*args, **kwargs)
+    with pytest.raises(http_client.requests.ConnectionError):
+        session.request(method, url, timeout=2)
+    return len(calls)
+
+def test_refused_connections_are_retried_for_any_method(closed_port):
+    session = http_client.OutboundSession(max_retries=2)
+    assert _attempts(session, "POST", closed_port) == 3
+    assert _attempts(session, "GET", closed_port) == 3
+
+def test_a_post_the_server_may_have_seen_is_not_retried(resetting_server):
+    url, received = resetting_server
+    session = http_client.OutboundSession(max_retries=2)
+    assert _attempts(session, "POST", url) == 1
+    assert _attempts(session, "PUT", url) == 3
+    assert len(received) == 4
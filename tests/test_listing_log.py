@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import app as app_module
+from admin_homes import AdminHomesIndex, admin_homes_index
+from caching import listing_log_path, bump_listing_version
+from matching import MatchEngine
+from repository import repo
+from search import ListingIndex
+from tests.conftest import login
+
+@pytest.fixture
+def context(app):
+    with app.app_context():
+        path = listing_log_path()
+        open(path, "a").close()      # a log appearing later is a new log: rebuild
+        yield path
+
+@pytest.fixture
+def listed():
+    return min(repo.verified_listings())
+
+def test_search_index_follows_the_log(context, listed):
+    index = ListingIndex()
+    assert index.refresh(context) is None                   # first call builds
+    assert index.find("zanzibar").total == 0
+
+    repo.update_listing(listed, {"title": "Zanzibar Retreat"})
+    bump_listing_version(listed)
+    assert index.refresh(context) == {listed}
+    assert index.find("zanzibar").uids == [listed]
+
+    repo.delete_listing(listed)
+    bump_listing_version(listed)
+    assert index.refresh(context) == {listed}
+    assert index.find("zanzibar").total == 0
+    assert index.refresh(context) == set()
+
+def test_admin_rows_follow_the_log(context, listed):
+    index = AdminHomesIndex()
+    index.refresh(context)
+    verified = index.summary()["verified_homes_count"]
+
+    repo.update_listing(listed, {"house_status": "Not Verified"})
+    bump_listing_version(listed)
+    assert index.refresh(context) == {listed}
+    summary = index.summary()
+    assert summary["verified_homes_count"] == verified - 1
+    assert index.page(query=listed).items[0]["house_status"] == "Not Verified"
+
+def test_match_engine_follows_the_log(context, listed):
+    engine = MatchEngine()
+    assert engine.refresh(context) is None
+    holders = {uid for uid, ranked in engine.results.items() if any(other == listed for _, other in ranked)}
+    assert holders
+
+    repo.delete_listing(listed)
+    bump_listing_version(listed)
+    dirty = engine.refresh(context)
+    assert holders <= dirty
+    assert listed not in engine.profiles
+    assert not any(other == listed for ranked in engine.results.values() for _, other in ranked)
+
+def test_partial_lines_wait_for_the_newline(context, listed):
+    index = ListingIndex()
+    index.refresh(context)
+    with open(context, "a") as fh:
+        fh.write(listed)
+    assert index.refresh(context) == set()
+    with open(context, "a") as fh:
+        fh.write("\n")
+    assert index.refresh(context) == {listed}
+
+def test_rotation_and_backlogs_rebuild(context, listed):
+    index = ListingIndex()
+    index.refresh(context)
+    rebuilds = []
+    index.rebuild = lambda listings, rebuild=index.rebuild: rebuilds.append(len(listings)) or rebuild(listings)
+
+    os.replace(context, context + ".1")
+    bump_listing_version(listed)
+    assert index.refresh(context) is None
+    assert len(rebuilds) == 1
+
+    index.rebuild_threshold = 1
+    bump_listing_version(listed)
+    bump_listing_version("another")
+    assert index.refresh(context, rebuild=False) is None    # left for the background build
+    assert len(rebuilds) == 1
+    assert index.refresh(context) is None
+    assert len(rebuilds) == 2
+    assert index.refresh(context) == set()
+
+def test_email_verification_reaches_the_admin_rows(app, client, monkeypatch):
+    uid = min(repo.listed_users())
+    repo.update_user(uid, {"email_verified": "Not Verified"})
+    with app.app_context():
+        assert admin_homes_index().page(query=uid).items[0]["email_verified"] == "Not Verified"
+
+    monkeypatch.setattr(app_module, "is_email_verified", lambda: True)
+    login(client, int(uid[1:]))
+    assert client.get("/my-account").status_code == 200
+    with app.app_context():
+        assert admin_homes_index().page(query=uid).items[0]["email_verified"] == "Verified"
@@ -0,0 +1,40 @@
+import os
+
+import metrics
+
+def _counter(data, name):
+    return sum(value for (key, _), value in data["counters"].items() if key == name)
+
+def _fork_worker(increment: float) -> None:
+    pid = os.fork()
+    if pid == 0:
+        try:
+            metrics.ensure_publisher()
+            metrics.inc("test_worker_total", increment)
+            metrics.histogram("test_worker_seconds", 0.02)
+            metrics.publish()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+def test_counters_are_summed_across_workers(tmp_path):
+    metrics.use_directory(str(tmp_path))
+    metrics.ensure_publisher()
+    before = _counter(metrics.collect(), "test_worker_total")
+
+    for increment in (1, 2, 3):
+        _fork_worker(increment)
+    data = metrics.collect()
+    assert _counter(data, "test_worker_total") == before + 6
+    assert data["histograms"][("test_worker_seconds", ())][1] >= 3
+
+    # The exited workers were folded into the archive and still count
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".json") and name[0].isdigit()) == \
+        [os.path.basename(metrics._shared["file"])]
+    assert _counter(metrics.collect(), "test_worker_total") == before + 6
+
+def test_prometheus_text_includes_other_workers(tmp_path):
+    metrics.use_directory(str(tmp_path))
+    metrics.ensure_publisher()
+    _fork_worker(5)
+    assert "test_worker_total 5" in metrics.render_prometheus()
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from repository import Repository, SqliteRepository
+
+def test_repository_primitives_are_abstract():
+    with pytest.raises(TypeError):
+        Repository()
+
+def test_sqlite_repository_connects_lazily(tmp_path):
+    path = str(tmp_path / "cosmo.sqlite3")
+    store = SqliteRepository(path)
+    assert not os.path.exists(path)
+
+    store.set("users/u1", {"name": "A", "properties": {"house_status": "Verified", "city": "Goa"}})
+    assert store.get("users/u1/name") == "A"
+    assert list(store.verified_listings()) == ["u1"]
+
+def test_forked_process_opens_its_own_connection(tmp_path):
+    store = SqliteRepository(str(tmp_path / "cosmo.sqlite3"))
+    store.set("users/u1", {"name": "A"})
+    parent = store._connection()
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = store._connection() is not parent and store.get("users/u1/name") == "A"
+            store.set("users/u2", {"name": "B"})
+            os.write(write, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b"1"
+    assert store._connection() is parent
+    assert store.get("users/u2/name") == "B"
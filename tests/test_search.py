@@ -0,0 +1,109 @@
+import os
+import threading
+
+import pytest
+
+import search
+from bench import datasets
+from caching import bump_listing_version, listing_log_path
+
+QUERIES = [
+    {"query": "sea garden"},
+    {"query": "gard", "city": datasets.CITIES[0].lower()},
+    {"query": "", "features": {"amenities": ["Wifi"]}},
+    {"query": "", "near": None, "radius_km": 250.0},    # near the first listing's PIN
+]
+
+@pytest.fixture
+def building(app, monkeypatch):
+    """A worker that has not built its index yet; builds are held until ``release`` is set."""
+    release = threading.Event()
+    index   = search.ListingIndex()
+    rebuild = index.rebuild
+
+    def held(*args, **kwargs):
+        assert release.wait(10)
+        rebuild(*args, **kwargs)
+
+    monkeypatch.setattr(index, "rebuild", held)
+    monkeypatch.setattr(search, "_index", index)
+    monkeypatch.setattr(search, "_build", {"app": app, "background": True, "pid": None, "thread": None, "scan": None})
+    yield release
+    release.set()
+    if search._build["thread"] is not None:
+        search._build["thread"].join(10)
+
+def _find(app, **kwargs):
+    with app.test_request_context():
+        index = search.listing_index()
+        return index, index.find(**kwargs)
+
+def test_searches_are_served_while_the_index_builds(app, client, building):
+    index, _ = _find(app, query="sea")
+    assert isinstance(index, search.ListingScan)
+    assert search._build["thread"].is_alive()
+
+    response = client.get("/home-exchange?q=sea")
+    assert response.status_code == 200
+
+    listings = search.repo.verified_listings()
+    pin      = listings[min(listings)]['properties']['pin_code']
+    queries  = [dict(query, near=pin) if "near" in query else query for query in QUERIES]
+    scanned  = [_find(app, **query)[1] for query in queries]
+    assert all(scan.total for scan in scanned)
+    building.set()
+    search._build["thread"].join(10)
+
+    for query, scan in zip(queries, scanned):
+        index, found = _find(app, **query)
+        assert index is search._index
+        assert found.total == scan.total
+        assert set(found.uids) == set(scan.uids)
+        assert found.counts == scan.counts
+
+def test_one_scan_is_shared_until_the_first_build(app, building):
+    with app.test_request_context():
+        scan = search.listing_index()
+    with app.test_request_context():
+        assert search.listing_index() is scan
+    building.set()
+    search._build["thread"].join(10)
+    with app.test_request_context():
+        assert search.listing_index() is search._index
+    assert search._build["scan"] is None
+
+def test_a_rebuild_keeps_serving_the_previous_index(app, client, building):
+    building.set()
+    with app.test_request_context():
+        search.listing_index()
+    search._build["thread"].join(10)
+    assert search._index.built
+    assert client.get("/home-exchange?q=sea").headers.get("ETag")
+
+    building.clear()
+    with app.app_context():                                  # rotate the log: a full rebuild
+        app.config["LISTING_LOG_MAX_BYTES"] = 1
+        bump_listing_version(min(search.repo.verified_listings()))
+    with app.test_request_context():
+        assert search.listing_index() is search._index        # not a scan, not blocked
+    assert search._build["thread"].is_alive()
+
+    stale = client.get("/home-exchange?q=sea")
+    assert stale.status_code == 200
+    assert "ETag" not in stale.headers                        # neither cached nor validated
+
+    building.set()
+    search._build["thread"].join(10)
+    assert client.get("/home-exchange?q=sea").headers.get("ETag")
+
+def test_a_preloading_master_leaves_the_build_to_post_fork(app, monkeypatch):
+    monkeypatch.setattr(search, "_build", {"app": None, "background": False, "pid": None, "thread": None, "scan": None})
+    monkeypatch.setenv("GUNICORN_PRELOAD_PID", str(os.getpid()))
+    app.config["SEARCH_WARM_INDEX"] = True
+    search.init_search(app)
+    assert search._build["thread"] is None
+
+    monkeypatch.setenv("GUNICORN_PRELOAD_PID", "1")              # a worker, or no preload
+    search.init_search(app)
+    assert search._build["thread"] is not None
+    search._build["thread"].join(10)
@@ -0,0 +1,62 @@
+from bench import datasets
+from tests.conftest import login
+
+def _sid(client):
+    cookie = client.get_cookie("session")
+    return cookie.value if cookie else None
+
+def _flash_anonymous(client):
+    # An anonymous session holding only a flash message: the id an attacker would plant
+    with client.session_transaction() as session:
+        session['_flashes'] = [("light", "Please log in.")]
+    return _sid(client)
+
+def test_cookie_carries_only_a_signed_id(app, client):
+    response = login(client)
+    assert response.status_code == 302
+    cookie = _sid(client)
+    assert len(cookie) < 120
+    assert "token" not in cookie
+    assert app.session_interface.store.count() == 1
+
+def test_login_regenerates_the_session_id(app, client):
+    anonymous = _flash_anonymous(client)
+    assert anonymous is not None
+
+    login(client)
+    signed_in = _sid(client)
+    assert signed_in != anonymous
+
+    # The planted id no longer resolves to anything
+    store    = app.session_interface.store
+    old_sid  = anonymous.rsplit(".", 1)[0]
+    assert store.load(old_sid) is None
+    with client.session_transaction() as session:
+        assert session['user'] == datasets.uid_for(1)
+
+def test_admin_login_regenerates_the_session_id(app, client):
+    anonymous = _flash_anonymous(client)
+    assert anonymous is not None
+    client.post("/admin", data={"email": datasets.ADMIN_EMAIL, "password": datasets.ADMIN_PASSWORD})
+    with client.session_transaction() as session:
+        assert session.get('admin-user') == 'admin'
+    assert _sid(client) != anonymous
+
+def test_logout_deletes_the_stored_session(app, client):
+    login(client)
+    client.get("/logout")
+    assert _sid(client) is None
+    assert app.session_interface.store.count() == 0
+
+def test_unreadable_cookie_is_cleared(client):
+    client.set_cookie("session", "eyJ1c2VyIjoiYSJ9.abc.def")
+    client.get("/")
+    assert _sid(client) is None
+
+def test_expire_user_ends_only_their_sessions(app):
+    first, second = app.test_client(), app.test_client()
+    login(first, 1)
+    login(second, 2)
+    store = app.session_interface.store
+    assert store.expire(owner=datasets.uid_for(1)) == 1
+    assert store.count() == 1
@@ -0,0 +1,33 @@
+import pytest
+
+import write_queue
+from repository import repo
+from subscriptions import SUBSCRIPTIONS_PATH, subscription_key
+
+EMAIL = "reader@example.com"
+
+@pytest.fixture
+def flush(app, monkeypatch):
+    real = write_queue.flush_once
+    monkeypatch.setattr(write_queue, "flush_once", lambda: 0)
+    return real
+
+def _subscribe(client, email=EMAIL):
+    return client.post("/", data={"form_type": "newsletter", "email": email})
+
+def test_a_double_submit_queues_one_write(client, flush):
+    _subscribe(client)
+    _subscribe(client, EMAIL.upper())
+    assert write_queue.queue_depth() == 1
+    flush()
+    assert repo.get(f"{SUBSCRIPTIONS_PATH}/{subscription_key(EMAIL)}")["email"] == EMAIL
+
+def test_resubscribing_keeps_the_first_submission(client, flush):
+    first = {"email": EMAIL, "submitted_at": "01-01-2024, 09:30"}
+    repo.set(f"{SUBSCRIPTIONS_PATH}/{subscription_key(EMAIL)}", first)
+
+    response = _subscribe(client)
+    assert response.status_code in (200, 302)
+    assert write_queue.queue_depth() == 0
+    flush()
+    assert repo.get(f"{SUBSCRIPTIONS_PATH}/{subscription_key(EMAIL)}") == first
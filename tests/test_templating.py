@@ -0,0 +1,27 @@
+import pytest
+
+import templating
+from bench.environment import build_app
+
+@pytest.fixture
+def warmed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(templating, "warm_templates", calls.append)
+    return calls
+
+@pytest.mark.parametrize("config, reload", [
+    ({}, False),
+    ({"DEBUG": True}, True),
+    ({"TEMPLATES_AUTO_RELOAD": True}, True),
+    ({"DEBUG": True, "TEMPLATES_AUTO_RELOAD": False}, False),
+])
+def test_templates_reload_follows_flask(env, warmed, config, reload):
+    app, _, _ = build_app(4, config={"TEMPLATE_WARMUP": True, **config})
+    assert app.jinja_env.auto_reload is reload
+    assert bool(warmed) is not reload
+
+def test_run_in_debug_mode_turns_reload_on(app):
+    assert app.config["TEMPLATES_AUTO_RELOAD"] is None
+    assert not app.jinja_env.auto_reload
+    app.debug = True                      # what app.run(debug=True) does
+    assert app.jinja_env.auto_reload
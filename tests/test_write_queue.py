@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+import write_queue
+from bench import datasets
+from repository import repo, EXCHANGE_REQUESTS
+
+@pytest.fixture
+def flush(app, monkeypatch):
+    # The flusher thread calls write_queue.flush_once by name; park it so the
+    # test drives every flush itself
+    real = write_queue.flush_once
+    monkeypatch.setattr(write_queue, "flush_once", lambda: 0)
+    return real
+
+@pytest.fixture
+def reject_bad(monkeypatch):
+    """Make the backend reject any update that touches a path containing 'bad'."""
+    apply_updates = repo.apply_updates
+    def apply(updates):
+        if any("bad" in path for path in updates):
+            raise ValueError("Invalid data; couldn't parse key")
+        apply_updates(updates)
+    monkeypatch.setattr(repo, "apply_updates", apply)
+
+def _dead_rows(app):
+    with sqlite3.connect(app.config["WRITE_QUEUE_PATH"]) as conn:
+        return conn.execute("SELECT path, key, attempts FROM dead").fetchall()
+
+def _make_due():
+    with sqlite3.connect(write_queue._state["path"]) as conn:
+        conn.execute("UPDATE pending SET next_attempt = 0")
+
+def test_rows_are_written_in_one_batch(flush):
+    keys = [write_queue.enqueue_write("contact_form", {"n": n}) for n in range(3)]
+    assert flush() == 3
+    assert write_queue.queue_depth() == 0
+    assert all(repo.get(f"contact_form/{key}") for key in keys)
+
+def test_bad_row_does_not_block_the_batch(app, flush, reject_bad):
+    good = write_queue.enqueue_write("contact_form", {"n": 1})
+    write_queue.enqueue_write("contact_form", {"n": 2}, key="bad-row")
+    other = write_queue.enqueue_write("contact_form", {"n": 3})
+
+    assert flush() == 2
+    assert repo.get(f"contact_form/{good}") and repo.get(f"contact_form/{other}")
+    assert write_queue.queue_depth() == 1
+
+def test_row_is_dead_lettered_after_max_attempts(app, flush, reject_bad, monkeypatch):
+    monkeypatch.setattr(write_queue, "MAX_ATTEMPTS", 3)
+    write_queue.enqueue_write("contact_form", {"n": 1}, key="bad-row")
+    for _ in range(3):
+        _make_due()
+        flush()
+
+    assert write_queue.queue_depth() == 0
+    assert _dead_rows(app) == [("contact_form", "bad-row", 3)]
+
+def test_outage_does_not_count_as_an_attempt(app, flush, monkeypatch):
+    monkeypatch.setattr(repo, "apply_updates", lambda updates: (_ for _ in ()).throw(ConnectionError("down")))
+    monkeypatch.setattr(repo, "ping", lambda: False)
+    write_queue.enqueue_write("contact_form", {"n": 1})
+    for _ in range(write_queue.MAX_ATTEMPTS + 1):
+        _make_due()
+        flush()
+    assert write_queue.queue_depth() == 1
+    assert _dead_rows(app) == []
+
+def test_invalid_paths_are_refused_at_enqueue(app):
+    with pytest.raises(ValueError):
+        write_queue.enqueue_write("exchange_requests/a.b", {"n": 1})
+
+def test_exchange_request_for_unknown_home_is_refused(app, client, flush):
+    with client.session_transaction() as session:
+        session['user'] = datasets.uid_for(1)
+    for uid in ("no-such-home", "bad.$key"):
+        response = client.post(f"/home-details/{uid}", data={"user-exchange": "1"})
+        assert response.status_code == 302
+    assert write_queue.queue_depth() == 0
+
+    listed = next(uid for uid in repo.verified_listings() if uid != datasets.uid_for(1))
+    client.post(f"/home-details/{listed}", data={"user-exchange": "1"})
+    assert flush() == 1
+    assert len(repo.get(f"{EXCHANGE_REQUESTS}/{listed}")) >= 1
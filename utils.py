@@ -5,32 +5,18 @@ import base64
 from datetime import datetime, timezone, timedelta
 from PIL import Image
 from io import BytesIO
-from firebase_admin import initialize_app, credentials, auth
-from firebase_admin import db as admin_db
+from repository import repo
 from typing import Dict, Any, Tuple, Set
-import uuid, json
+import uuid, json, time
+import metrics
+from caching import bump_listing_version
 
 def db_alive() -> bool:
-    try:
-        admin_db.reference('healthcheck').get(shallow=True)
-        return True
-    except Exception:
-        return False
+    return repo.ping()
 
 def all_users_properties() -> Dict[str, Any]:
     try:
-        all_users = admin_db.reference('users').get()
-        if not all_users:
-            return {}
-
-        current_uid = session.get('user')
-
-        filtered_users = {
-            uid: data for uid, data in all_users.items()
-            if uid != current_uid and data.get('properties', {}).get('house_status') == "Verified"
-        }
-
-        return filtered_users
+        return repo.verified_listings(exclude_uid=session.get('user'))
 
     except Exception as e:
         return {}
@@ -41,38 +27,31 @@ def get_current_user() -> Dict[str, Any]:
         return {}
 
     try:
-        user_data = admin_db.reference(f'users/{uid}').get()
+        user_data = repo.get_user(uid)
         return user_data or {}
     except Exception as e:
         return {}
 
 def is_email_registered(email: str) -> bool:
     try:
-        users = admin_db.reference('users').get()
-        if not users:
-            return False
-
-        return any(user.get('email') == email for user in users.values())
+        return repo.find_uid_by_email(email) is not None
 
     except Exception as e:
         return False
     
 def all_users_properties_admin():
     try:
-        all_users = admin_db.reference('users').get()
-        if not all_users:
-            return {}
-
-        filtered_users = {
-            uid: data for uid, data in all_users.items()
-            if 'properties' in data and data['properties'].get('house_status', '').strip() != ""
-        }
-
-        return filtered_users
+        return repo.listed_users()
 
     except Exception as e:
         return {}
 
+RTDB_KEY_RE = re.compile(r"[^/.#$\[\]]{1,768}")
+
+def is_valid_key(key: str) -> bool:
+    """Usable as one RTDB path segment (no / . # $ [ ])."""
+    return bool(key) and bool(RTDB_KEY_RE.fullmatch(key))
+
 def is_valid_name(name: str) -> bool:
     """Letters & spaces only, at least 2 chars."""
     return bool(re.fullmatch(r"^[A-Za-z\s]+$", name))
@@ -121,9 +100,15 @@ def is_valid_title(title: str) -> bool:
     """Property title: 5-100 chars, letters, numbers, spaces, punctuation."""
     return bool(re.fullmatch(r"[\w\s.,'\"()\-]{5,100}", title))
 
+LOCATION_TYPES = ('Mountain', 'Beach', 'City', 'Wildlife')
+
 def is_valid_location_type(location_type: str) -> bool:
     """Location Type"""
-    return location_type in ['Mountain', 'Beach', 'City', 'Wildlife']
+    return location_type in LOCATION_TYPES
+
+def is_valid_preferred_location_types(location_types: list[str]) -> bool:
+    """Preferred exchange destinations: all items must be location types."""
+    return all(t in LOCATION_TYPES for t in location_types)
 
 def is_valid_property_type(property_type: str) -> bool:
     """Property type: Must be one of the predefined types."""
@@ -150,50 +135,63 @@ def is_valid_description(description: str) -> bool:
     desc = description.strip()
     return 1 <= len(desc) <= 1000
 
+# Checkbox values a listing can carry. The order is significant: facets.py
+# assigns bit positions from it, so append new values at the end.
+
+AMENITIES = (
+    "Air Condition", "Refrigerator", "Microwave Oven", "Heating System", "Washing Machine",
+    "Wifi", "Smart TV", "Dishwasher", "Induction", "Kettle", "Bathtub",
+)
+UNIQUE_FACILITIES = (
+    "Private Backyard", "Balcony / Terrace", "BBQ", "Pool", "Bicycle",
+    "Cleaning Person", "Private Parking", "Fire Place", "Private Gym", "Elevator", "Guide",
+)
+KIDS_FRIENDLY = (
+    "Kids Playground", "Baby Gear", "Secured Pool", "Kids Toy",
+)
+ECO_FRIENDLY_AMENITIES = (
+    "Selective Waste Sorting", "Public Transport Access", "Vegitable Garden",
+    "Renewable Energy Provider",
+)
+HOUSE_RULES = (
+    "Children Welcome", "Pets Welcome", "Pets not Allowed", "Somke Allowed", "Smoke not Allowed", "Plants to Water",
+)
+REMOTE_FRIENDLY = (
+    "Dedicated Work Space", "High Speed Internet",
+)
+
+FEATURE_FIELDS = {
+    "amenities"              : AMENITIES,
+    "unique_facilities"      : UNIQUE_FACILITIES,
+    "kids_friendly"          : KIDS_FRIENDLY,
+    "eco_friendly_amenities" : ECO_FRIENDLY_AMENITIES,
+    "house_rules"            : HOUSE_RULES,
+    "remote_friendly"        : REMOTE_FRIENDLY,
+}
+
 def is_valid_amenities(amenities: list[str]) -> bool:
     """Amenities: all items must be from allowed list."""
-    allowed = {
-        "Air Condition", "Refrigerator", "Microwave Oven", "Heating System", "Washing Machine",
-        "Wifi", "Smart TV", "Dishwasher", "Induction", "Kettle", "Bathtub"
-    }
-    return all(f in allowed for f in amenities)
+    return all(f in AMENITIES for f in amenities)
 
 def is_valid_unique_facilities(unique_facilities: list[str]) -> bool:
     """Unique Facilities: all items must be from allowed list."""
-    allowed = {
-        "Private Backyard", "Balcony / Terrace", "BBQ", "Pool", "Bicycle",
-        "Cleaning Person", "Private Parking", "Fire Place", "Private Gym", "Elevator", "Guide"
-    }
-    return all(f in allowed for f in unique_facilities)
+    return all(f in UNIQUE_FACILITIES for f in unique_facilities)
 
 def is_valid_kids_friendly(kids_friendly: list[str]) -> bool:
     """Unique Facilities: all items must be from allowed list."""
-    allowed = {
-        "Kids Playground", "Baby Gear", "Secured Pool", "Kids Toy"
-    }
-    return all(f in allowed for f in kids_friendly)
+    return all(f in KIDS_FRIENDLY for f in kids_friendly)
 
 def is_valid_eco_friendly_amenities(eco_friendly_amenities: list[str]) -> bool:
     """Unique Facilities: all items must be from allowed list."""
-    allowed = {
-        "Selective Waste Sorting", "Public Transport Access", "Vegitable Garden",
-        "Renewable Energy Provider"
-    }
-    return all(f in allowed for f in eco_friendly_amenities)
+    return all(f in ECO_FRIENDLY_AMENITIES for f in eco_friendly_amenities)
 
 def is_valid_house_rules(house_rules: list[str]) -> bool:
     """House Rules: all items must be from allowed list."""
-    allowed = {
-        "Children Welcome", "Pets Welcome", "Pets not Allowed", "Somke Allowed", "Smoke not Allowed", "Plants to Water"
-    }
-    return all(f in allowed for f in house_rules)
+    return all(f in HOUSE_RULES for f in house_rules)
 
 def is_valid_remote_friendly(remote_friendly: list[str]) -> bool:
     """Unique Facilities: all items must be from allowed list."""
-    allowed = {
-        "Dedicated Work Space", "High Speed Internet"
-    }
-    return all(f in allowed for f in remote_friendly)
+    return all(f in REMOTE_FRIENDLY for f in remote_friendly)
 
 # My Account Profile Details and Image Upload
 
@@ -212,25 +210,72 @@ def allowed_file(filename: str, allowed_extensions: Set[str] = ALLOWED_EXTENSION
 
 PROFILE_FOLDER = os.path.join("static", "profile")
 
+# Upload decode guard
+
+MAX_IMAGE_PIXELS = 40_000_000
+MAX_IMAGE_EDGE   = 2048
+
+class ImageTooLargeError(ValueError):
+    pass
+
+def _decode_bounded_image(img_bytes: bytes, max_edge: int, max_pixels: int) -> Tuple[Image.Image, int]:
+    """Decode within the pixel budget; JPEGs are drafted close to ``max_edge``."""
+    try:
+        img = Image.open(BytesIO(img_bytes))
+    except Image.DecompressionBombError as exc:
+        raise ImageTooLargeError(str(exc))
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(f"{width}x{height} exceeds {max_pixels} pixels")
+
+    img.draft("RGB", (max_edge, max_edge))
+    decoded_bytes = img.width * img.height * len(img.getbands())
+
+    img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    return img, decoded_bytes
+
+def save_upload_image(img_bytes: bytes, abs_path: str, kind: str, mode: str = None, **save_options) -> None:
+    """Decode, downscale and encode an uploaded image as WEBP, recording time and memory."""
+    max_edge   = app.config.get("MAX_IMAGE_EDGE", MAX_IMAGE_EDGE)
+    max_pixels = app.config.get("MAX_IMAGE_PIXELS", MAX_IMAGE_PIXELS)
+
+    started = time.perf_counter()
+    try:
+        img, decoded_bytes = _decode_bounded_image(img_bytes, max_edge, max_pixels)
+    except ImageTooLargeError:
+        metrics.inc("image_upload_rejected_total", kind=kind)
+        raise
+
+    if mode:
+        img = img.convert(mode)
+    img.save(abs_path, format="WEBP", **save_options)
+
+    metrics.observe("image_upload_seconds", time.perf_counter() - started, kind=kind)
+    metrics.observe("image_upload_decoded_bytes", decoded_bytes, kind=kind)
+    metrics.observe("image_upload_source_bytes", len(img_bytes), kind=kind)
+
 def _update_profile_image(uid: str):
     try:
         cropped_data = request.form["cropped_image"]
         header, encoded = cropped_data.split(",", 1)
         img_bytes = base64.b64decode(encoded)
-        img = Image.open(BytesIO(img_bytes)).convert("RGB")
 
         abs_folder = os.path.join(app.root_path, PROFILE_FOLDER)
         os.makedirs(abs_folder, exist_ok=True)
 
         filename = f"{uid}.webp"
         abs_path = os.path.join(abs_folder, filename)
-        img.save(abs_path, format="WEBP", quality=80, method=6)
+        save_upload_image(img_bytes, abs_path, "profile", mode="RGB", quality=80, method=6)
 
         image_url = f"/{PROFILE_FOLDER.replace(os.sep, '/')}/{filename}"
 
-        admin_db.reference(f"users/{uid}").update({"profile_image": image_url})
+        repo.update_user(uid, {"profile_image": image_url})
+        bump_listing_version(uid)
         flash("Profile image updated successfully!", "success")
 
+    except ImageTooLargeError:
+        flash("Image is too large. Please upload a smaller image.", "light")
     except Exception as exc:
         flash("Error updating profile images. Please try again later.", "light")
 
@@ -282,7 +327,8 @@ def _update_profile_details(uid):
     profile_data["submitted_at"] = time
 
     try:
-        admin_db.reference(f"users/{uid}").update(profile_data)
+        repo.update_user(uid, profile_data)
+        bump_listing_version(uid)
         flash("Profile details updated successfully!", "success")
     except Exception as exc:
         flash("Error updating profile details. Please try again later.", "light")
@@ -291,6 +337,12 @@ def _update_profile_details(uid):
 
 #  Upload Homes Details
 
+REQUIRED_PROPERTY_FIELDS = (
+    "title", "location_type", "property_type", "guest_capacity", "size",
+    "bedrooms", "bathrooms", "address", "city", "state",
+    "pin_code", "description", "name", "email", "phone",
+)
+
 def collect_property_form_data(form: "Request.form") -> Dict[str, Any]:
     field_map = {
         "title"          : "title",
@@ -320,6 +372,7 @@ def collect_property_form_data(form: "Request.form") -> Dict[str, Any]:
     data["eco_friendly_amenities"] = form.getlist("eco_friendly_amenities")
     data["house_rules"] = form.getlist("house_rules")
     data["remote_friendly"] = form.getlist("remote_friendly")
+    data["preferred_location_types"] = form.getlist("preferred_location_types")
     return data
 
 
@@ -345,16 +398,18 @@ def validate_property_form(data: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
         "eco_friendly_amenities"  : (is_valid_eco_friendly_amenities, "One or more selected kids friendly are invalid."),
         "house_rules"      : (is_valid_house_rules,     "One or more selected amenities are invalid."),
         "remote_friendly"      : (is_valid_remote_friendly,     "One or more selected amenities are invalid."),
+        "preferred_location_types": (is_valid_preferred_location_types, "One or more preferred destinations are invalid."),
         "name"           : (is_valid_name,         "Name must contain only letters and spaces (min 2 chars)."),
         "email"          : (is_valid_email,        "Please enter a valid email address."),
         "phone"          : (is_valid_phone,        "Phone number must be 10-15 digits with optional '+' sign."),
     }
 
+    list_fields = (*FEATURE_FIELDS, "preferred_location_types")
     for field, (validator, msg) in rules.items():
         value = data.get(field, "")
-        if field in ["amenities", "unique_facilities", "kids_friendly", "eco_friendly_amenities", "house_rules", "remote_friendly"] and not validator(value):
+        if field in list_fields and not validator(value):
             errors[field] = msg
-        elif field not in ["amenities", "unique_facilities", "kids_friendly", "eco_friendly_amenities", "house_rules", "remote_friendly"] and not validator(str(value).strip()):
+        elif field not in list_fields and not validator(str(value).strip()):
             errors[field] = msg
 
     return (not errors), errors
@@ -371,31 +426,27 @@ def add_homes_image(uid: str):
         cropped_data    = request.form.get('cropped_image1')
         header, encoded = cropped_data.split(',', 1)
         img_data        = base64.b64decode(encoded)
-        img             = Image.open(BytesIO(img_data))
 
         filename = f"{uuid.uuid4().hex}.webp"
         rel_path = os.path.join('static', 'uploads', uid, filename)
         abs_path = os.path.join(app.root_path, rel_path)
 
         os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-        img.save(abs_path, format='WEBP')
+        save_upload_image(img_data, abs_path, "home")
 
         url_path = f"/static/uploads/{uid}/{filename}"
 
-        existing_images = admin_db.reference(f'users/{uid}/properties/images').get()
-        if not existing_images:
-            existing_images = []
-        elif isinstance(existing_images, dict):
-            existing_images = list(existing_images.values())
-
+        existing_images = repo.listing_images(uid)
         existing_images.append(url_path)
 
-        admin_db.reference(f'users/{uid}/properties/images').set(existing_images)
+        repo.set_listing_images(uid, existing_images)
         if 'user' in session:
-            admin_db.reference(f'users/{uid}/properties/house_status').set('Not Verified')
-            admin_db.reference(f'users/{uid}/properties/guest_points').set('0')
+            repo.reset_listing_review(uid)
+        bump_listing_version(uid)
 
         flash("Image uploaded successfully!", "success")
+    except ImageTooLargeError:
+        flash("Image is too large. Please upload a smaller image.", "light")
     except Exception as e:
         flash("Error uploading image. Please try again later.", "light")
 
@@ -403,8 +454,7 @@ def add_homes_image(uid: str):
 
 def delete_homes_details(uid: str):
     try:
-        existing_data = admin_db.reference(f'users/{uid}/properties/images').get()
-        old_image_paths = existing_data if isinstance(existing_data, list) else []
+        old_image_paths = repo.listing_images(uid)
 
         images_to_keep_json = request.form.get('images_to_keep', '[]')
         try:
@@ -424,10 +474,10 @@ def delete_homes_details(uid: str):
                 except Exception as e:
                     flash("Error deleting file(s).", "light")
 
-        admin_db.reference(f'users/{uid}/properties/images').set(images_to_keep)
+        repo.set_listing_images(uid, images_to_keep)
         if 'user' in session:
-            admin_db.reference(f'users/{uid}/properties/house_status').set('Not Verified')
-            admin_db.reference(f'users/{uid}/properties/guest_points').set('0')
+            repo.reset_listing_review(uid)
+        bump_listing_version(uid)
 
         flash("Images updated successfully!", "success")
     except Exception as e:
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import random
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+import metrics
+from repository import repo
+from utils import is_valid_key
+
+# Write-behind queue for public form submissions.
+#
+# A submit is stored in a local SQLite file and acknowledged at once; a
+# background thread per worker pushes queued rows to the data backend in
+# batches with one multi-path update. Each row gets its RTDB key at enqueue
+# time, so a retried or doubly-flushed batch writes the same children again
+# rather than duplicating.
+#
+# When a batch fails and the backend still answers a ping, the rows are tried
+# one at a time, so a single row the backend rejects cannot hold back the rest.
+# A row that has failed MAX_ATTEMPTS times on its own is moved to the `dead`
+# table and logged. While the backend is unreachable nothing counts as an
+# attempt; the batch just waits for the next retry.
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE     = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", 100))
+FLUSH_INTERVAL = float(os.getenv("WRITE_QUEUE_FLUSH_INTERVAL", 1.0))
+LEASE_SECONDS  = 30
+RETRY_BASE     = 1.0
+RETRY_MAX      = 300.0
+MAX_ATTEMPTS   = int(os.getenv("WRITE_QUEUE_MAX_ATTEMPTS", 8))
+
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+_state : Dict[str, Any] = {"path": None, "pid": None, "thread": None}
+_wake  = threading.Event()
+_lock  = threading.Lock()
+
+def push_id() -> str:
+    """Chronologically ordered key in the same alphabet as RTDB push() keys."""
+    now = int(time.time() * 1000)
+    stamp = ""
+    for _ in range(8):
+        stamp = PUSH_CHARS[now % 64] + stamp
+        now //= 64
+    return stamp + "".join(random.choice(PUSH_CHARS) for _ in range(12))
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(_state["path"], timeout=10, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+    finally:
+        conn.close()
+
+def _create_schema() -> None:
+    os.makedirs(os.path.dirname(_state["path"]), exist_ok=True)
+    with _connect() as conn:
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS pending (
+                   id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                   path         TEXT NOT NULL,
+                   key          TEXT NOT NULL,
+                   payload      TEXT NOT NULL,
+                   attempts     INTEGER NOT NULL DEFAULT 0,
+                   next_attempt REAL NOT NULL,
+                   created_at   REAL NOT NULL
+               )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS pending_next_attempt ON pending (next_attempt)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS dead (
+                   id         INTEGER PRIMARY KEY,
+                   path       TEXT NOT NULL,
+                   key        TEXT NOT NULL,
+                   payload    TEXT NOT NULL,
+                   attempts   INTEGER NOT NULL,
+                   error      TEXT,
+                   created_at REAL NOT NULL,
+                   failed_at  REAL NOT NULL
+               )"""
+        )
+
+def enqueue_write(path: str, payload: Dict[str, Any], key: Optional[str] = None) -> str:
+    """Queue ``payload`` to be written at ``path/key`` (a new push key by default)."""
+    key = key or push_id()
+    if not all(is_valid_key(segment) for segment in [*path.strip("/").split("/"), key]):
+        raise ValueError(f"invalid write queue path: {path}/{key}")
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO pending (path, key, payload, next_attempt, created_at) VALUES (?, ?, ?, ?, ?)",
+            (path.strip("/"), key, json.dumps(payload), now, now)
+        )
+    metrics.inc("write_queue_enqueued_total", path=path.split("/")[0])
+    ensure_flusher()
+    _wake.set()
+    return key
+
+def is_pending(path: str, key: str) -> bool:
+    """Whether a write to ``path/key`` is still waiting in the queue."""
+    if not _state["path"]:
+        return False
+    with _connect() as conn:
+        return conn.execute(
+            "SELECT 1 FROM pending WHERE path = ? AND key = ? LIMIT 1", (path.strip("/"), key)
+        ).fetchone() is not None
+
+def queue_depth(table: str = "pending") -> int:
+    if not _state["path"]:
+        return 0
+    with _connect() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def _claim_batch(conn: sqlite3.Connection):
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT id, path, key, payload, attempts FROM pending WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+            (now, BATCH_SIZE)
+        ).fetchall()
+        if rows:
+            # Lease the rows so other workers' flushers skip them meanwhile
+            conn.executemany(
+                "UPDATE pending SET next_attempt = ? WHERE id = ?",
+                [(now + LEASE_SECONDS, row[0]) for row in rows]
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return rows
+
+def _retry_at(attempts: int) -> float:
+    return time.time() + random.uniform(0, min(RETRY_MAX, RETRY_BASE * 2 ** attempts))
+
+def _fail_row(conn: sqlite3.Connection, row, exc: Exception) -> None:
+    row_id, path, key, payload, attempts = row
+    attempts += 1
+    if attempts < MAX_ATTEMPTS:
+        conn.execute("UPDATE pending SET attempts = ?, next_attempt = ? WHERE id = ?",
+                     (attempts, _retry_at(attempts), row_id))
+        return
+
+    log.error("write queue row %s/%s dropped after %d attempts: %s", path, key, attempts, exc)
+    metrics.inc("write_queue_dead_total", path=path.split("/")[0])
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        "INSERT INTO dead (id, path, key, payload, attempts, error, created_at, failed_at) "
+        "SELECT id, path, key, payload, ?, ?, created_at, ? FROM pending WHERE id = ?",
+        (attempts, str(exc)[:1000], time.time(), row_id)
+    )
+    conn.execute("DELETE FROM pending WHERE id = ?", (row_id,))
+    conn.execute("COMMIT")
+
+def flush_once() -> int:
+    """Push one batch of due rows. Returns the number of rows written."""
+    with _connect() as conn:
+        rows = _claim_batch(conn)
+        if not rows:
+            return 0
+
+        updates = {f"{path}/{key}": json.loads(payload) for _, path, key, payload, _ in rows}
+        started = time.perf_counter()
+        try:
+            repo.apply_updates(updates)
+        except Exception as exc:
+            log.warning("write queue flush of %d rows failed: %s", len(rows), exc)
+            metrics.inc("write_queue_failures_total")
+            if not repo.ping():
+                # Backend down: retry the batch later without charging the rows an attempt
+                conn.executemany("UPDATE pending SET next_attempt = ? WHERE id = ?",
+                                 [(_retry_at(row[4]), row[0]) for row in rows])
+                return 0
+            return _flush_rows(conn, rows)
+
+        conn.executemany("DELETE FROM pending WHERE id = ?", [(row[0],) for row in rows])
+        metrics.observe("write_queue_flush_seconds", time.perf_counter() - started)
+        metrics.inc("write_queue_flushed_total", len(rows))
+        return len(rows)
+
+def _flush_rows(conn: sqlite3.Connection, rows) -> int:
+    """Write ``rows`` one at a time, so a bad row only fails itself."""
+    written = 0
+    for row in rows:
+        row_id, path, key, payload, _ = row
+        try:
+            repo.apply_updates({f"{path}/{key}": json.loads(payload)})
+        except Exception as exc:
+            _fail_row(conn, row, exc)
+            continue
+        conn.execute("DELETE FROM pending WHERE id = ?", (row_id,))
+        written += 1
+    metrics.inc("write_queue_flushed_total", written)
+    return written
+
+def _run() -> None:
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            while flush_once() == BATCH_SIZE:
+                pass
+        except Exception:
+            log.exception("write queue flusher error")
+
+def ensure_flusher() -> None:
+    """Start this process's flusher thread (again after a fork)."""
+    pid = os.getpid()
+    if _state["pid"] == pid or not _state["path"]:
+        return
+    with _lock:
+        if _state["pid"] == pid:
+            return
+        thread = threading.Thread(target=_run, name="write-queue-flusher", daemon=True)
+        thread.start()
+        _state.update(pid=pid, thread=thread)
+
+def init_write_queue(app) -> None:
+    _state["path"] = app.config.get("WRITE_QUEUE_PATH") or os.path.join(app.instance_path, "write_queue.sqlite3")
+    _create_schema()
+    metrics.register_gauge("write_queue_depth", queue_depth)
+    metrics.register_gauge("write_queue_dead", lambda: queue_depth("dead"))
+
+    # Rows left over from a previous run drain once the worker serves traffic.
+    app.before_request(ensure_flusher)